@@ -24,3 +24,7 @@ CORS_ORIGINS = [
 
 SERVER_HOST = "0.0.0.0"
 SERVER_PORT = 8000
+
+ANALYSIS_MAX_CONCURRENCY = int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "4"))
+ANALYSIS_JOB_RETENTION_SECONDS = int(os.getenv("ANALYSIS_JOB_RETENTION_SECONDS", "3600"))
+ANALYSIS_STREAM_HEARTBEAT_SECONDS = int(os.getenv("ANALYSIS_STREAM_HEARTBEAT_SECONDS", "15"))
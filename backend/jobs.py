@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from config import ANALYSIS_MAX_CONCURRENCY, ANALYSIS_JOB_RETENTION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+
+class AnalysisJob:
+    def __init__(self, client_id: str, query: str, dedup_key: Tuple[str, str]):
+        self.id = f"job_{uuid.uuid4().hex}"
+        self.client_id = client_id
+        self.query = query
+        self.dedup_key = dedup_key
+        self.status = "queued"
+        self.progress: Dict[str, Any] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.analysis_id: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.cancel_event = threading.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def update_progress(self, progress: Dict[str, Any]):
+        self.progress = {**progress, "updatedAt": datetime.utcnow().isoformat()}
+
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "jobId": self.id,
+            "clientId": self.client_id,
+            "query": self.query,
+            "status": self.status,
+            "progress": self.progress,
+            "analysisId": self.analysis_id,
+            "result": self.result,
+            "error": self.error,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+        }
+
+class JobManager:
+    def __init__(
+        self,
+        max_concurrency: int = ANALYSIS_MAX_CONCURRENCY,
+        retention_seconds: int = ANALYSIS_JOB_RETENTION_SECONDS
+    ):
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="analysis-job")
+        self.retention_seconds = retention_seconds
+        self.jobs: Dict[str, AnalysisJob] = {}
+        self.in_flight: Dict[Tuple[str, str], str] = {}
+
+    @staticmethod
+    def dedup_key(client_id: str, query: str) -> Tuple[str, str]:
+        return client_id, " ".join(query.lower().split())
+
+    def submit(
+        self,
+        client_id: str,
+        query: str,
+        work: Callable[[AnalysisJob], Dict[str, Any]],
+        finalize: Callable[[AnalysisJob, Dict[str, Any]], Awaitable[None]]
+    ) -> Tuple[AnalysisJob, bool]:
+        self._prune()
+        key = self.dedup_key(client_id, query)
+        existing = self.jobs.get(self.in_flight.get(key, ""))
+        if existing and existing.status not in TERMINAL_STATUSES and not existing.is_cancelled():
+            return existing, False
+        job = AnalysisJob(client_id, query, key)
+        self.jobs[job.id] = job
+        self.in_flight[key] = job.id
+        job.task = asyncio.create_task(self._run(job, work, finalize))
+        return job, True
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[AnalysisJob]:
+        job = self.jobs.get(job_id)
+        if job is None or job.status in TERMINAL_STATUSES:
+            return job
+        job.cancel_event.set()
+        if job.status == "queued" and job.task:
+            job.task.cancel()
+        else:
+            job.status = "cancelling"
+        return job
+
+    def _execute(self, job: AnalysisJob, work: Callable[[AnalysisJob], Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if job.is_cancelled():
+            return None
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        return work(job)
+
+    async def _run(
+        self,
+        job: AnalysisJob,
+        work: Callable[[AnalysisJob], Dict[str, Any]],
+        finalize: Callable[[AnalysisJob, Dict[str, Any]], Awaitable[None]]
+    ):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.executor, self._execute, job, work)
+            if job.is_cancelled() or result is None:
+                job.status = "cancelled"
+                job.result = result
+            else:
+                job.result = result
+                await finalize(job, result)
+                job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            logger.error(f"Analysis job {job.id} failed: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.utcnow()
+            if self.in_flight.get(job.dedup_key) == job.id:
+                del self.in_flight[job.dedup_key]
+
+    def _prune(self):
+        now = datetime.utcnow()
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_at and (now - job.finished_at).total_seconds() > self.retention_seconds
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def stats(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def shutdown(self):
+        for job in list(self.jobs.values()):
+            self.cancel(job.id)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+job_manager = JobManager()
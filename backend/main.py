@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
 
 from routes import clients, analysis, recommendations, alerts, cron_jobs, dashboard
+from jobs import job_manager
 
 app = FastAPI(title="Cloud Cost Optimizer API", version="1.0.0")
 
@@ -25,6 +26,10 @@ app.include_router(dashboard.router)
 async def root():
     return {"message": "Cloud Cost Optimizer API", "version": "1.0.0"}
 
+@app.on_event("shutdown")
+async def shutdown():
+    job_manager.shutdown()
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow()}
@@ -1,68 +1,156 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from datetime import datetime
+from typing import Any, AsyncIterator, Dict
+import asyncio
+import json
+import threading
 import sys
 import os
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
 from bedrock_agent import BedrockOptimizationAgent
-from models import AnalysisRequest, Recommendation
+from models import AnalysisRequest, CloudClient, Recommendation
 from database import db
+from jobs import AnalysisJob, job_manager
+from config import ANALYSIS_STREAM_HEARTBEAT_SECONDS
 
 router = APIRouter(prefix="/api", tags=["analysis"])
 
-@router.post("/analyze")
-async def analyze(request: AnalysisRequest, background_tasks: BackgroundTasks):
+DEFAULT_ANALYSIS_QUERY = "Analyze my cloud infrastructure for cost optimization opportunities"
+
+def build_agent(client: CloudClient) -> BedrockOptimizationAgent:
+    return BedrockOptimizationAgent(
+        role_arn=client.roleArn or "",
+        region=client.region,
+        bedrock_region=client.region,
+        profile_name="sova-profile",
+        access_key_id=client.accessKeyId,
+        secret_access_key=client.secretAccessKey
+    )
+
+def run_analysis(client: CloudClient, job: AnalysisJob) -> Dict[str, Any]:
+    with build_agent(client) as agent:
+        return agent.analyze(job.query, progress=job.update_progress, should_cancel=job.is_cancelled)
+
+async def save_analysis(client_id: str, query: str, result: Dict[str, Any]) -> str:
+    analysis_id = f"analysis_{datetime.utcnow().timestamp()}"
+    analysis_data = {
+        "id": analysis_id,
+        "clientId": client_id,
+        "query": query,
+        "result": result,
+        "timestamp": datetime.utcnow()
+    }
+
+    await db.create_analysis_result(analysis_id, analysis_data)
+
+    if result.get("status") == "success":
+        analysis_text = result.get("analysis", "")
+
+        rec_id = f"rec_{datetime.utcnow().timestamp()}"
+        recommendation = Recommendation(
+            id=rec_id,
+            clientId=client_id,
+            title="Cost Optimization Recommendations",
+            description=analysis_text[:500],
+            category="cost_optimization",
+            impact="high",
+            monthlySavings=0.0,
+            status="pending",
+            createdAt=datetime.utcnow()
+        )
+        await db.create_recommendation(recommendation)
+
+    return analysis_id
+
+async def store_analysis(job: AnalysisJob, result: Dict[str, Any]):
+    job.analysis_id = await save_analysis(job.client_id, job.query, result)
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+async def stream_analysis_events(client: CloudClient, query: str) -> AsyncIterator[str]:
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancel_event = threading.Event()
+
+    def publish(event):
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def produce():
+        try:
+            with build_agent(client) as agent:
+                for event in agent.analyze_stream(query, should_cancel=cancel_event.is_set):
+                    publish(event)
+        except Exception as e:
+            publish({"type": "error", "message": str(e)})
+        finally:
+            publish(None)
+
+    loop.run_in_executor(job_manager.executor, produce)
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=ANALYSIS_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                break
+            if event["type"] == "done" and event["result"].get("status") != "cancelled":
+                event["analysisId"] = await save_analysis(client.id, query, event["result"])
+            yield format_sse(event)
+    finally:
+        cancel_event.set()
+
+@router.post("/analyze", status_code=202)
+async def analyze(request: AnalysisRequest):
     client = await db.get_client(request.clientId)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
-    
-    try:
-        agent = BedrockOptimizationAgent(
-            role_arn=client.roleArn or "",
-            region=client.region,
-            bedrock_region=client.region,
-            profile_name="sova-profile"
-        )
-        
-        result = agent.analyze(request.query)
-        
-        analysis_id = f"analysis_{datetime.utcnow().timestamp()}"
-        analysis_data = {
-            "id": analysis_id,
-            "clientId": request.clientId,
-            "query": request.query,
-            "result": result,
-            "timestamp": datetime.utcnow()
-        }
-        
-        await db.create_analysis_result(analysis_id, analysis_data)
-        
-        if result.get("status") == "success":
-            analysis_text = result.get("analysis", "")
-            
-            rec_id = f"rec_{datetime.utcnow().timestamp()}"
-            recommendation = Recommendation(
-                id=rec_id,
-                clientId=request.clientId,
-                title="Cost Optimization Recommendations",
-                description=analysis_text[:500],
-                category="cost_optimization",
-                impact="high",
-                monthlySavings=0.0,
-                status="pending",
-                createdAt=datetime.utcnow()
-            )
-            await db.create_recommendation(recommendation)
-        
-        return {
-            "analysisId": analysis_id,
-            "status": result.get("status"),
-            "message": "Analysis completed successfully"
-        }
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+    job, created = job_manager.submit(
+        request.clientId,
+        request.query,
+        lambda job: run_analysis(client, job),
+        store_analysis
+    )
+
+    return {
+        "jobId": job.id,
+        "status": job.status,
+        "deduplicated": not created,
+        "message": "Analysis queued" if created else "An identical analysis is already in progress"
+    }
+
+@router.get("/analyze/stream")
+async def analyze_stream(clientId: str, query: str = DEFAULT_ANALYSIS_QUERY):
+    client = await db.get_client(clientId)
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    return StreamingResponse(
+        stream_analysis_events(client, query),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 @router.get("/analysis/{analysis_id}")
 async def get_analysis(analysis_id: str):
@@ -39,6 +39,57 @@ export interface BackendCloudClient {
   monthlyCost: number;
 }
 
+export type AnalysisJobStatus = 'queued' | 'running' | 'cancelling' | 'completed' | 'failed' | 'cancelled';
+
+export interface AnalysisJob {
+  jobId: string;
+  clientId: string;
+  query: string;
+  status: AnalysisJobStatus;
+  progress: {
+    phase?: 'model' | 'tools';
+    iteration?: number;
+    max_iterations?: number;
+    tool_calls?: number;
+    tools?: string[];
+  };
+  analysisId?: string | null;
+  result?: { status?: string; analysis?: string; message?: string } | null;
+  error?: string | null;
+}
+
+export type AnalysisStreamEvent =
+  | { type: 'iteration_start'; iteration: number; max_iterations: number }
+  | { type: 'token'; iteration: number; text: string }
+  | { type: 'tool_start'; id: string; tool: string; input: Record<string, unknown> }
+  | { type: 'tool_end'; id: string; tool: string; status: string; duration_ms: number }
+  | {
+      type: 'iteration_end';
+      iteration: number;
+      model_ms: number;
+      first_token_ms: number | null;
+      tool_ms: number;
+      tool_calls: number;
+      duration_ms: number;
+    }
+  | { type: 'done'; result: { status: string; analysis?: string; message?: string }; analysisId?: string }
+  | { type: 'error'; message: string };
+
+const ANALYSIS_STREAM_EVENTS: AnalysisStreamEvent['type'][] = [
+  'iteration_start',
+  'token',
+  'tool_start',
+  'tool_end',
+  'iteration_end',
+  'done',
+  'error',
+];
+
+const JOB_POLL_INTERVAL_MS = 2000;
+const TERMINAL_JOB_STATUSES: AnalysisJobStatus[] = ['completed', 'failed', 'cancelled'];
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
 const handleResponse = async (response: Response) => {
   if (!response.ok) {
     const error = await response.json().catch(() => ({ detail: 'Unknown error' }));
@@ -179,20 +230,57 @@ export const api = {
     }
   },
 
-  async analyze(clientId: string, query: string = 'Analyze my cloud infrastructure for cost optimization opportunities') {
+  async startAnalysis(clientId: string, query: string): Promise<AnalysisJob> {
+    const response = await fetch(`${API_BASE_URL}/api/analyze`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ query, clientId }),
+    });
+    return handleResponse(response);
+  },
+
+  async getJob(jobId: string): Promise<AnalysisJob> {
+    const response = await fetch(`${API_BASE_URL}/api/jobs/${jobId}`);
+    return handleResponse(response);
+  },
+
+  async cancelAnalysis(jobId: string): Promise<AnalysisJob> {
+    const response = await fetch(`${API_BASE_URL}/api/jobs/${jobId}`, { method: 'DELETE' });
+    return handleResponse(response);
+  },
+
+  async waitForJob(jobId: string, onProgress?: (job: AnalysisJob) => void): Promise<AnalysisJob> {
+    while (true) {
+      const job = await this.getJob(jobId);
+      onProgress?.(job);
+      if (TERMINAL_JOB_STATUSES.includes(job.status)) {
+        return job;
+      }
+      await sleep(JOB_POLL_INTERVAL_MS);
+    }
+  },
+
+  async analyze(
+    clientId: string,
+    query: string = 'Analyze my cloud infrastructure for cost optimization opportunities',
+    onProgress?: (job: AnalysisJob) => void
+  ) {
     try {
-      const response = await fetch(`${API_BASE_URL}/api/analyze`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ query, clientId }),
-      });
-      
-      const result = await handleResponse(response);
-      
+      const started = await this.startAnalysis(clientId, query);
+      const job = await this.waitForJob(started.jobId, onProgress);
+
+      if (job.status !== 'completed') {
+        return {
+          success: false,
+          message: job.status === 'cancelled' ? 'Analysis cancelled' : job.error || 'Analysis failed',
+          analysisId: job.analysisId,
+        };
+      }
+
       return {
         success: true,
-        message: 'Analysis completed successfully',
-        analysisId: result.analysisId,
+        message: job.result?.status === 'success' ? 'Analysis completed successfully' : job.result?.message || 'Analysis finished',
+        analysisId: job.analysisId,
       };
     } catch (error) {
       return {
@@ -211,32 +299,21 @@ export const api = {
     }
   },
 
-  async chatWithAI(userMessage: string, clientId?: string) {
+  async chatWithAI(userMessage: string, clientId?: string, onProgress?: (job: AnalysisJob) => void) {
     try {
-      const response = await fetch(`${API_BASE_URL}/api/analyze`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          query: userMessage,
-          clientId: clientId || 'default',
-        }),
-      });
-      
-      const result = await handleResponse(response);
-      
-      if (result.analysisId) {
-        const analysisResponse = await fetch(`${API_BASE_URL}/api/analysis/${result.analysisId}`);
-        const analysisData = await handleResponse(analysisResponse);
-        
+      const started = await this.startAnalysis(clientId || 'default', userMessage);
+      const job = await this.waitForJob(started.jobId, onProgress);
+
+      if (job.status === 'completed') {
         return {
           success: true,
-          message: analysisData.result?.analysis || 'Analysis completed',
+          message: job.result?.analysis || job.result?.message || 'Analysis completed',
         };
       }
-      
+
       return {
         success: false,
-        message: 'No analysis result available',
+        message: job.status === 'cancelled' ? 'Analysis cancelled' : job.error || 'No analysis result available',
       };
     } catch (error) {
       return {
@@ -246,6 +323,37 @@ export const api = {
     }
   },
 
+  streamAnalysis(
+    clientId: string,
+    query: string,
+    onEvent: (event: AnalysisStreamEvent) => void
+  ): () => void {
+    const params = new URLSearchParams({ clientId, query });
+    const source = new EventSource(`${API_BASE_URL}/api/analyze/stream?${params}`);
+
+    ANALYSIS_STREAM_EVENTS.forEach(type => {
+      source.addEventListener(type, (message: MessageEvent) => {
+        if (!message.data) {
+          return;
+        }
+        const event: AnalysisStreamEvent = JSON.parse(message.data);
+        onEvent(event);
+        if (event.type === 'done' || event.type === 'error') {
+          source.close();
+        }
+      });
+    });
+
+    source.onerror = () => {
+      if (source.readyState !== EventSource.CLOSED) {
+        source.close();
+        onEvent({ type: 'error', message: 'Analysis stream disconnected' });
+      }
+    };
+
+    return () => source.close();
+  },
+
   async connectCloudProvider(data: any) {
     return this.addCloudClient(data);
   },
@@ -1,16 +1,191 @@
 import json
 import asyncio
+import inspect
 import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import Callable, Generator, Iterator, List, Dict, Any, Optional, Union
 import sys
 import boto3
 from botocore.exceptions import ClientError
+from context_compaction import ContextCompactor, fetch_tool_result, tool_result_store
+from session_cache import session_cache
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+AGENT_TOOL_CONCURRENCY = int(os.getenv("AGENT_TOOL_CONCURRENCY", "8"))
+AGENT_TOOL_TIMEOUT_SECONDS = float(os.getenv("AGENT_TOOL_TIMEOUT_SECONDS", "120"))
+AGENT_HIDDEN_PARAMETERS = {'role_arn', 'concurrency'}
+SYSTEM_PROMPT = (
+    "You are an AWS cost optimization analyst with read-only access to one AWS account through the tools provided. "
+    "Gather evidence with the fewest tool calls that answer the question: prefer fleet-wide batch tools "
+    "(get_ec2_metrics_batch, get_lambda_utilization, get_s3_bucket_size without a bucket, query_inventory) over "
+    "per-resource calls, and request independent tools in the same turn. Base every recommendation on the data "
+    "returned, quantify savings where the data allows, and say which data was missing or failed. Large tool results "
+    "arrive summarized with a result_handle; call fetch_tool_result only when a summary lacks a detail you need."
+)
+TOOL_DESCRIPTIONS = {
+    'get_ec2_instances': "Retrieve all EC2 instances with metadata including state, type, launch time, and tags. Use this to analyze compute resources.",
+    'get_ec2_tags': "List EC2 resource tags (resource ID, type, key, value). Use this to find untagged or mis-tagged resources for cost allocation.",
+    'get_ec2_cpu_utilization': "Get CPU utilization metrics for a specific EC2 instance over the past 7 days. Use this to identify underutilized instances.",
+    'get_ec2_metrics_batch': "Get CPU, network and EBS metrics for many EC2 instances in one call (defaults to every running instance). Prefer this over per-instance get_ec2_cpu_utilization for fleet-wide utilization analysis.",
+    'get_rds_instances': "Retrieve all RDS database instances with configuration and status. Use this to analyze database resources.",
+    'get_rds_clusters': "Retrieve all RDS/Aurora clusters with engine, status and members. Use this alongside get_rds_instances for Aurora workloads.",
+    'get_lambda_functions': "List all Lambda functions with configuration details. Use this to identify unused or oversized functions.",
+    'get_lambda_function_config': "Get the full configuration of one Lambda function.",
+    'get_lambda_utilization': "Get invocations, errors, throttles, average/p99/max duration and GB-seconds for every Lambda function in one call, joined with memory size and timeout. Flags idle, throttled, error-prone and near-timeout functions. Use this for Lambda memory rightsizing and finding unused functions.",
+    'get_s3_buckets': "List all S3 buckets with metadata including versioning, encryption, and lifecycle policies. Use this for storage optimization.",
+    'get_s3_bucket_size': "Get S3 storage bytes per storage class (Standard, IA, Glacier, Intelligent-Tiering, ...) and object counts. Omit bucket_name for a compact matrix of every bucket with totals per region and storage class; use this for storage-tier optimization.",
+    'get_ecs_clusters': "List ECS clusters with running/pending task and service counts.",
+    'get_ecs_tasks': "List the tasks of one ECS cluster with their task definition, CPU and memory.",
+    'get_ecs_overview': "Retrieve every ECS cluster with its services (desired/running counts, task definitions) and tasks in one call. Use this to analyze container workloads.",
+    'get_cloudwatch_metrics': "List the CloudWatch metrics available in a namespace (e.g. AWS/EC2), with their dimensions. Use this to discover what can be queried with get_metric_statistics.",
+    'get_metric_statistics': "Get statistics for one CloudWatch metric and dimension set over a time window.",
+    'get_log_groups': "List CloudWatch Log Groups with storage size. Use this to identify expensive log storage.",
+    'get_log_streams': "List the most recently active log streams of one log group.",
+    'filter_log_events': "Scan one log group for events matching a filter pattern. Use aggregate='pattern' or 'stream' to get counts instead of raw events; prefer run_logs_insights_query for questions spanning many log groups.",
+    'run_logs_insights_query': "Run a CloudWatch Logs Insights query server-side across many log groups and return the aggregated result table. Prefer this over raw log scans for counts, error rates and top-N questions.",
+    'get_cost_and_usage': "Retrieve AWS cost and usage data from Cost Explorer. Use this to analyze spending patterns.",
+    'get_cost_forecast': "Get forecasted AWS costs for the next 3 months. Use this to predict future spending.",
+    'get_cost_by_service': "Get cost breakdown by AWS service. Use this to identify which services cost the most.",
+    'get_cost_tags': "List the values of one cost allocation tag seen in the last 30 days. Use these with get_cost_and_usage group_by [{\"Type\": \"TAG\", \"Key\": ...}] to attribute spend to teams, environments or projects.",
+    'query_inventory': "Filter and group an inventory (ec2_instances, rds_instances, rds_clusters, lambda_functions, log_groups, ec2_tags) without returning every record. Use group_by for counts per type/state/AZ/tag and filters to narrow rows.",
+    'fetch_tool_result': "Read raw records from an earlier tool result that was summarized or evicted from the conversation, by its result_handle. Use path to select a nested field (e.g. data or data.resources) and offset/limit to page through it.",
+    'sync_inventory': "Compare an inventory with the previous snapshot and return only added, removed and changed resources plus a grouped summary. Use this for repeat analyses instead of re-reading full inventories.",
+}
+PARAMETER_DESCRIPTIONS = {
+    'region': "AWS region to query (defaults to the agent's region)",
+    'regions': "Query several regions in parallel: 'all' for every enabled region, or a comma-separated list. Overrides region.",
+    'max_items': "Stop after this many records; the response reports max_items_reached",
+    'start_hours_ago': "Hours of history to retrieve",
+    'period': "Datapoint period in seconds",
+    'limit': "Maximum rows to return",
+    'start_date': "Start date in YYYY-MM-DD format",
+    'end_date': "End date in YYYY-MM-DD format",
+    'granularity': "Time granularity: DAILY or MONTHLY",
+    'instance_id': "EC2 instance ID (e.g., i-1234567890abcdef0)",
+    'instance_ids': "EC2 instance IDs; omit to use all running instances",
+    'include_series': "Return aligned datapoint series in addition to summary statistics",
+    'include_tasks': "Include individual tasks for each cluster",
+    'fields': "Comma-separated enrichment fields to fetch: region, versioning, encryption, lifecycle_rules. Omit for all; pass an empty string for names only.",
+    'bucket_name': "Single bucket to size. Omit to size all buckets.",
+    'function_name': "Lambda function name or ARN",
+    'function_names': "Limit to these functions (default: all functions)",
+    'cluster_name': "ECS cluster name or ARN",
+    'namespace': "CloudWatch namespace, e.g. AWS/EC2",
+    'metric_name': "CloudWatch metric name, e.g. CPUUtilization",
+    'dimensions': "Metric dimensions as [{\"Name\": ..., \"Value\": ...}]",
+    'statistics': "Statistics to return, e.g. Average, Maximum, Sum",
+    'log_group_name': "CloudWatch log group name",
+    'filter_pattern': "CloudWatch Logs filter pattern; empty matches every event",
+    'aggregate': "'pattern' to count normalized messages or 'stream' to count per log stream instead of returning raw events",
+    'incremental': "Only return events newer than the previous call with the same log group and pattern",
+    'top_n': "Number of groups to return when aggregating",
+    'max_events': "Maximum events to scan",
+    'query_string': "Logs Insights query, e.g. 'stats count(*) by bin(1h)'",
+    'log_group_names': "Log groups to query; omit to use every log group (optionally filtered by log_group_prefix)",
+    'log_group_prefix': "Only query log groups whose name starts with this prefix",
+    'timeout_seconds': "Seconds to wait for the query to complete",
+    'tag_key': "Cost allocation tag key, e.g. Environment",
+    'metric': "Cost metric to forecast, e.g. UNBLENDED_COST",
+    'data_type': "Inventory to use, e.g. ec2_instances",
+    'filters': "Column conditions, e.g. {\"state\": \"running\", \"memory_size\": {\"gte\": 1024}, \"tag:env\": [\"prod\"], \"tag:owner\": {\"exists\": false}}",
+    'sum_columns': "Numeric columns to sum per group",
+    'columns': "Columns to return for matching rows",
+    'max_changes': "Maximum resources to list per change category",
+}
+TOOL_PARAMETER_DESCRIPTIONS = {
+    'get_ec2_metrics_batch': {
+        'metrics': "Subset of cpu_utilization, cpu_utilization_max, network_in, network_out, ebs_read_ops, ebs_write_ops",
+    },
+    'get_cost_and_usage': {
+        'metrics': "Cost Explorer metrics, e.g. UnblendedCost, UsageQuantity",
+        'group_by': "Cost Explorer groupings, e.g. [{\"Type\": \"DIMENSION\", \"Key\": \"SERVICE\"}]",
+    },
+    'query_inventory': {
+        'group_by': "Columns or tag:<Key> to group by; returns counts per group",
+        'limit': "Maximum rows or groups to return",
+    },
+    'get_s3_bucket_size': {
+        'region': "Region of the bucket when bucket_name is given (defaults to the agent's region)",
+    },
+    'fetch_tool_result': {
+        'result_handle': "result_handle from an earlier tool result",
+        'path': "Dot-separated keys or list indexes to the field to read, e.g. data.rows",
+        'offset': "Index of the first list item or mapping key to return",
+        'limit': "Maximum items to return",
+    },
+}
+AGENT_LOCAL_TOOLS = {'fetch_tool_result': fetch_tool_result}
+class ToolCatalog:
+    __slots__ = ("functions", "tool_specs", "model_tools", "model_tools_json", "region_tools")
+    def __init__(self, registry: Dict[str, Any]):
+        self.functions = {name: tool.func or tool.async_func for name, tool in registry.items()}
+        self.tool_specs = [build_tool_spec(name, tool.parameters) for name, tool in registry.items()]
+        self.model_tools = convert_tools_for_model(self.tool_specs)
+        self.model_tools_json = json.dumps(self.model_tools)
+        self.region_tools = {name for name, tool in registry.items() if 'region' in tool.parameters['properties']}
+def build_tool_spec(name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    overrides = TOOL_PARAMETER_DESCRIPTIONS.get(name, {})
+    properties = {}
+    for param, schema in parameters['properties'].items():
+        if param in AGENT_HIDDEN_PARAMETERS:
+            continue
+        description = overrides.get(param) or PARAMETER_DESCRIPTIONS.get(param)
+        properties[param] = {**schema, "description": description} if description else dict(schema)
+        if param == 'region':
+            properties[param].pop('default', None)
+    spec = {
+        "name": name,
+        "description": TOOL_DESCRIPTIONS.get(name, name.replace('_', ' ').capitalize()),
+        "inputSchema": {"json": {"type": "object", "properties": properties}}
+    }
+    required = [param for param in parameters['required'] if param not in AGENT_HIDDEN_PARAMETERS]
+    if required:
+        spec["inputSchema"]["json"]["required"] = required
+    return {"toolSpec": spec}
+def encode_json_object(fields: Dict[str, Any], encoded: Dict[str, str]) -> str:
+    parts = [f"{json.dumps(key)}: {json.dumps(value)}" for key, value in fields.items() if key not in encoded]
+    parts.extend(f"{json.dumps(key)}: {value}" for key, value in encoded.items())
+    return "{" + ", ".join(parts) + "}"
+def convert_tools_for_model(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    openai_tools = []
+    for tool in tools:
+        tool_spec = tool.get("toolSpec", {})
+        input_schema = tool_spec.get("inputSchema", {}).get("json", {})
+        openai_tool = {
+            "type": "function",
+            "function": {
+                "name": tool_spec.get("name"),
+                "description": tool_spec.get("description"),
+                "parameters": input_schema
+            }
+        }
+        openai_tools.append(openai_tool)
+    return openai_tools
+_tool_catalog: Optional[ToolCatalog] = None
+_tool_catalog_lock = threading.Lock()
+def get_tool_catalog() -> ToolCatalog:
+    global _tool_catalog
+    with _tool_catalog_lock:
+        if _tool_catalog is None:
+            try:
+                import tools
+            except ImportError as e:
+                logger.error(f"Failed to import MCP tools: {e}")
+                raise
+            registry = dict(tools.tool_registry)
+            for name, func in AGENT_LOCAL_TOOLS.items():
+                registry[name] = tools.RegisteredTool(name, func, tools.tool_parameters(inspect.signature(func)))
+                registry[name].func = func
+            _tool_catalog = ToolCatalog(registry)
+            logger.info(f"Built tool catalog with {len(_tool_catalog.functions)} tools")
+        return _tool_catalog
 class BedrockOptimizationAgent:
     def __init__(
         self,
@@ -18,8 +193,14 @@ class BedrockOptimizationAgent:
         region: str = "ap-south-1",
         bedrock_region: str = "ap-south-1",
         model_id: str = "openai.gpt-oss-120b-1:0",
-        profile_name: str = "sova-profile"
+        profile_name: str = "sova-profile",
+        tool_concurrency: int = AGENT_TOOL_CONCURRENCY,
+        tool_timeout: float = AGENT_TOOL_TIMEOUT_SECONDS,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None
     ):
+        if not role_arn and access_key_id and secret_access_key:
+            role_arn = session_cache.register_access_keys(access_key_id, secret_access_key)
         self.role_arn = role_arn
         self.region = region
         self.model_id = model_id
@@ -30,249 +211,39 @@ class BedrockOptimizationAgent:
             region_name=bedrock_region
         )
         self.conversation_history = []
-        self.data_cache = {}
+        self.tool_timeout = tool_timeout
+        self.compactor = ContextCompactor(role_arn)
+        self.tool_executor = ThreadPoolExecutor(max_workers=max(1, tool_concurrency), thread_name_prefix="agent-tool")
         logger.info(f"Initialized Bedrock Agent with model: {model_id}")
-    def _import_mcp_tools(self):
-        try:
-            import tools
-            def get_func(name):
-                obj = getattr(tools, name)
-                if hasattr(obj, 'fn'):
-                    return obj.fn
-                elif hasattr(obj, 'func'):
-                    return obj.func
-                elif callable(obj):
-                    return obj
-                else:
-                    raise AttributeError(f"Cannot extract callable from {name}")
-            return {
-                'get_ec2_instances': get_func('get_ec2_instances'),
-                'get_ec2_cpu_utilization': get_func('get_ec2_cpu_utilization'),
-                'get_ec2_tags': get_func('get_ec2_tags'),
-                'get_rds_instances': get_func('get_rds_instances'),
-                'get_rds_clusters': get_func('get_rds_clusters'),
-                'get_lambda_functions': get_func('get_lambda_functions'),
-                'get_lambda_function_config': get_func('get_lambda_function_config'),
-                'get_s3_buckets': get_func('get_s3_buckets'),
-                'get_s3_bucket_size': get_func('get_s3_bucket_size'),
-                'get_ecs_clusters': get_func('get_ecs_clusters'),
-                'get_ecs_tasks': get_func('get_ecs_tasks'),
-                'get_cloudwatch_metrics': get_func('get_cloudwatch_metrics'),
-                'get_metric_statistics': get_func('get_metric_statistics'),
-                'get_log_groups': get_func('get_log_groups'),
-                'get_log_streams': get_func('get_log_streams'),
-                'filter_log_events': get_func('filter_log_events'),
-                'get_cost_and_usage': get_func('get_cost_and_usage'),
-                'get_cost_forecast': get_func('get_cost_forecast'),
-                'get_cost_by_service': get_func('get_cost_by_service'),
-                'get_cost_tags': get_func('get_cost_tags')
-            }
-        except ImportError as e:
-            logger.error(f"Failed to import MCP tools: {e}")
-            raise
+    def close(self):
+        self.tool_executor.shutdown(wait=False, cancel_futures=True)
+    def __enter__(self) -> "BedrockOptimizationAgent":
+        return self
+    def __exit__(self, *exc_info):
+        self.close()
+    def _import_mcp_tools(self) -> Dict[str, Any]:
+        return get_tool_catalog().functions
     def _create_tool_definitions(self) -> List[Dict[str, Any]]:
-        return [
-            {
-                "toolSpec": {
-                    "name": "get_ec2_instances",
-                    "description": "Retrieve all EC2 instances with metadata including state, type, launch time, and tags. Use this to analyze compute resources.",
-                    "inputSchema": {
-                        "json": {
-                            "type": "object",
-                            "properties": {
-                                "region": {
-                                    "type": "string",
-                                    "description": "AWS region to query",
-                                    "default": self.region
-                                }
-                            }
-                        }
-                    }
-                }
-            },
-            {
-                "toolSpec": {
-                    "name": "get_ec2_cpu_utilization",
-                    "description": "Get CPU utilization metrics for a specific EC2 instance over the past 7 days. Use this to identify underutilized instances.",
-                    "inputSchema": {
-                        "json": {
-                            "type": "object",
-                            "properties": {
-                                "instance_id": {
-                                    "type": "string",
-                                    "description": "EC2 instance ID (e.g., i-1234567890abcdef0)"
-                                },
-                                "start_hours_ago": {
-                                    "type": "integer",
-                                    "description": "Hours of history to retrieve",
-                                    "default": 168
-                                },
-                                "region": {
-                                    "type": "string",
-                                    "description": "AWS region",
-                                    "default": self.region
-                                }
-                            },
-                            "required": ["instance_id"]
-                        }
-                    }
-                }
-            },
-            {
-                "toolSpec": {
-                    "name": "get_rds_instances",
-                    "description": "Retrieve all RDS database instances with configuration and status. Use this to analyze database resources.",
-                    "inputSchema": {
-                        "json": {
-                            "type": "object",
-                            "properties": {
-                                "region": {
-                                    "type": "string",
-                                    "description": "AWS region to query",
-                                    "default": self.region
-                                }
-                            }
-                        }
-                    }
-                }
-            },
-            {
-                "toolSpec": {
-                    "name": "get_lambda_functions",
-                    "description": "List all Lambda functions with configuration details. Use this to identify unused or oversized functions.",
-                    "inputSchema": {
-                        "json": {
-                            "type": "object",
-                            "properties": {
-                                "region": {
-                                    "type": "string",
-                                    "description": "AWS region to query",
-                                    "default": self.region
-                                }
-                            }
-                        }
-                    }
-                }
-            },
-            {
-                "toolSpec": {
-                    "name": "get_s3_buckets",
-                    "description": "List all S3 buckets with metadata including versioning, encryption, and lifecycle policies. Use this for storage optimization.",
-                    "inputSchema": {
-                        "json": {
-                            "type": "object",
-                            "properties": {}
-                        }
-                    }
-                }
-            },
-            {
-                "toolSpec": {
-                    "name": "get_cost_and_usage",
-                    "description": "Retrieve AWS cost and usage data from Cost Explorer. Use this to analyze spending patterns.",
-                    "inputSchema": {
-                        "json": {
-                            "type": "object",
-                            "properties": {
-                                "start_date": {
-                                    "type": "string",
-                                    "description": "Start date in YYYY-MM-DD format"
-                                },
-                                "end_date": {
-                                    "type": "string",
-                                    "description": "End date in YYYY-MM-DD format"
-                                },
-                                "granularity": {
-                                    "type": "string",
-                                    "description": "Time granularity: DAILY or MONTHLY",
-                                    "default": "MONTHLY"
-                                }
-                            }
-                        }
-                    }
-                }
-            },
-            {
-                "toolSpec": {
-                    "name": "get_cost_forecast",
-                    "description": "Get forecasted AWS costs for the next 3 months. Use this to predict future spending.",
-                    "inputSchema": {
-                        "json": {
-                            "type": "object",
-                            "properties": {}
-                        }
-                    }
-                }
-            },
-            {
-                "toolSpec": {
-                    "name": "get_cost_by_service",
-                    "description": "Get cost breakdown by AWS service. Use this to identify which services cost the most.",
-                    "inputSchema": {
-                        "json": {
-                            "type": "object",
-                            "properties": {}
-                        }
-                    }
-                }
-            },
-            {
-                "toolSpec": {
-                    "name": "get_log_groups",
-                    "description": "List CloudWatch Log Groups with storage size. Use this to identify expensive log storage.",
-                    "inputSchema": {
-                        "json": {
-                            "type": "object",
-                            "properties": {
-                                "region": {
-                                    "type": "string",
-                                    "description": "AWS region to query",
-                                    "default": self.region
-                                }
-                            }
-                        }
-                    }
-                }
-            }
-        ]
+        return get_tool_catalog().tool_specs
     def _convert_tools_for_model(self, tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        openai_tools = []
-        for tool in tools:
-            tool_spec = tool.get("toolSpec", {})
-            input_schema = tool_spec.get("inputSchema", {}).get("json", {})
-            openai_tool = {
-                "type": "function",
-                "function": {
-                    "name": tool_spec.get("name"),
-                    "description": tool_spec.get("description"),
-                    "parameters": input_schema
-                }
-            }
-            openai_tools.append(openai_tool)
-        return openai_tools
+        return convert_tools_for_model(tools)
     def _call_mcp_tool(self, tool_name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
-        cache_key = f"{tool_name}:{json.dumps(parameters, sort_keys=True)}"
-        if cache_key in self.data_cache:
-            logger.info(f"Using cached data for {tool_name}")
-            return self.data_cache[cache_key]
-        tools = self._import_mcp_tools()
-        if tool_name not in tools:
+        catalog = get_tool_catalog()
+        if tool_name not in catalog.functions:
             return {
                 "status": "error",
                 "error_message": f"Tool {tool_name} not found"
             }
         try:
             parameters['role_arn'] = self.role_arn
-            if 'region' in parameters and not parameters['region']:
+            if tool_name in catalog.region_tools and not parameters.get('region'):
                 parameters['region'] = self.region
             logger.info(f"Calling MCP tool: {tool_name} with params: {parameters}")
-            tool_func = tools[tool_name]
+            tool_func = catalog.functions[tool_name]
             if asyncio.iscoroutinefunction(tool_func):
                 result = asyncio.run(tool_func(**parameters))
             else:
                 result = tool_func(**parameters)
-            if result.get('status') == 'success':
-                self.data_cache[cache_key] = result
             return result
         except Exception as e:
             logger.error(f"Error calling tool {tool_name}: {str(e)}")
@@ -282,77 +253,252 @@ class BedrockOptimizationAgent:
                 "status": "error",
                 "error_message": str(e)
             }
+    def _timed_tool_call(
+        self,
+        tool_name: str,
+        parameters: Dict[str, Any],
+        clock: Optional[Dict[str, float]] = None
+    ) -> tuple:
+        if clock is not None:
+            clock['started'] = time.monotonic()
+        started = time.perf_counter()
+        result = self._call_mcp_tool(tool_name, parameters)
+        return result, time.perf_counter() - started
+    def _run_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> Generator[Dict[str, Any], None, List[tuple]]:
+        pending = {}
+        order = []
+        for tool_call in tool_calls:
+            tool_name = tool_call.get('function', {}).get('name')
+            tool_args_str = tool_call.get('function', {}).get('arguments', '{}')
+            try:
+                tool_input = json.loads(tool_args_str)
+            except json.JSONDecodeError:
+                tool_input = {}
+            logger.info(f"Executing tool: {tool_name}")
+            clock = {}
+            future = self.tool_executor.submit(self._timed_tool_call, tool_name, dict(tool_input), clock)
+            pending[future] = (tool_call.get('id'), tool_name, tool_input, clock)
+            order.append(future)
+            yield {"type": "tool_start", "id": tool_call.get('id'), "tool": tool_name, "input": tool_input}
+        def deadline(future) -> Optional[float]:
+            started = pending[future][3].get('started')
+            return None if started is None else started + self.tool_timeout
+        results = {}
+        waiting = set(order)
+        while waiting:
+            deadlines = [deadline(future) for future in waiting]
+            next_deadline = min(
+                (value for value in deadlines if value is not None),
+                default=time.monotonic() + self.tool_timeout
+            )
+            done, _ = wait(waiting, timeout=max(0.0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in [future for future in order if future in done]:
+                tool_call_id, tool_name, _, _ = pending[future]
+                results[future], seconds = future.result()
+                waiting.discard(future)
+                yield {
+                    "type": "tool_end",
+                    "id": tool_call_id,
+                    "tool": tool_name,
+                    "status": results[future].get('status', 'unknown') if isinstance(results[future], dict) else 'unknown',
+                    "duration_ms": round(seconds * 1000, 1)
+                }
+            now = time.monotonic()
+            expired = [
+                future for future in order
+                if future in waiting and deadline(future) is not None and deadline(future) <= now
+            ]
+            for future in expired:
+                tool_call_id, tool_name, _, _ = pending[future]
+                logger.warning(f"Tool {tool_name} timed out after {self.tool_timeout:.0f}s")
+                results[future] = {
+                    "status": "error",
+                    "error_code": "ToolTimeout",
+                    "error_message": (
+                        f"{tool_name} did not finish within {self.tool_timeout:.0f}s. It keeps running in the "
+                        f"background; call it again later to pick up its cached result, or narrow the request."
+                    ),
+                    "recoverable": True
+                }
+                waiting.discard(future)
+                yield {
+                    "type": "tool_end",
+                    "id": tool_call_id,
+                    "tool": tool_name,
+                    "status": "timeout",
+                    "duration_ms": round(self.tool_timeout * 1000, 1)
+                }
+        return [(*pending[future][:3], results[future]) for future in order]
+    def _request_body(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[Union[List[Dict[str, Any]], str]],
+        max_tokens: int
+    ) -> str:
+        request_body = {
+            "max_tokens": max_tokens,
+            "messages": messages,
+            "temperature": 0.7
+        }
+        if isinstance(tools, str):
+            return encode_json_object(request_body, {"tools": tools})
+        if tools:
+            request_body["tools"] = tools
+        return json.dumps(request_body)
     def _invoke_bedrock(
         self,
         messages: List[Dict[str, Any]],
-        tools: Optional[List[Dict[str, Any]]] = None,
+        tools: Optional[Union[List[Dict[str, Any]], str]] = None,
         max_tokens: int = 4096
     ) -> Dict[str, Any]:
         try:
-            request_body = {
-                "max_tokens": max_tokens,
-                "messages": messages,
-                "temperature": 0.7
-            }
-            if tools:
-                request_body["tools"] = tools
             response = self.bedrock_runtime.invoke_model(
                 modelId=self.model_id,
-                body=json.dumps(request_body)
+                body=self._request_body(messages, tools, max_tokens)
             )
             response_body = json.loads(response['body'].read())
             return response_body
         except ClientError as e:
             logger.error(f"Bedrock invocation error: {str(e)}")
             raise
-    def analyze(self, user_prompt: str, max_iterations: int = 10) -> Dict[str, Any]:
+    def _stream_bedrock(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[Union[List[Dict[str, Any]], str]] = None,
+        max_tokens: int = 4096
+    ) -> Generator[str, None, Dict[str, Any]]:
+        try:
+            response = self.bedrock_runtime.invoke_model_with_response_stream(
+                modelId=self.model_id,
+                body=self._request_body(messages, tools, max_tokens)
+            )
+        except ClientError as e:
+            logger.error(f"Bedrock streaming invocation error: {str(e)}")
+            raise
+        content = []
+        tool_calls: Dict[int, Dict[str, Any]] = {}
+        finish_reason = None
+        for event in response['body']:
+            chunk = event.get('chunk')
+            if not chunk:
+                continue
+            for choice in json.loads(chunk['bytes']).get('choices', []):
+                delta = choice.get('delta') or {}
+                if delta.get('content'):
+                    content.append(delta['content'])
+                    yield delta['content']
+                for call_delta in delta.get('tool_calls') or []:
+                    call = tool_calls.setdefault(
+                        call_delta.get('index', len(tool_calls)),
+                        {"id": None, "type": "function", "function": {"name": "", "arguments": ""}}
+                    )
+                    if call_delta.get('id'):
+                        call['id'] = call_delta['id']
+                    function = call_delta.get('function') or {}
+                    call['function']['name'] += function.get('name') or ''
+                    call['function']['arguments'] += function.get('arguments') or ''
+                finish_reason = choice.get('finish_reason') or finish_reason
+        message = {"role": "assistant", "content": "".join(content)}
+        if tool_calls:
+            message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+        return {"choices": [{"message": message, "finish_reason": finish_reason}]}
+    def _run_analysis(
+        self,
+        user_prompt: str,
+        max_iterations: int,
+        should_cancel: Optional[Callable[[], bool]],
+        stream: bool
+    ) -> Iterator[Dict[str, Any]]:
         logger.info(f"Starting analysis for prompt: {user_prompt}")
+        def cancelled() -> Dict[str, Any]:
+            logger.info("Analysis cancelled")
+            return {
+                "type": "done",
+                "result": {
+                    "status": "cancelled",
+                    "message": "Analysis cancelled",
+                    "tool_calls": len(tool_results),
+                    "iterations": iteration
+                }
+            }
+        def elapsed_ms(since: float) -> float:
+            return round((time.perf_counter() - since) * 1000, 1)
         messages = [
             {
                 "role": "user",
-                "content": f"{system_prompt}\n\nUser Request: {user_prompt}"
+                "content": f"{SYSTEM_PROMPT}\n\nUser Request: {user_prompt}"
             }
         ]
-        tools = self._create_tool_definitions()
-        tools = self._convert_tools_for_model(tools)
+        tools = get_tool_catalog().model_tools_json
         iteration = 0
         tool_results = []
         while iteration < max_iterations:
             iteration += 1
             logger.info(f"Iteration {iteration}/{max_iterations}")
-            response = self._invoke_bedrock(messages, tools)
+            if should_cancel and should_cancel():
+                yield cancelled()
+                return
+            iteration_started = time.perf_counter()
+            first_token_ms = None
+            yield {"type": "iteration_start", "iteration": iteration, "max_iterations": max_iterations}
+            if stream:
+                chunks = self._stream_bedrock(messages, tools)
+                try:
+                    while True:
+                        text = next(chunks)
+                        if first_token_ms is None:
+                            first_token_ms = elapsed_ms(iteration_started)
+                        yield {"type": "token", "iteration": iteration, "text": text}
+                        if should_cancel and should_cancel():
+                            chunks.close()
+                            yield cancelled()
+                            return
+                except StopIteration as finished:
+                    response = finished.value
+            else:
+                response = self._invoke_bedrock(messages, tools)
+            model_ms = elapsed_ms(iteration_started)
             choice = response.get('choices', [{}])[0]
             message = choice.get('message', {})
             finish_reason = choice.get('finish_reason')
             tool_calls = message.get('tool_calls', [])
             content = message.get('content', '')
+            timing = {
+                "type": "iteration_end",
+                "iteration": iteration,
+                "model_ms": model_ms,
+                "first_token_ms": first_token_ms,
+                "tool_ms": 0.0,
+                "tool_calls": len(tool_calls)
+            }
             if finish_reason == 'stop' and not tool_calls:
                 logger.info("Agent completed analysis")
-                return {
-                    "status": "success",
-                    "analysis": content,
-                    "tool_calls": len(tool_results),
-                    "iterations": iteration,
-                    "timestamp": datetime.utcnow().isoformat()
+                yield {**timing, "duration_ms": elapsed_ms(iteration_started)}
+                yield {
+                    "type": "done",
+                    "result": {
+                        "status": "success",
+                        "analysis": content,
+                        "tool_calls": len(tool_results),
+                        "iterations": iteration,
+                        "timestamp": datetime.utcnow().isoformat()
+                    }
                 }
+                return
             elif tool_calls:
                 logger.info(f"Agent requesting {len(tool_calls)} tool calls")
+                if should_cancel and should_cancel():
+                    yield cancelled()
+                    return
                 messages.append({
                     "role": "assistant",
                     "content": content,
                     "tool_calls": tool_calls
                 })
+                tools_started = time.perf_counter()
+                completed = yield from self._run_tool_calls(tool_calls)
                 tool_messages = []
-                for tool_call in tool_calls:
-                    tool_name = tool_call.get('function', {}).get('name')
-                    tool_args_str = tool_call.get('function', {}).get('arguments', '{}')
-                    tool_call_id = tool_call.get('id')
-                    try:
-                        tool_input = json.loads(tool_args_str)
-                    except json.JSONDecodeError:
-                        tool_input = {}
-                    logger.info(f"Executing tool: {tool_name}")
-                    result = self._call_mcp_tool(tool_name, tool_input)
+                for tool_call_id, tool_name, tool_input, result in completed:
                     tool_results.append({
                         "tool": tool_name,
                         "input": tool_input,
@@ -361,19 +507,60 @@ class BedrockOptimizationAgent:
                     tool_messages.append({
                         "role": "tool",
                         "tool_call_id": tool_call_id,
-                        "content": json.dumps(result, default=str)
+                        "content": self.compactor.compact(tool_name, result)
                     })
                 messages.extend(tool_messages)
+                self.compactor.evict(messages, len(messages) - len(tool_messages) - 1)
+                yield {
+                    **timing,
+                    "tool_ms": elapsed_ms(tools_started),
+                    "duration_ms": elapsed_ms(iteration_started),
+                    "context_tokens": sum(self.compactor.message_tokens(message) for message in messages)
+                }
             else:
                 logger.warning(f"Unexpected finish reason: {finish_reason}")
+                yield {**timing, "duration_ms": elapsed_ms(iteration_started)}
                 break
         logger.warning(f"Max iterations ({max_iterations}) reached")
-        return {
-            "status": "partial",
-            "message": "Analysis incomplete - max iterations reached",
-            "tool_calls": len(tool_results),
-            "iterations": iteration
+        yield {
+            "type": "done",
+            "result": {
+                "status": "partial",
+                "message": "Analysis incomplete - max iterations reached",
+                "tool_calls": len(tool_results),
+                "iterations": iteration
+            }
         }
+    def analyze(
+        self,
+        user_prompt: str,
+        max_iterations: int = 10,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        should_cancel: Optional[Callable[[], bool]] = None
+    ) -> Dict[str, Any]:
+        state = {"phase": "model", "iteration": 0, "max_iterations": max_iterations, "tool_calls": 0}
+        for event in self._run_analysis(user_prompt, max_iterations, should_cancel, stream=False):
+            if event['type'] == 'done':
+                return event['result']
+            if event['type'] == 'iteration_start':
+                state.update(phase="model", iteration=event['iteration'])
+                state.pop("tools", None)
+            elif event['type'] == 'tool_start':
+                state.update(phase="tools", tools=state.get("tools", []) + [event['tool']])
+            elif event['type'] == 'tool_end':
+                state["tool_calls"] += 1
+                continue
+            else:
+                continue
+            if progress:
+                progress(dict(state))
+    def analyze_stream(
+        self,
+        user_prompt: str,
+        max_iterations: int = 10,
+        should_cancel: Optional[Callable[[], bool]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        return self._run_analysis(user_prompt, max_iterations, should_cancel, stream=True)
     def chat(self, user_message: str) -> str:
         try:
             result = self.analyze(user_message)
@@ -401,8 +588,10 @@ class BedrockOptimizationAgent:
             json.dump(self.conversation_history, f, indent=2)
         logger.info(f"Conversation saved to {filename}")
     def clear_cache(self):
-        self.data_cache.clear()
-        logger.info("Cache cleared")
+        import tools
+        removed = tools.result_cache.invalidate(role_arn=self.role_arn)
+        removed += tool_result_store.invalidate(owner=self.role_arn)
+        logger.info(f"Cache cleared ({removed} cached tool results)")
 def interactive_mode(agent: BedrockOptimizationAgent):
     print("\n" + "="*70)
     print("AWS BEDROCK OPTIMIZATION AGENT")
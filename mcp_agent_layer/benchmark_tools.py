@@ -0,0 +1,261 @@
+import json
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List
+BENCHMARK_ROLE_ARN = "arn:aws:iam::123456789012:role/BenchmarkRole"
+REGRESSION_METRICS = ['wall_ms', 'aws_calls', 'peak_kb', 'payload_kb']
+def start_local_aws(port: int, state_dir: str) -> subprocess.Popen:
+    try:
+        import moto.server
+    except ImportError:
+        print("❌ moto is required for benchmarks: pip install -r requirements-dev.txt")
+        sys.exit(2)
+    os.environ.update({
+        'AWS_ENDPOINT_URL': f"http://127.0.0.1:{port}",
+        'AWS_ACCESS_KEY_ID': 'benchmark',
+        'AWS_SECRET_ACCESS_KEY': 'benchmark',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+        'COST_STORE_PATH': os.path.join(state_dir, 'cost_store.sqlite3'),
+        'SNAPSHOT_STORE_PATH': os.path.join(state_dir, 'inventory_snapshots.sqlite3'),
+    })
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'moto.server', '-H', '127.0.0.1', '-p', str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    print(f"❌ Local AWS stand-in did not start on port {port}")
+    sys.exit(2)
+def seed_synthetic_account(
+    region: str,
+    instances: int,
+    buckets: int,
+    db_instances: int,
+    log_groups: int,
+    clusters: int
+) -> Dict[str, int]:
+    import boto3
+    started = time.perf_counter()
+    ec2 = boto3.client('ec2', region_name=region)
+    image_id = ec2.describe_images()['Images'][0]['ImageId']
+    instance_types = ['t3.micro', 't3.large', 'm5.large', 'm5.xlarge', 'c5.2xlarge', 'r5.large']
+    for i, offset in enumerate(range(0, instances, 500)):
+        count = min(500, instances - offset)
+        ec2.run_instances(
+            ImageId=image_id,
+            MinCount=count,
+            MaxCount=count,
+            InstanceType=instance_types[i % len(instance_types)],
+            TagSpecifications=[{
+                'ResourceType': 'instance',
+                'Tags': [
+                    {'Key': 'env', 'Value': ['prod', 'staging', 'dev'][i % 3]},
+                    {'Key': 'team', 'Value': f"team-{i % 7}"}
+                ]
+            }]
+        )
+    s3 = boto3.client('s3', region_name='us-east-1')
+    for i in range(buckets):
+        s3.create_bucket(Bucket=f"benchmark-bucket-{i:06d}")
+    rds = boto3.client('rds', region_name=region)
+    for i in range(db_instances):
+        rds.create_db_instance(
+            DBInstanceIdentifier=f"benchmark-db-{i:05d}",
+            DBInstanceClass=['db.t3.medium', 'db.r5.large'][i % 2],
+            Engine=['postgres', 'mysql'][i % 2],
+            MasterUsername='admin',
+            MasterUserPassword='benchmark-password',
+            AllocatedStorage=20 + i % 100
+        )
+    logs = boto3.client('logs', region_name=region)
+    for i in range(log_groups):
+        logs.create_log_group(logGroupName=f"/benchmark/service-{i:05d}")
+    ecs = boto3.client('ecs', region_name=region)
+    for i in range(clusters):
+        ecs.create_cluster(clusterName=f"benchmark-cluster-{i:04d}")
+    counts = {
+        'instances': instances,
+        'buckets': buckets,
+        'db_instances': db_instances,
+        'log_groups': log_groups,
+        'clusters': clusters,
+    }
+    print(f"🌱 Seeded {counts} in {time.perf_counter() - started:.1f}s")
+    return counts
+class ToolBenchmark:
+    def __init__(self, role_arn: str, region: str = "us-east-1", repeat: int = 3):
+        self.role_arn = role_arn
+        self.region = region
+        self.repeat = repeat
+        self.results: List[Dict[str, Any]] = []
+    def reset_caches(self):
+        import tools
+        tools.result_cache.invalidate()
+        tools.inventory_store.invalidate()
+        tools.cost_store.invalidate()
+        tools.snapshot_store.invalidate()
+    def measure(self, func, args, kwargs, trace_memory: bool) -> Dict[str, Any]:
+        import tools
+        self.reset_caches()
+        calls, retries, throttles = tools.resilience.calls, tools.resilience.retries, tools.resilience.throttles
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        wall = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+        if trace_memory:
+            tracemalloc.stop()
+        return {
+            'wall': wall,
+            'peak': peak,
+            'result': result,
+            'aws_calls': tools.resilience.calls - calls,
+            'retries': tools.resilience.retries - retries,
+            'throttles': tools.resilience.throttles - throttles,
+        }
+    def bench(self, name: str, func, *args, **kwargs) -> Dict[str, Any]:
+        print(f"\n⏱️  Benchmarking: {name}")
+        try:
+            timed = [self.measure(func, args, kwargs, trace_memory=False) for _ in range(self.repeat)]
+            traced = self.measure(func, args, kwargs, trace_memory=True)
+        except Exception as e:
+            print(f"   ❌ FAILED - {str(e)}")
+            entry = {'tool': name, 'status': 'failed', 'error': str(e)}
+            self.results.append(entry)
+            return entry
+        result = timed[-1]['result']
+        walls = [sample['wall'] for sample in timed]
+        entry = {
+            'tool': name,
+            'status': result.get('status', 'unknown') if isinstance(result, dict) else 'unknown',
+            'wall_ms': round(statistics.median(walls) * 1000, 1),
+            'wall_ms_min': round(min(walls) * 1000, 1),
+            'aws_calls': timed[-1]['aws_calls'],
+            'retries': timed[-1]['retries'],
+            'throttles': timed[-1]['throttles'],
+            'peak_kb': round(traced['peak'] / 1024, 1),
+            'payload_kb': round(len(json.dumps(result, default=str).encode()) / 1024, 1),
+        }
+        if entry['status'] != 'success' and isinstance(result, dict):
+            entry['error'] = result.get('error_message')
+        print(
+            f"   {'✅' if entry['status'] == 'success' else '⚠️ '} {entry['wall_ms']}ms median, "
+            f"{entry['aws_calls']} AWS calls, {entry['peak_kb']}KB peak, {entry['payload_kb']}KB payload"
+        )
+        self.results.append(entry)
+        return entry
+    def run_all(self):
+        import tools
+        print("=" * 70)
+        print("🚀 AWS OPTIMIZATION TOOLS - BENCHMARK SUITE")
+        print("=" * 70)
+        print(f"📅 Started: {datetime.utcnow().isoformat()}")
+        print(f"🔁 Timed runs per tool: {self.repeat} (plus one traced run for memory)")
+        arn, region = self.role_arn, self.region
+        self.bench("get_ec2_instances", tools.get_ec2_instances, arn, region)
+        self.bench("get_ec2_instances[max_items=100]", tools.get_ec2_instances, arn, region, max_items=100)
+        self.bench("get_ec2_tags", tools.get_ec2_tags, arn, region)
+        self.bench("get_ec2_metrics_batch", tools.get_ec2_metrics_batch, arn, start_hours_ago=24, include_series=False, region=region)
+        self.bench("get_rds_instances", tools.get_rds_instances, arn, region)
+        self.bench("get_s3_buckets", tools.get_s3_buckets, arn)
+        self.bench("get_s3_buckets[region,versioning]", tools.get_s3_buckets, arn, fields="region,versioning")
+        self.bench("get_s3_bucket_size[all]", tools.get_s3_bucket_size, arn)
+        self.bench("get_ecs_overview", tools.get_ecs_overview, arn, region)
+        self.bench("get_log_groups", tools.get_log_groups, arn, region)
+        self.bench("query_inventory[group_by]", tools.query_inventory, arn, "ec2_instances", group_by=["instance_type", "state"], region=region)
+        self.bench("sync_inventory", tools.sync_inventory, arn, "ec2_instances", region)
+        self.bench("get_cost_and_usage", tools.get_cost_and_usage, arn)
+        return self.results
+    def print_summary(self):
+        print("\n" + "=" * 70)
+        print("📋 BENCHMARK SUMMARY")
+        print("=" * 70)
+        print(f"{'tool':<38}{'wall ms':>10}{'calls':>8}{'peak KB':>11}{'payload KB':>12}")
+        for entry in self.results:
+            if entry['status'] == 'failed':
+                print(f"{entry['tool']:<38}{'FAILED':>10}")
+                continue
+            print(
+                f"{entry['tool']:<38}{entry['wall_ms']:>10}{entry['aws_calls']:>8}"
+                f"{entry['peak_kb']:>11}{entry['payload_kb']:>12}"
+            )
+    def compare(self, baseline: Dict[str, Any], threshold: float) -> List[str]:
+        previous = {entry['tool']: entry for entry in baseline.get('results', [])}
+        regressions = []
+        for entry in self.results:
+            before = previous.get(entry['tool'])
+            if not before or entry['status'] == 'failed' or before.get('status') == 'failed':
+                continue
+            for metric in REGRESSION_METRICS:
+                old, new = before.get(metric), entry.get(metric)
+                if old is None or new is None:
+                    continue
+                if new > old * (1 + threshold) and new - old > (1 if metric == 'aws_calls' else 0.5):
+                    regressions.append(f"{entry['tool']}: {metric} {old} -> {new}")
+        return regressions
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark AWS Optimization Tools against a local AWS stand-in')
+    parser.add_argument('--instances', type=int, default=1000, help='EC2 instances to seed (default: 1000)')
+    parser.add_argument('--buckets', type=int, default=200, help='S3 buckets to seed (default: 200)')
+    parser.add_argument('--db-instances', type=int, default=50, help='RDS instances to seed (default: 50)')
+    parser.add_argument('--log-groups', type=int, default=200, help='Log groups to seed (default: 200)')
+    parser.add_argument('--clusters', type=int, default=20, help='ECS clusters to seed (default: 20)')
+    parser.add_argument('--region', default='us-east-1', help='AWS Region (default: us-east-1)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per tool (default: 3)')
+    parser.add_argument('--port', type=int, default=5055, help='Port for the local AWS stand-in (default: 5055)')
+    parser.add_argument('--verbose', action='store_true', help='Keep INFO logging from the tools')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', help='Compare against a previous --output file')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed regression ratio (default: 0.25)')
+    args = parser.parse_args()
+    state_dir = tempfile.mkdtemp(prefix='tools-benchmark-')
+    server = start_local_aws(args.port, state_dir)
+    try:
+        seeded = seed_synthetic_account(
+            args.region, args.instances, args.buckets, args.db_instances, args.log_groups, args.clusters
+        )
+        import tools
+        if not args.verbose:
+            logging.getLogger().setLevel(logging.WARNING)
+        benchmark = ToolBenchmark(BENCHMARK_ROLE_ARN, args.region, args.repeat)
+        benchmark.run_all()
+        benchmark.print_summary()
+    finally:
+        server.terminate()
+        server.wait()
+    report = {'timestamp': datetime.utcnow().isoformat(), 'seeded': seeded, 'results': benchmark.results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = benchmark.compare(json.load(f), args.threshold)
+        if regressions:
+            print("\n❌ Regressions against baseline:")
+            for regression in regressions:
+                print(f"   - {regression}")
+        else:
+            print("\n✅ No regressions against baseline")
+    failed = any(entry['status'] == 'failed' for entry in benchmark.results)
+    sys.exit(1 if regressions or failed else 0)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+import aioboto3
+from botocore.config import Config
+logger = logging.getLogger(__name__)
+CLIENT_MAX_POOL_CONNECTIONS = int(os.getenv("CLIENT_MAX_POOL_CONNECTIONS", "50"))
+CLIENT_IDLE_SECONDS = int(os.getenv("CLIENT_IDLE_SECONDS", "900"))
+class RegisteredClient:
+    __slots__ = ("session", "context", "client", "created_at", "last_used", "uses", "in_use")
+    def __init__(self, session: aioboto3.Session, context, client):
+        self.session = session
+        self.context = context
+        self.client = client
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.uses = 0
+        self.in_use = 0
+class ClientRegistry:
+    def __init__(
+        self,
+        max_pool_connections: int = CLIENT_MAX_POOL_CONNECTIONS,
+        idle_seconds: int = CLIENT_IDLE_SECONDS
+    ):
+        self.max_pool_connections = max_pool_connections
+        self.idle_seconds = idle_seconds
+        self._entries: Dict[Tuple, RegisteredClient] = {}
+        self._pending: Dict[Tuple, asyncio.Future] = {}
+        self._owners: "weakref.WeakKeyDictionary[Any, aioboto3.Session]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.closed = 0
+        self.creation_seconds = 0.0
+        self.service_stats: Dict[str, Dict[str, int]] = {}
+    def _count(self, service: str, counter: str):
+        setattr(self, counter, getattr(self, counter) + 1)
+        per_service = self.service_stats.setdefault(service, {"created": 0, "reused": 0})
+        per_service[counter] += 1
+    def config(self, max_pool_connections: Optional[int] = None) -> Config:
+        return Config(
+            max_pool_connections=max_pool_connections or self.max_pool_connections,
+            tcp_keepalive=True,
+            retries={'mode': 'standard', 'total_max_attempts': 1}
+        )
+    async def _acquire(
+        self,
+        session: aioboto3.Session,
+        service: str,
+        region_name: Optional[str],
+        max_pool_connections: Optional[int],
+        lease: bool
+    ) -> Tuple[Tuple, Any]:
+        loop = asyncio.get_running_loop()
+        pool_size = max_pool_connections or self.max_pool_connections
+        key = (id(loop), id(session), service, region_name, pool_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_used = time.time()
+                entry.uses += 1
+                entry.in_use += int(lease)
+                self._count(service, "reused")
+                return key, entry.client
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = loop.create_future()
+                leader = True
+            else:
+                leader = False
+        if not leader:
+            client = await asyncio.shield(pending)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.client is client:
+                    entry.in_use += int(lease)
+                self._count(service, "reused")
+            return key, client
+        try:
+            started = time.perf_counter()
+            context = session.client(service, region_name=region_name, config=self.config(pool_size))
+            client = await context.__aenter__()
+            elapsed = time.perf_counter() - started
+        except BaseException as e:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.set_exception(e)
+            pending.exception()
+            raise
+        with self._lock:
+            self._pending.pop(key, None)
+            entry = self._entries[key] = RegisteredClient(session, context, client)
+            entry.in_use = int(lease)
+            self._owners[client] = session
+            self._count(service, "created")
+            self.creation_seconds += elapsed
+        pending.set_result(client)
+        logger.debug(f"Created {service} client for {region_name or 'default region'} in {elapsed * 1000:.1f}ms")
+        await self.close_idle()
+        return key, client
+    def _release(self, key: Tuple, client):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.client is client:
+                entry.in_use = max(0, entry.in_use - 1)
+                entry.last_used = time.time()
+    async def get(
+        self,
+        session: aioboto3.Session,
+        service: str,
+        region_name: Optional[str] = None,
+        max_pool_connections: Optional[int] = None
+    ):
+        return (await self._acquire(session, service, region_name, max_pool_connections, lease=False))[1]
+    def owner(self, client) -> Optional[aioboto3.Session]:
+        with self._lock:
+            return self._owners.get(client)
+    @asynccontextmanager
+    async def client(
+        self,
+        session: aioboto3.Session,
+        service: str,
+        region_name: Optional[str] = None,
+        max_pool_connections: Optional[int] = None
+    ):
+        key, client = await self._acquire(session, service, region_name, max_pool_connections, lease=True)
+        try:
+            yield client
+        finally:
+            self._release(key, client)
+    async def _close(self, keys):
+        for key in keys:
+            with self._lock:
+                entry = self._entries.pop(key, None)
+            if entry is None:
+                continue
+            try:
+                await entry.context.__aexit__(None, None, None)
+            except Exception as e:
+                logger.warning(f"Error closing client {key[2]}/{key[3]}: {str(e)}")
+            with self._lock:
+                self.closed += 1
+    async def close_idle(self):
+        loop_id = id(asyncio.get_running_loop())
+        cutoff = time.time() - self.idle_seconds
+        with self._lock:
+            keys = [
+                key for key, entry in self._entries.items()
+                if key[0] == loop_id and entry.in_use == 0 and entry.last_used < cutoff
+            ]
+        await self._close(keys)
+    async def close_all(self):
+        loop_id = id(asyncio.get_running_loop())
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == loop_id]
+        await self._close(keys)
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.created + self.reused
+            return {
+                "clients": len(self._entries),
+                "in_use": sum(entry.in_use for entry in self._entries.values()),
+                "created": self.created,
+                "reused": self.reused,
+                "closed": self.closed,
+                "reuse_rate": round(self.reused / lookups, 4) if lookups else 0.0,
+                "avg_creation_ms": round(self.creation_seconds / self.created * 1000, 2) if self.created else 0.0,
+                "max_pool_connections": self.max_pool_connections,
+                "services": {name: dict(counts) for name, counts in self.service_stats.items()},
+            }
+client_registry = ClientRegistry()
@@ -0,0 +1,37 @@
+import os
+import socket
+import sys
+import tempfile
+import pytest
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+MOTO_PORT = free_port()
+STATE_DIR = tempfile.mkdtemp(prefix='mcp-agent-tests-')
+os.environ.update({
+    'AWS_ENDPOINT_URL': f"http://127.0.0.1:{MOTO_PORT}",
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'COST_STORE_PATH': os.path.join(STATE_DIR, 'cost_store.sqlite3'),
+    'SNAPSHOT_STORE_PATH': os.path.join(STATE_DIR, 'inventory_snapshots.sqlite3'),
+})
+os.environ.pop('AWS_PROFILE', None)
+sys.path.insert(0, os.path.dirname(__file__))
+TEST_ROLE_ARN = "arn:aws:iam::123456789012:role/TestRole"
+@pytest.fixture(scope="session")
+def moto_server():
+    moto_server_module = pytest.importorskip("moto.server")
+    server = moto_server_module.ThreadedMotoServer(ip_address='127.0.0.1', port=MOTO_PORT, verbose=False)
+    server.start()
+    yield f"http://127.0.0.1:{MOTO_PORT}"
+    server.stop()
+@pytest.fixture
+def aws(moto_server):
+    import urllib.request
+    import tools
+    urllib.request.urlopen(urllib.request.Request(f"{moto_server}/moto-api/reset", method='POST')).close()
+    tools.result_cache.invalidate()
+    tools.session_cache.invalidate()
+    yield moto_server
@@ -0,0 +1,312 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+logger = logging.getLogger(__name__)
+CONTEXT_RESULT_TOKENS = int(os.getenv("CONTEXT_RESULT_TOKENS", "2000"))
+CONTEXT_HISTORY_TOKENS = int(os.getenv("CONTEXT_HISTORY_TOKENS", "24000"))
+CONTEXT_FETCH_TOKENS = int(os.getenv("CONTEXT_FETCH_TOKENS", "6000"))
+CONTEXT_STORE_MAX_BYTES = int(os.getenv("CONTEXT_STORE_MAX_BYTES", str(128 * 1024 * 1024)))
+CONTEXT_STORE_TTL = int(os.getenv("CONTEXT_STORE_TTL", "3600"))
+CHARS_PER_TOKEN = 4
+SUMMARY_TOP_N = (10, 5, 3, 1)
+DROPPED_FIELDS = {
+    'timestamp', 'timestamps', 'values', 'launch_time', 'creation_time', 'last_modified',
+    'private_ip', 'public_ip', 'vpc_id', 'subnet_id', 'vpc_config', 'function_arn', 'handler',
+    'environment_vars', 'description', 'timing'
+}
+FETCH_HINT = "Raw data is held under result_handle; call fetch_tool_result with it (optionally path, offset, limit) for records."
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+def to_json(value: Any) -> str:
+    return json.dumps(value, default=str)
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+def numeric_summary(values: List[float]) -> Dict[str, Any]:
+    ordered = sorted(values)
+    return {
+        'min': round(ordered[0], 4),
+        'p50': round(percentile(ordered, 50), 4),
+        'p90': round(percentile(ordered, 90), 4),
+        'max': round(ordered[-1], 4),
+        'sum': round(sum(ordered), 4),
+    }
+def is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+def label(value: Any) -> Any:
+    return value if isinstance(value, (str, int, float, bool)) else json.dumps(value, sort_keys=True, default=str)
+def trim_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in record.items() if key not in DROPPED_FIELDS}
+def summarize_records(records: List[Dict[str, Any]], top_n: int, rank_by: Optional[str] = None) -> Dict[str, Any]:
+    fields = {}
+    for key in dict.fromkeys(key for record in records for key in record):
+        if key in DROPPED_FIELDS:
+            continue
+        values = [record[key] for record in records if record.get(key) is not None]
+        if not values:
+            continue
+        if all(is_number(value) for value in values):
+            fields[key] = numeric_summary(values)
+        elif all(isinstance(value, dict) for value in values):
+            fields[key] = {'keys': dict(Counter(k for value in values for k in value).most_common(top_n))}
+        else:
+            counts = Counter(label(value) for value in values)
+            fields[key] = {'distinct': len(counts)}
+            if len(counts) < len(values):
+                fields[key]['top'] = dict(counts.most_common(top_n))
+    if rank_by:
+        ranked = sorted(records, key=lambda record: record.get(rank_by) if is_number(record.get(rank_by)) else float('-inf'), reverse=True)
+        return {'count': len(records), 'fields': fields, f"top_by_{rank_by}": [trim_record(record) for record in ranked[:top_n]]}
+    return {'count': len(records), 'fields': fields, 'first': [trim_record(record) for record in records[:top_n]]}
+def summarize_value(value: Any, top_n: int, rank_by: Optional[str] = None) -> Any:
+    if isinstance(value, list):
+        if len(value) <= top_n and not any(isinstance(item, (dict, list)) for item in value):
+            return value
+        if value and all(isinstance(item, dict) for item in value):
+            return summarize_records(value, top_n, rank_by)
+        if value and all(is_number(item) for item in value):
+            return {'count': len(value), **numeric_summary(value)}
+        return {'count': len(value), 'first': value[:top_n]}
+    if isinstance(value, dict):
+        if len(value) > top_n * 2 and all(isinstance(item, dict) for item in value.values()):
+            return summarize_records([{'key': key, **item} for key, item in value.items()], top_n, rank_by)
+        return {key: summarize_value(item, top_n, rank_by) for key, item in value.items() if key not in DROPPED_FIELDS}
+    if isinstance(value, str) and len(value) > 500:
+        return value[:500] + "..."
+    return value
+def ranked_by(rank_by: Optional[str]) -> Callable[[Dict[str, Any], int], Dict[str, Any]]:
+    def summarize(result: Dict[str, Any], top_n: int) -> Dict[str, Any]:
+        return summarize_value(result, top_n, rank_by)
+    return summarize
+def summarize_ec2_metrics(result: Dict[str, Any], top_n: int) -> Dict[str, Any]:
+    data = result.get('data') or {}
+    resources = data.get('resources') or {}
+    metric_summaries = {}
+    for metric_key in data.get('metrics', {}):
+        readings = {resource_id: metrics.get(metric_key) or {} for resource_id, metrics in resources.items()}
+        averages = {resource_id: reading['average'] for resource_id, reading in readings.items() if reading.get('average') is not None}
+        maxima = [reading['maximum'] for reading in readings.values() if reading.get('maximum') is not None]
+        ranked = sorted(averages, key=averages.get, reverse=True)
+        metric_summaries[metric_key] = {
+            'reporting_resources': len(averages),
+            'silent_resources': len(readings) - len(averages),
+            'average': numeric_summary(list(averages.values())) if averages else None,
+            'maximum': numeric_summary(maxima) if maxima else None,
+            'highest_average': {resource_id: averages[resource_id] for resource_id in ranked[:top_n]},
+            'lowest_average': {resource_id: averages[resource_id] for resource_id in ranked[::-1][:top_n]},
+        }
+    summary = summarize_value({key: value for key, value in result.items() if key != 'data'}, top_n)
+    summary['data'] = {key: value for key, value in data.items() if key not in ('resources', 'timestamps')}
+    summary['data']['metric_summaries'] = metric_summaries
+    return summary
+TOOL_SUMMARIZERS: Dict[str, Callable[[Dict[str, Any], int], Dict[str, Any]]] = {
+    'get_ec2_metrics_batch': summarize_ec2_metrics,
+    'get_lambda_utilization': ranked_by('gb_seconds'),
+    'get_rds_instances': ranked_by('allocated_storage'),
+    'get_log_groups': ranked_by('stored_bytes'),
+}
+def headline(tool_name: str, result: Any) -> Dict[str, Any]:
+    if not isinstance(result, dict):
+        return {'tool': tool_name}
+    data = result.get('data')
+    summary = {'tool': tool_name, 'status': result.get('status'), 'data_type': result.get('data_type')}
+    if isinstance(data, list):
+        summary['record_count'] = len(data)
+    elif isinstance(data, dict):
+        summary['data_keys'] = list(data)[:20]
+    if result.get('error_message'):
+        summary['error_message'] = result['error_message']
+    return summary
+class StoredResult:
+    __slots__ = ("owner", "tool_name", "payload", "headline", "expires_at")
+    def __init__(self, owner: str, tool_name: str, payload: str, summary: Dict[str, Any], expires_at: float):
+        self.owner = owner
+        self.tool_name = tool_name
+        self.payload = payload
+        self.headline = summary
+        self.expires_at = expires_at
+class ToolResultStore:
+    def __init__(self, max_bytes: int = CONTEXT_STORE_MAX_BYTES, ttl: int = CONTEXT_STORE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, StoredResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.stores = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    def _drop(self, handle: str):
+        entry = self._entries.pop(handle)
+        self.current_bytes -= len(entry.payload)
+    def put(self, owner: str, tool_name: str, result: Any, payload: Optional[str] = None) -> str:
+        payload = payload if payload is not None else to_json(result)
+        handle = f"res_{uuid.uuid4().hex[:16]}"
+        with self._lock:
+            self._entries[handle] = StoredResult(owner, tool_name, payload, headline(tool_name, result), time.time() + self.ttl)
+            self.current_bytes += len(payload)
+            self.stores += 1
+            while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return handle
+    def get(self, owner: str, handle: str) -> Optional[StoredResult]:
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is not None and entry.expires_at <= time.time():
+                self._drop(handle)
+                entry = None
+            if entry is None or entry.owner != owner:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(handle)
+            self.hits += 1
+            return entry
+    def invalidate(self, owner: Optional[str] = None) -> int:
+        with self._lock:
+            handles = [handle for handle, entry in self._entries.items() if owner is None or entry.owner == owner]
+            for handle in handles:
+                self._drop(handle)
+            return len(handles)
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "stores": self.stores,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+tool_result_store = ToolResultStore()
+def fetch_tool_result(
+    role_arn: str,
+    result_handle: str,
+    path: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 50
+) -> Dict[str, Any]:
+    entry = tool_result_store.get(role_arn, result_handle)
+    if entry is None:
+        return {
+            "status": "error",
+            "error_code": "ResultNotFound",
+            "error_message": f"No stored result for handle {result_handle}; it may have expired. Call the original tool again.",
+            "recoverable": True
+        }
+    target = json.loads(entry.payload)
+    for part in (path.split('.') if path else []):
+        if isinstance(target, list) and part.lstrip('-').isdigit() and -len(target) <= int(part) < len(target):
+            target = target[int(part)]
+        elif isinstance(target, dict) and part in target:
+            target = target[part]
+        else:
+            return {
+                "status": "error",
+                "error_code": "InvalidParameter",
+                "error_message": f"Path segment '{part}' not found in {path}",
+                "recoverable": True
+            }
+    offset = max(0, offset)
+    limit = max(1, limit)
+    while True:
+        response = {"status": "success", "result_handle": result_handle, "tool": entry.tool_name, "path": path or ""}
+        if isinstance(target, list):
+            response.update(total=len(target), offset=offset, items=target[offset:offset + limit])
+        elif isinstance(target, dict):
+            keys = list(target)[offset:offset + limit]
+            response.update(total=len(target), offset=offset, items={key: target[key] for key in keys})
+        else:
+            response['value'] = target
+            return response
+        returned = len(response['items'])
+        response['has_more'] = offset + returned < response['total']
+        if estimate_tokens(to_json(response)) <= CONTEXT_FETCH_TOKENS or limit == 1:
+            return response
+        limit = max(1, limit // 2)
+class ContextCompactor:
+    def __init__(
+        self,
+        owner: str,
+        store: ToolResultStore = tool_result_store,
+        result_tokens: int = CONTEXT_RESULT_TOKENS,
+        history_tokens: int = CONTEXT_HISTORY_TOKENS
+    ):
+        self.owner = owner
+        self.store = store
+        self.result_tokens = result_tokens
+        self.history_tokens = history_tokens
+        self.summarized = 0
+        self.evicted = 0
+        self.tokens_saved = 0
+    def summarize(self, tool_name: str, result: Any, handle: str) -> str:
+        summarizer = TOOL_SUMMARIZERS.get(tool_name, ranked_by(None))
+        original = estimate_tokens(to_json(result))
+        for top_n in SUMMARY_TOP_N:
+            summary = summarizer(result, top_n) if isinstance(result, dict) else summarize_value(result, top_n)
+            content = to_json({"result_handle": handle, "compaction": "summary", "original_tokens": original, "note": FETCH_HINT, **summary})
+            if estimate_tokens(content) <= self.result_tokens:
+                return content
+        return self.stub(handle, "summary")
+    def stub(self, handle: str, compaction: str = "evicted") -> str:
+        entry = self.store.get(self.owner, handle)
+        summary = entry.headline if entry else {}
+        return to_json({"result_handle": handle, "compaction": compaction, "note": FETCH_HINT, **summary})
+    def compact(self, tool_name: str, result: Any) -> str:
+        if tool_name == 'fetch_tool_result':
+            return to_json(result)
+        payload = to_json(result)
+        handle = self.store.put(self.owner, tool_name, result, payload)
+        if estimate_tokens(payload) + 20 <= self.result_tokens:
+            if isinstance(result, dict):
+                return to_json({"result_handle": handle, "compaction": "full", **result})
+            return to_json({"result_handle": handle, "compaction": "full", "result": result})
+        content = self.summarize(tool_name, result, handle)
+        self.summarized += 1
+        self.tokens_saved += estimate_tokens(payload) - estimate_tokens(content)
+        return content
+    def message_tokens(self, message: Dict[str, Any]) -> int:
+        tokens = estimate_tokens(message.get('content') or '')
+        for tool_call in message.get('tool_calls') or []:
+            tokens += estimate_tokens(tool_call.get('function', {}).get('arguments') or '')
+        return tokens
+    def demote(self, content: Dict[str, Any]) -> Optional[str]:
+        if content.get('compaction') == 'full':
+            entry = self.store.get(self.owner, content['result_handle'])
+            if entry is not None:
+                return self.summarize(entry.tool_name, json.loads(entry.payload), content['result_handle'])
+        if content.get('compaction') in ('full', 'summary'):
+            return self.stub(content['result_handle'])
+        return None
+    def evict(self, messages: List[Dict[str, Any]], protect_from: int) -> int:
+        total = sum(self.message_tokens(message) for message in messages)
+        evicted = 0
+        for _ in range(2):
+            for index, message in enumerate(messages[:protect_from]):
+                if total <= self.history_tokens:
+                    break
+                if message.get('role') != 'tool':
+                    continue
+                try:
+                    content = json.loads(message['content'])
+                except (TypeError, ValueError):
+                    continue
+                replacement = self.demote(content) if isinstance(content, dict) and content.get('result_handle') else None
+                if replacement is None or len(replacement) >= len(message['content']):
+                    continue
+                saved = estimate_tokens(message['content']) - estimate_tokens(replacement)
+                total -= saved
+                self.tokens_saved += saved
+                messages[index] = {**message, 'content': replacement}
+                evicted += 1
+        self.evicted += evicted
+        if evicted:
+            logger.info(f"Compacted {evicted} older tool results in context (~{total} tokens remain)")
+        return evicted
+    def stats(self) -> Dict[str, int]:
+        return {"summarized": self.summarized, "evicted": self.evicted, "tokens_saved": self.tokens_saved}
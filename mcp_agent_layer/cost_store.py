@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+logger = logging.getLogger(__name__)
+COST_STORE_PATH = os.path.expanduser(os.getenv("COST_STORE_PATH", "~/.cache/mcp_agent_layer/cost_store.sqlite3"))
+COST_SETTLE_DAYS = int(os.getenv("COST_SETTLE_DAYS", "3"))
+COST_UNSETTLED_TTL_SECONDS = int(os.getenv("COST_UNSETTLED_TTL_SECONDS", "3600"))
+def parse_day(value: str) -> date:
+    return datetime.strptime(value[:10], '%Y-%m-%d').date()
+def day_range(start: str, end: str) -> List[str]:
+    first, last = parse_day(start), parse_day(end)
+    return [(first + timedelta(days=i)).isoformat() for i in range((last - first).days)]
+def contiguous_ranges(days: List[str]) -> List[Tuple[str, str]]:
+    ranges = []
+    for day in sorted(days):
+        following = (parse_day(day) + timedelta(days=1)).isoformat()
+        if ranges and ranges[-1][1] == day:
+            ranges[-1] = (ranges[-1][0], following)
+        else:
+            ranges.append((day, following))
+    return ranges
+class CostStore:
+    def __init__(
+        self,
+        path: str = COST_STORE_PATH,
+        settle_days: int = COST_SETTLE_DAYS,
+        unsettled_ttl: int = COST_UNSETTLED_TTL_SECONDS
+    ):
+        self.path = path
+        self.settle_days = settle_days
+        self.unsettled_ttl = unsettled_ttl
+        self._lock = threading.Lock()
+        self._conn = None
+        self.days_served = 0
+        self.days_fetched = 0
+        self.window_hits = 0
+        self.window_misses = 0
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cost_days ("
+                "account_id TEXT, query_key TEXT, day TEXT, result TEXT, "
+                "estimated INTEGER, fetched_at REAL, "
+                "PRIMARY KEY (account_id, query_key, day))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cost_attributes ("
+                "account_id TEXT, query_key TEXT, value TEXT, attributes TEXT, "
+                "PRIMARY KEY (account_id, query_key, value))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cost_windows ("
+                "account_id TEXT, window_key TEXT, start_day TEXT, end_day TEXT, "
+                "result TEXT, fetched_at REAL, "
+                "PRIMARY KEY (account_id, window_key, start_day, end_day))"
+            )
+            self._conn = conn
+        return self._conn
+    @staticmethod
+    def query_key(granularity: str, metrics: List[str], group_by: Optional[List[Dict[str, str]]]) -> str:
+        return json.dumps({
+            "granularity": granularity,
+            "metrics": sorted(metrics),
+            "group_by": group_by or []
+        }, sort_keys=True)
+    def settled_before(self) -> str:
+        return (datetime.utcnow().date() - timedelta(days=self.settle_days)).isoformat()
+    def _is_fresh(self, day: str, estimated: int, fetched_at: float) -> bool:
+        if not estimated and day < self.settled_before():
+            return True
+        return time.time() - fetched_at < self.unsettled_ttl
+    def missing_ranges(self, account_id: str, query_key: str, start: str, end: str) -> List[Tuple[str, str]]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT day, estimated, fetched_at FROM cost_days "
+                "WHERE account_id = ? AND query_key = ? AND day >= ? AND day < ?",
+                (account_id, query_key, start, end)
+            ).fetchall()
+        fresh = {day for day, estimated, fetched_at in rows if self._is_fresh(day, estimated, fetched_at)}
+        return contiguous_ranges([day for day in day_range(start, end) if day not in fresh])
+    def put_days(
+        self,
+        account_id: str,
+        query_key: str,
+        start: str,
+        end: str,
+        results_by_time: List[Dict[str, Any]],
+        attributes: Optional[List[Dict[str, Any]]] = None
+    ):
+        by_day = {result['TimePeriod']['Start'][:10]: result for result in results_by_time}
+        now = time.time()
+        rows = []
+        for day in day_range(start, end):
+            result = by_day.get(day) or {
+                'TimePeriod': {'Start': day, 'End': (parse_day(day) + timedelta(days=1)).isoformat()},
+                'Total': {},
+                'Groups': [],
+                'Estimated': False
+            }
+            rows.append((account_id, query_key, day, json.dumps(result), int(bool(result.get('Estimated'))), now))
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO cost_days VALUES (?, ?, ?, ?, ?, ?)", rows)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO cost_attributes VALUES (?, ?, ?, ?)",
+                    [
+                        (account_id, query_key, attribute.get('Value', ''), json.dumps(attribute.get('Attributes', {})))
+                        for attribute in attributes or []
+                    ]
+                )
+            self.days_fetched += len(rows)
+    def get_days(self, account_id: str, query_key: str, start: str, end: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT result FROM cost_days "
+                "WHERE account_id = ? AND query_key = ? AND day >= ? AND day < ? ORDER BY day",
+                (account_id, query_key, start, end)
+            ).fetchall()
+            self.days_served += len(rows)
+        return [json.loads(row[0]) for row in rows]
+    def get_attributes(self, account_id: str, query_key: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT value, attributes FROM cost_attributes WHERE account_id = ? AND query_key = ? ORDER BY value",
+                (account_id, query_key)
+            ).fetchall()
+        return [{'Value': value, 'Attributes': json.loads(attributes)} for value, attributes in rows]
+    def get_window(self, account_id: str, window_key: str, start: str, end: str) -> Optional[Any]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT result, fetched_at FROM cost_windows "
+                "WHERE account_id = ? AND window_key = ? AND start_day = ? AND end_day = ?",
+                (account_id, window_key, start, end)
+            ).fetchone()
+            settled = end <= self.settled_before()
+            if row is not None and (settled or time.time() - row[1] < self.unsettled_ttl):
+                self.window_hits += 1
+                return json.loads(row[0])
+            self.window_misses += 1
+        return None
+    def put_window(self, account_id: str, window_key: str, start: str, end: str, result: Any):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cost_windows VALUES (?, ?, ?, ?, ?, ?)",
+                    (account_id, window_key, start, end, json.dumps(result), time.time())
+                )
+    def invalidate(self, account_id: Optional[str] = None):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                for table in ("cost_days", "cost_attributes", "cost_windows"):
+                    if account_id is None:
+                        conn.execute(f"DELETE FROM {table}")
+                    else:
+                        conn.execute(f"DELETE FROM {table} WHERE account_id = ?", (account_id,))
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stored_days = self._connection().execute("SELECT COUNT(*) FROM cost_days").fetchone()[0]
+            requested = self.days_served
+            return {
+                "path": self.path,
+                "stored_days": stored_days,
+                "days_served": self.days_served,
+                "days_fetched": self.days_fetched,
+                "local_ratio": round(1 - min(self.days_fetched, requested) / requested, 4) if requested else 0.0,
+                "window_hits": self.window_hits,
+                "window_misses": self.window_misses,
+                "settle_days": self.settle_days,
+            }
+cost_store = CostStore()
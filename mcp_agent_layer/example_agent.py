@@ -9,28 +9,35 @@ class BedrockOptimizationAgent:
         self.insights = []
     async def analyze_ec2_utilization(self, region: str = "us-east-1") -> List[Dict[str, Any]]:
         print("🔍 Analyzing EC2 instances...")
-        from tools import get_ec2_instances, get_ec2_cpu_utilization
+        from tools import get_ec2_instances, get_ec2_metrics_batch
         instances_response = get_ec2_instances(self.role_arn, region)
         if instances_response['status'] != 'success':
             print(f"❌ Error getting instances: {instances_response.get('error_message')}")
             return []
-        instances = instances_response['data']
+        running = [i for i in instances_response['data'] if i['state'] == 'running']
+        if not running:
+            return []
+        metrics_response = get_ec2_metrics_batch(
+            self.role_arn,
+            instance_ids=[i['instance_id'] for i in running],
+            metrics=['cpu_utilization', 'cpu_utilization_max'],
+            start_hours_ago=168,
+            include_series=False,
+            region=region
+        )
+        if metrics_response['status'] != 'success':
+            print(f"❌ Error getting CPU metrics: {metrics_response.get('error_message')}")
+            return []
+        resources = metrics_response['data']['resources']
         underutilized = []
-        for instance in instances:
-            if instance['state'] != 'running':
-                continue
+        for instance in running:
             instance_id = instance['instance_id']
             print(f"  📊 Checking {instance_id} ({instance['instance_type']})...")
-            cpu_response = get_ec2_cpu_utilization(
-                self.role_arn,
-                instance_id,
-                start_hours_ago=168,
-                region=region
-            )
-            if cpu_response['status'] == 'success' and cpu_response['data']['datapoints']:
-                datapoints = cpu_response['data']['datapoints']
-                avg_cpu = sum(dp.get('Average', 0) for dp in datapoints) / len(datapoints)
-                max_cpu = max(dp.get('Maximum', 0) for dp in datapoints)
+            cpu = resources.get(instance_id, {})
+            avg_cpu = cpu.get('cpu_utilization', {}).get('average')
+            max_cpu = cpu.get('cpu_utilization_max', {}).get('maximum')
+            if avg_cpu is not None:
+                max_cpu = max_cpu or 0
                 if avg_cpu < 10:
                     insight = {
                         'type': 'underutilized_ec2',
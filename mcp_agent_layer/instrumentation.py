@@ -0,0 +1,165 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+METRICS_PREFIX = "aws_tools"
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+class Histogram:
+    __slots__ = ("bounds", "counts", "total", "count")
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+    def cumulative(self) -> List[Tuple[str, int]]:
+        running = 0
+        buckets = []
+        for bound, count in zip(list(self.bounds) + ["+Inf"], self.counts):
+            running += count
+            buckets.append((bound if bound == "+Inf" else format(bound, "g"), running))
+        return buckets
+class CallTiming:
+    __slots__ = (
+        "tool_name", "parent", "started", "aws_calls", "aws_retries", "aws_throttles",
+        "aws_seconds", "cache", "response_bytes", "status"
+    )
+    def __init__(self, tool_name: str, parent: Optional["CallTiming"] = None):
+        self.tool_name = tool_name
+        self.parent = parent
+        self.started = time.perf_counter()
+        self.aws_calls = 0
+        self.aws_retries = 0
+        self.aws_throttles = 0
+        self.aws_seconds = 0.0
+        self.cache = "bypass"
+        self.response_bytes: Optional[int] = None
+        self.status = "unknown"
+    def observe_payload(self, payload: str, outcome: str):
+        self.cache = outcome
+        self.response_bytes = len(payload)
+    def chain(self) -> Iterable["CallTiming"]:
+        timing = self
+        while timing is not None:
+            yield timing
+            timing = timing.parent
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "aws_calls": self.aws_calls,
+            "aws_retries": self.aws_retries,
+            "aws_throttles": self.aws_throttles,
+            "aws_time_ms": round(self.aws_seconds * 1000, 2),
+            "cache": self.cache,
+        }
+current_timing: contextvars.ContextVar[Optional[CallTiming]] = contextvars.ContextVar("current_timing", default=None)
+def escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+def format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + "}"
+class ToolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tool_calls: Dict[Tuple[str, str], int] = {}
+        self.tool_latency: Dict[str, Histogram] = {}
+        self.response_sizes: Dict[str, Histogram] = {}
+        self.cache_requests: Dict[Tuple[str, str], int] = {}
+        self.aws_calls: Dict[Tuple[str, str], int] = {}
+        self.aws_retries: Dict[Tuple[str, str], int] = {}
+        self.aws_throttles: Dict[Tuple[str, str], int] = {}
+        self.aws_latency: Dict[str, Histogram] = {}
+        self.started_at = time.time()
+    @contextmanager
+    def track(self, tool_name: str):
+        timing = CallTiming(tool_name, current_timing.get())
+        token = current_timing.set(timing)
+        try:
+            yield timing
+        except BaseException:
+            timing.status = "exception"
+            raise
+        finally:
+            current_timing.reset(token)
+            self.record_tool(timing)
+    def record_tool(self, timing: CallTiming):
+        elapsed = time.perf_counter() - timing.started
+        with self._lock:
+            key = (timing.tool_name, timing.status)
+            self.tool_calls[key] = self.tool_calls.get(key, 0) + 1
+            self.tool_latency.setdefault(timing.tool_name, Histogram(LATENCY_BUCKETS)).observe(elapsed)
+            if timing.response_bytes is not None:
+                self.response_sizes.setdefault(timing.tool_name, Histogram(SIZE_BUCKETS)).observe(timing.response_bytes)
+            cache_key = (timing.tool_name, timing.cache)
+            self.cache_requests[cache_key] = self.cache_requests.get(cache_key, 0) + 1
+    def record_aws_call(self, service: str, operation: str, seconds: float, retry: bool, throttled: bool):
+        key = (service, operation)
+        with self._lock:
+            self.aws_calls[key] = self.aws_calls.get(key, 0) + 1
+            if retry:
+                self.aws_retries[key] = self.aws_retries.get(key, 0) + 1
+            if throttled:
+                self.aws_throttles[key] = self.aws_throttles.get(key, 0) + 1
+            self.aws_latency.setdefault(service, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            timing = current_timing.get()
+            for owner in (timing.chain() if timing else ()):
+                owner.aws_calls += 1
+                owner.aws_retries += int(retry)
+                owner.aws_throttles += int(throttled)
+                owner.aws_seconds += seconds
+    def _counter_lines(self, name: str, help_text: str, label_names: Tuple[str, ...], values: Dict[Tuple, int]) -> List[str]:
+        lines = [f"# HELP {METRICS_PREFIX}_{name} {help_text}", f"# TYPE {METRICS_PREFIX}_{name} counter"]
+        for key, value in sorted(values.items()):
+            lines.append(f"{METRICS_PREFIX}_{name}{format_labels(dict(zip(label_names, key)))} {value}")
+        return lines
+    def _histogram_lines(self, name: str, help_text: str, label_name: str, histograms: Dict[str, Histogram]) -> List[str]:
+        lines = [f"# HELP {METRICS_PREFIX}_{name} {help_text}", f"# TYPE {METRICS_PREFIX}_{name} histogram"]
+        for label, histogram in sorted(histograms.items()):
+            for bound, count in histogram.cumulative():
+                lines.append(f"{METRICS_PREFIX}_{name}_bucket{format_labels({label_name: label, 'le': bound})} {count}")
+            labels = format_labels({label_name: label})
+            lines.append(f"{METRICS_PREFIX}_{name}_sum{labels} {histogram.total:.6f}")
+            lines.append(f"{METRICS_PREFIX}_{name}_count{labels} {histogram.count}")
+        return lines
+    def render(self, gauges: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+        with self._lock:
+            lines = []
+            lines += self._counter_lines("tool_calls_total", "Tool invocations by outcome status.", ("tool", "status"), self.tool_calls)
+            lines += self._histogram_lines("tool_duration_seconds", "Tool latency including cache lookups.", "tool", self.tool_latency)
+            lines += self._histogram_lines("tool_response_bytes", "Serialized tool response size.", "tool", self.response_sizes)
+            lines += self._counter_lines("tool_cache_requests_total", "Result cache outcomes per tool call.", ("tool", "outcome"), self.cache_requests)
+            lines += self._counter_lines("aws_calls_total", "AWS API attempts, including retries.", ("service", "operation"), self.aws_calls)
+            lines += self._counter_lines("aws_retries_total", "AWS API retry attempts.", ("service", "operation"), self.aws_retries)
+            lines += self._counter_lines("aws_throttles_total", "Throttled AWS API attempts.", ("service", "operation"), self.aws_throttles)
+            lines += self._histogram_lines("aws_call_duration_seconds", "AWS API attempt latency.", "service", self.aws_latency)
+        for name, (help_text, value) in sorted((gauges or {}).items()):
+            lines += [
+                f"# HELP {METRICS_PREFIX}_{name} {help_text}",
+                f"# TYPE {METRICS_PREFIX}_{name} gauge",
+                f"{METRICS_PREFIX}_{name} {value}",
+            ]
+        lines.append(f"# TYPE {METRICS_PREFIX}_uptime_seconds gauge")
+        lines.append(f"{METRICS_PREFIX}_uptime_seconds {time.time() - self.started_at:.3f}")
+        return "\n".join(lines) + "\n"
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tools": {
+                    tool: {
+                        "calls": histogram.count,
+                        "avg_ms": round(histogram.total / histogram.count * 1000, 2) if histogram.count else 0.0,
+                    }
+                    for tool, histogram in self.tool_latency.items()
+                },
+                "aws_calls": sum(self.aws_calls.values()),
+                "aws_retries": sum(self.aws_retries.values()),
+                "aws_throttles": sum(self.aws_throttles.values()),
+            }
+tool_metrics = ToolMetrics()
@@ -0,0 +1,374 @@
+import math
+import os
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+INVENTORY_TABLE_TTL = int(os.getenv("INVENTORY_TABLE_TTL", os.getenv("INVENTORY_CACHE_TTL", "300")))
+NULL_CODE = -1
+INVENTORY_SCHEMAS = {
+    'ec2_instances': {
+        'instance_id': 'key',
+        'instance_type': 'category',
+        'state': 'category',
+        'launch_time': 'time',
+        'availability_zone': 'category',
+        'private_ip': 'key',
+        'public_ip': 'key',
+        'vpc_id': 'category',
+        'subnet_id': 'category',
+        'tags': 'tags',
+        'platform': 'category',
+        'monitoring': 'category',
+    },
+    'rds_instances': {
+        'db_instance_identifier': 'key',
+        'db_instance_class': 'category',
+        'engine': 'category',
+        'engine_version': 'category',
+        'db_instance_status': 'category',
+        'allocated_storage': 'number',
+        'storage_type': 'category',
+        'multi_az': 'bool',
+        'availability_zone': 'category',
+        'endpoint': 'key',
+        'port': 'number',
+        'instance_create_time': 'time',
+        'backup_retention_period': 'number',
+        'vpc_id': 'category',
+        'publicly_accessible': 'bool',
+    },
+    'rds_clusters': {
+        'db_cluster_identifier': 'key',
+        'engine': 'category',
+        'engine_version': 'category',
+        'status': 'category',
+        'endpoint': 'key',
+        'reader_endpoint': 'key',
+        'multi_az': 'bool',
+        'database_name': 'category',
+        'cluster_create_time': 'time',
+        'members': 'object',
+        'allocated_storage': 'number',
+    },
+    'lambda_functions': {
+        'function_name': 'key',
+        'function_arn': 'key',
+        'runtime': 'category',
+        'handler': 'category',
+        'code_size': 'number',
+        'description': 'key',
+        'timeout': 'number',
+        'memory_size': 'number',
+        'last_modified': 'time',
+        'version': 'category',
+        'vpc_config': 'object',
+        'environment_vars': 'object',
+        'architectures': 'object',
+        'package_type': 'category',
+    },
+    'log_groups': {
+        'log_group_name': 'key',
+        'creation_time': 'time',
+        'retention_in_days': 'number',
+        'stored_bytes': 'number',
+        'stored_mb': 'number',
+        'metric_filter_count': 'number',
+    },
+    'ec2_tags': {
+        'ResourceId': 'key',
+        'ResourceType': 'category',
+        'Key': 'category',
+        'Value': 'category',
+    },
+}
+class StringPool:
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return NULL_CODE
+        value = str(value)
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return code
+    def lookup(self, value: Any) -> Optional[int]:
+        return self.codes.get(str(value)) if value is not None else NULL_CODE
+    def value(self, code: int) -> Optional[str]:
+        return self.values[code] if code != NULL_CODE else None
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.values) + sys.getsizeof(self.codes) + sum(sys.getsizeof(v) for v in self.values)
+def to_epoch(value: Any) -> float:
+    if value is None or value == '':
+        return math.nan
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).replace('Z', '+00:00')
+    if len(text) > 5 and text[-5] in '+-' and text[-3] != ':':
+        text = f"{text[:-2]}:{text[-2:]}"
+    return datetime.fromisoformat(text).timestamp()
+def from_epoch(value: float) -> Optional[str]:
+    return None if math.isnan(value) else datetime.fromtimestamp(value, timezone.utc).isoformat()
+def to_number(value: Any) -> float:
+    return math.nan if value is None or isinstance(value, (dict, list)) else float(value)
+def from_number(value: float) -> Optional[Union[int, float]]:
+    if math.isnan(value):
+        return None
+    return int(value) if value.is_integer() else value
+def infer_kind(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, (int, float)):
+        return 'number'
+    if isinstance(value, dict) and all(isinstance(v, str) for v in value.values()):
+        return 'tags'
+    if isinstance(value, (dict, list)):
+        return 'object'
+    return 'category'
+class ColumnarInventory:
+    def __init__(self, data_type: str, schema: Optional[Dict[str, str]] = None):
+        self.data_type = data_type
+        self.schema: Dict[str, str] = dict(schema if schema is not None else INVENTORY_SCHEMAS.get(data_type, {}))
+        self.pool = StringPool()
+        self.columns: Dict[str, Any] = {}
+        self.tag_columns = [name for name, kind in self.schema.items() if kind == 'tags']
+        self.tag_rows = array('i')
+        self.tag_keys = array('i')
+        self.tag_values = array('i')
+        self.tag_field = array('i')
+        self.row_count = 0
+        self.created_at = time.time()
+        self._row_tags: Optional[Dict[int, List[int]]] = None
+        for name, kind in self.schema.items():
+            self._add_column(name, kind)
+    def _add_column(self, name: str, kind: str):
+        if kind in ('category', 'key'):
+            self.columns[name] = array('i', [NULL_CODE]) * self.row_count
+        elif kind in ('number', 'time'):
+            self.columns[name] = array('d', [math.nan]) * self.row_count
+        elif kind == 'bool':
+            self.columns[name] = array('b', [NULL_CODE]) * self.row_count
+        elif kind == 'object':
+            self.columns[name] = [None] * self.row_count
+        elif kind == 'tags' and name not in self.tag_columns:
+            self.tag_columns.append(name)
+        self.schema[name] = kind
+    def append(self, record: Dict[str, Any]):
+        row = self.row_count
+        for name, value in record.items():
+            if name not in self.schema:
+                self._add_column(name, infer_kind(value))
+        for name, kind in self.schema.items():
+            value = record.get(name)
+            if kind in ('category', 'key'):
+                self.columns[name].append(self.pool.intern(value))
+            elif kind == 'number':
+                self.columns[name].append(to_number(value))
+            elif kind == 'time':
+                self.columns[name].append(to_epoch(value))
+            elif kind == 'bool':
+                self.columns[name].append(NULL_CODE if value is None else int(bool(value)))
+            elif kind == 'object':
+                self.columns[name].append(value)
+            elif kind == 'tags' and value:
+                self._row_tags = None
+                field = self.tag_columns.index(name)
+                for tag_key, tag_value in value.items():
+                    self.tag_rows.append(row)
+                    self.tag_keys.append(self.pool.intern(tag_key))
+                    self.tag_values.append(self.pool.intern(tag_value))
+                    self.tag_field.append(field)
+        self.row_count += 1
+    def extend(self, records: Iterable[Dict[str, Any]]) -> 'ColumnarInventory':
+        for record in records:
+            self.append(record)
+        return self
+    def __len__(self) -> int:
+        return self.row_count
+    def _tag_index(self, tag_key: str) -> Dict[int, int]:
+        key_code = self.pool.lookup(tag_key)
+        if key_code is None:
+            return {}
+        return {
+            self.tag_rows[i]: self.tag_values[i]
+            for i in range(len(self.tag_keys))
+            if self.tag_keys[i] == key_code
+        }
+    def _values(self, column: str) -> Tuple[str, Any]:
+        if column.startswith('tag:'):
+            return 'tag', self._tag_index(column[4:])
+        if column not in self.schema:
+            raise KeyError(f"Unknown column '{column}' for {self.data_type}; expected one of {list(self.schema)}")
+        if self.schema[column] == 'tags':
+            raise ValueError(f"Column '{column}' holds tags; use 'tag:<Key>' to filter or group on a tag")
+        return self.schema[column], self.columns[column]
+    def _encode(self, kind: str, value: Any) -> Any:
+        if kind in ('category', 'key', 'tag'):
+            code = self.pool.lookup(value)
+            return NULL_CODE - 1 if code is None else code
+        if kind == 'time':
+            return to_epoch(value)
+        if kind == 'number':
+            return to_number(value)
+        if kind == 'bool':
+            return NULL_CODE if value is None else int(bool(value))
+        return value
+    def _predicate(self, kind: str, condition: Any) -> Callable[[Any], bool]:
+        if isinstance(condition, dict):
+            checks = []
+            for op, operand in condition.items():
+                if op == 'exists':
+                    checks.append(lambda v, want=bool(operand): (v not in (None, NULL_CODE) and v == v) == want)
+                elif op in ('in', 'not_in'):
+                    codes = {self._encode(kind, item) for item in operand}
+                    checks.append((lambda v, c=codes: v in c) if op == 'in' else (lambda v, c=codes: v not in c))
+                elif op in COMPARATORS:
+                    encoded = self._encode(kind, operand)
+                    if kind in ('category', 'key', 'tag') and op not in ('eq', 'ne'):
+                        raise ValueError(f"Operator '{op}' is not supported on string columns")
+                    checks.append(lambda v, cmp=COMPARATORS[op], o=encoded: v == v and cmp(v, o))
+                else:
+                    raise ValueError(f"Unknown operator '{op}'; expected one of {['exists', 'in', 'not_in'] + list(COMPARATORS)}")
+            return lambda v: all(check(v) for check in checks)
+        if isinstance(condition, (list, tuple, set)):
+            return self._predicate(kind, {'in': condition})
+        return self._predicate(kind, {'eq': condition})
+    def filter(self, filters: Optional[Dict[str, Any]] = None, selection: Optional[array] = None) -> array:
+        rows = selection if selection is not None else array('i', range(self.row_count))
+        for column, condition in (filters or {}).items():
+            kind, values = self._values(column)
+            predicate = self._predicate(kind, condition)
+            if kind == 'tag':
+                rows = array('i', [row for row in rows if predicate(values.get(row, NULL_CODE))])
+            else:
+                rows = array('i', [row for row in rows if predicate(values[row])])
+        return rows
+    def _decode(self, kind: str, value: Any) -> Any:
+        if kind in ('category', 'key', 'tag'):
+            return self.pool.value(value)
+        if kind == 'time':
+            return from_epoch(value)
+        if kind == 'number':
+            return from_number(value)
+        if kind == 'bool':
+            return None if value == NULL_CODE else bool(value)
+        return value
+    def group_by(
+        self,
+        columns: Union[str, List[str]],
+        selection: Optional[array] = None,
+        sum_columns: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        columns = [columns] if isinstance(columns, str) else list(columns)
+        rows = selection if selection is not None else range(self.row_count)
+        keyed = [self._values(column) for column in columns]
+        for column, (kind, _) in zip(columns, keyed):
+            if kind == 'object':
+                raise ValueError(f"Cannot group by '{column}'; it holds nested {kind} values")
+        summed = []
+        for column in sum_columns or []:
+            kind, values = self._values(column)
+            if kind not in ('number', 'time'):
+                raise ValueError(f"Cannot sum '{column}'; it is a {kind} column, only number and time columns can be summed")
+            summed.append((column, values))
+        groups: Dict[Tuple, Dict[str, Any]] = {}
+        for row in rows:
+            key = tuple(
+                values.get(row, NULL_CODE) if kind == 'tag' else values[row]
+                for kind, values in keyed
+            )
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {'count': 0, 'sums': [0.0] * len(summed)}
+            group['count'] += 1
+            for i, (_, values) in enumerate(summed):
+                value = values[row]
+                if value == value:
+                    group['sums'][i] += value
+        results = []
+        for key, group in groups.items():
+            entry = {column: self._decode(kind, value) for column, (kind, _), value in zip(columns, keyed, key)}
+            entry['count'] = group['count']
+            for (column, _), total in zip(summed, group['sums']):
+                entry[f'sum_{column}'] = from_number(total)
+            results.append(entry)
+        return sorted(results, key=lambda entry: entry['count'], reverse=True)
+    def row(self, index: int, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        record = {}
+        for name in columns or list(self.schema):
+            kind = self.schema.get(name)
+            if kind is None or kind == 'tags':
+                continue
+            record[name] = self._decode(kind, self.columns[name][index])
+        if columns is None or any(name in self.tag_columns for name in columns):
+            for name in self.tag_columns:
+                record[name] = {}
+            if self._row_tags is None:
+                self._row_tags = {}
+                for i, tag_row in enumerate(self.tag_rows):
+                    self._row_tags.setdefault(tag_row, []).append(i)
+            for i in self._row_tags.get(index, []):
+                name = self.tag_columns[self.tag_field[i]]
+                record[name][self.pool.value(self.tag_keys[i])] = self.pool.value(self.tag_values[i])
+        return record
+    def rows(self, selection: Optional[Iterable[int]] = None, columns: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        for index in selection if selection is not None else range(self.row_count):
+            yield self.row(index, columns)
+    def nbytes(self) -> int:
+        total = self.pool.nbytes()
+        for column in self.columns.values():
+            total += column.buffer_info()[1] * column.itemsize if isinstance(column, array) else sys.getsizeof(column)
+        for tag_array in (self.tag_rows, self.tag_keys, self.tag_values, self.tag_field):
+            total += tag_array.buffer_info()[1] * tag_array.itemsize
+        return total
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'data_type': self.data_type,
+            'rows': self.row_count,
+            'columns': dict(self.schema),
+            'distinct_strings': len(self.pool.values),
+            'tag_entries': len(self.tag_rows),
+            'bytes': self.nbytes(),
+        }
+COMPARATORS = {
+    'eq': lambda v, o: v == o,
+    'ne': lambda v, o: v != o,
+    'gt': lambda v, o: v > o,
+    'gte': lambda v, o: v >= o,
+    'lt': lambda v, o: v < o,
+    'lte': lambda v, o: v <= o,
+}
+class InventoryStore:
+    def __init__(self, ttl: int = INVENTORY_TABLE_TTL):
+        self.ttl = ttl
+        self._tables: Dict[Tuple[str, str, str], ColumnarInventory] = {}
+        self._lock = threading.Lock()
+    def get(self, account_id: str, region: str, data_type: str) -> Optional[ColumnarInventory]:
+        with self._lock:
+            table = self._tables.get((account_id, region, data_type))
+            if table is not None and time.time() - table.created_at < self.ttl:
+                return table
+            return None
+    def put(self, account_id: str, region: str, table: ColumnarInventory) -> ColumnarInventory:
+        with self._lock:
+            self._tables[(account_id, region, table.data_type)] = table
+        return table
+    def invalidate(self, account_id: Optional[str] = None):
+        with self._lock:
+            for key in [key for key in self._tables if account_id is None or key[0] == account_id]:
+                del self._tables[key]
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'tables': len(self._tables),
+                'rows': sum(len(table) for table in self._tables.values()),
+                'bytes': sum(table.nbytes() for table in self._tables.values()),
+            }
+inventory_store = InventoryStore()
@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from botocore.exceptions import ClientError, ConnectionClosedError, EndpointConnectionError, ReadTimeoutError
+logger = logging.getLogger(__name__)
+MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
+BASE_RETRY_DELAY = float(os.getenv("BASE_RETRY_DELAY", "1.0"))
+MAX_RETRY_DELAY = float(os.getenv("MAX_RETRY_DELAY", "20.0"))
+ACCOUNT_RATE_LIMIT = float(os.getenv("ACCOUNT_RATE_LIMIT", "100"))
+API_DEFAULT_RATE_LIMIT = float(os.getenv("API_DEFAULT_RATE_LIMIT", "20"))
+API_MIN_RATE_LIMIT = 0.5
+API_RATE_INCREASE = 0.5
+API_RATE_DECREASE = 0.5
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "2"))
+RETRY_BUDGET_MAX_TOKENS = 100.0
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "10"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+SERVICE_RATE_LIMITS = {
+    'ce': 5.0,
+    'sts': 10.0,
+    'logs': 10.0,
+    'cloudwatch': 20.0,
+    's3': 100.0,
+}
+THROTTLING_ERROR_CODES = {
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestLimitExceeded',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'SlowDown',
+    'LimitExceededException',
+}
+TRANSIENT_ERROR_CODES = {
+    'RequestTimeout',
+    'RequestTimeoutException',
+    'InternalError',
+    'InternalFailure',
+    'InternalServerError',
+    'ServiceUnavailable',
+    'ServiceUnavailableException',
+}
+TRANSIENT_EXCEPTIONS = (ConnectionClosedError, EndpointConnectionError, ReadTimeoutError)
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+    async def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+class AdaptiveTokenBucket(TokenBucket):
+    def __init__(self, rate: float, min_rate: float = API_MIN_RATE_LIMIT):
+        super().__init__(rate)
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.throttles = 0
+    def on_success(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + API_RATE_INCREASE / max(self.rate, 1.0))
+    def on_throttle(self):
+        with self._lock:
+            self.throttles += 1
+            self.rate = max(self.min_rate, self.rate * API_RATE_DECREASE)
+            self.tokens = min(self.tokens, 0.0)
+class RetryBudget:
+    def __init__(
+        self,
+        ratio: float = RETRY_BUDGET_RATIO,
+        min_per_second: float = RETRY_BUDGET_MIN_PER_SECOND,
+        max_tokens: float = RETRY_BUDGET_MAX_TOKENS
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.updated_at = time.monotonic()
+        self.exhausted = 0
+        self._lock = threading.Lock()
+    def deposit(self):
+        with self._lock:
+            now = time.monotonic()
+            refill = (now - self.updated_at) * self.min_per_second + self.ratio
+            self.tokens = min(self.max_tokens, self.tokens + refill)
+            self.updated_at = now
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            self.exhausted += 1
+            return False
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.probe_started = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            now = time.monotonic()
+            if state == "half_open" and (not self.probing or now - self.probe_started >= self.reset_seconds):
+                self.probing = True
+                self.probe_started = now
+                return True
+            self.rejected += 1
+            return False
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.trips += 1
+                self.opened_at = time.monotonic()
+                self.probing = False
+class ResilienceLayer:
+    def __init__(
+        self,
+        max_retries: int = MAX_RETRIES,
+        base_delay: float = BASE_RETRY_DELAY,
+        max_delay: float = MAX_RETRY_DELAY
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = RetryBudget()
+        self._account_buckets: Dict[str, TokenBucket] = {}
+        self._api_buckets: Dict[Tuple[str, str, str], AdaptiveTokenBucket] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.throttles = 0
+        self.failures = 0
+        self.rate_limited_seconds = 0.0
+    def _account_bucket(self, account_id: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._account_buckets.get(account_id)
+            if bucket is None:
+                bucket = self._account_buckets[account_id] = TokenBucket(ACCOUNT_RATE_LIMIT)
+            return bucket
+    def _api_bucket(self, account_id: str, service: str, operation: str) -> AdaptiveTokenBucket:
+        key = (account_id, service, operation)
+        with self._lock:
+            bucket = self._api_buckets.get(key)
+            if bucket is None:
+                bucket = self._api_buckets[key] = AdaptiveTokenBucket(
+                    SERVICE_RATE_LIMITS.get(service, API_DEFAULT_RATE_LIMIT)
+                )
+            return bucket
+    def breaker(self, service: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(service)
+            if breaker is None:
+                breaker = self._breakers[service] = CircuitBreaker()
+            return breaker
+    def _count(self, counter: str, amount: float = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+    @staticmethod
+    def classify(error: Exception) -> Tuple[bool, bool]:
+        if isinstance(error, ClientError):
+            code = error.response.get('Error', {}).get('Code', '')
+            status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+            throttled = code in THROTTLING_ERROR_CODES or status == 429
+            return throttled, throttled or code in TRANSIENT_ERROR_CODES or status >= 500
+        return False, isinstance(error, TRANSIENT_EXCEPTIONS)
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+    async def call(
+        self,
+        account_id: str,
+        service: str,
+        operation: str,
+        func: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        breaker = self.breaker(service)
+        account_bucket = self._account_bucket(account_id)
+        api_bucket = self._api_bucket(account_id, service, operation)
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                raise ClientError(
+                    {'Error': {
+                        'Code': 'CircuitOpen',
+                        'Message': f"{service} circuit is open after repeated throttling or server errors; retry in {breaker.reset_seconds:.0f}s"
+                    }},
+                    operation
+                )
+            waited = await account_bucket.acquire() + await api_bucket.acquire()
+            if waited:
+                self._count("rate_limited_seconds", waited)
+            self._count("calls")
+            self.retry_budget.deposit()
+            try:
+                result = await func()
+            except Exception as e:
+                throttled, retryable = self.classify(e)
+                if throttled:
+                    self._count("throttles")
+                    api_bucket.on_throttle()
+                if not retryable:
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                self._count("failures")
+                if attempt >= self.max_retries or not self.retry_budget.withdraw():
+                    raise
+                delay = self.backoff(attempt)
+                attempt += 1
+                self._count("retries")
+                logger.warning(
+                    f"{service}.{operation} {'throttled' if throttled else 'failed'}; "
+                    f"retrying in {delay:.2f}s (attempt {attempt}/{self.max_retries})"
+                )
+                await asyncio.sleep(delay)
+                continue
+            api_bucket.on_success()
+            breaker.record_success()
+            return result
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            api_buckets = {
+                f"{account}/{service}.{operation}": {
+                    "rate": round(bucket.rate, 2),
+                    "max_rate": bucket.max_rate,
+                    "throttles": bucket.throttles,
+                }
+                for (account, service, operation), bucket in self._api_buckets.items()
+                if bucket.throttles or bucket.rate < bucket.max_rate
+            }
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "throttles": self.throttles,
+                "failures": self.failures,
+                "rate_limited_seconds": round(self.rate_limited_seconds, 3),
+                "retry_budget": {
+                    "tokens": round(self.retry_budget.tokens, 2),
+                    "exhausted": self.retry_budget.exhausted,
+                },
+                "circuits": {
+                    service: {
+                        "state": breaker.state,
+                        "failures": breaker.failures,
+                        "trips": breaker.trips,
+                        "rejected": breaker.rejected,
+                    }
+                    for service, breaker in self._breakers.items()
+                },
+                "adapted_apis": api_buckets,
+            }
+resilience = ResilienceLayer()
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+logger = logging.getLogger(__name__)
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+RESULT_CACHE_DEFAULT_TTL = int(os.getenv("RESULT_CACHE_DEFAULT_TTL", "300"))
+class CacheEntry:
+    __slots__ = ("tool_name", "role_arn", "payload", "size", "expires_at")
+    def __init__(self, tool_name: str, role_arn: Optional[str], payload: str, expires_at: float):
+        self.tool_name = tool_name
+        self.role_arn = role_arn
+        self.payload = payload
+        self.size = len(payload)
+        self.expires_at = expires_at
+class ToolResultCache:
+    def __init__(
+        self,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        default_ttl: int = RESULT_CACHE_DEFAULT_TTL,
+        ttl_policies: Optional[Dict[str, Union[int, Callable[[Dict[str, Any]], int]]]] = None
+    ):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttl_policies = dict(ttl_policies or {})
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.tool_stats: Dict[str, Dict[str, int]] = {}
+    def ttl_for(self, tool_name: str, arguments: Optional[Dict[str, Any]] = None) -> int:
+        policy = self.ttl_policies.get(tool_name, self.default_ttl)
+        return policy(arguments or {}) if callable(policy) else policy
+    @staticmethod
+    def make_key(tool_name: str, arguments: Dict[str, Any]) -> str:
+        return json.dumps({"tool": tool_name, "args": arguments}, sort_keys=True, default=str)
+    def _count(self, tool_name: str, counter: str):
+        setattr(self, counter, getattr(self, counter) + 1)
+        per_tool = self.tool_stats.setdefault(tool_name, {"hits": 0, "misses": 0, "coalesced": 0})
+        if counter in per_tool:
+            per_tool[counter] += 1
+    def _drop(self, key: str):
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry.size
+    def _lookup(self, key: str, tool_name: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            self._drop(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        self._count(tool_name, "hits")
+        return entry.payload
+    def _store(self, key: str, tool_name: str, role_arn: Optional[str], payload: str, ttl: int):
+        if len(payload) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = CacheEntry(tool_name, role_arn, payload, time.time() + ttl)
+        self.current_bytes += len(payload)
+        self.stores += 1
+        while self.current_bytes > self.max_bytes and self._entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+    async def get_or_call(
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        call: Callable[[], Awaitable[Dict[str, Any]]],
+        observe: Optional[Callable[[str, str], None]] = None
+    ) -> Dict[str, Any]:
+        ttl = self.ttl_for(tool_name, arguments)
+        if ttl <= 0:
+            return await call()
+        key = self.make_key(tool_name, arguments)
+        leader = False
+        with self._lock:
+            payload = self._lookup(key, tool_name)
+            if payload is None:
+                in_flight = self._in_flight.get(key)
+                if in_flight is not None:
+                    self._count(tool_name, "coalesced")
+                else:
+                    self._count(tool_name, "misses")
+                    in_flight = self._in_flight[key] = Future()
+                    leader = True
+        if payload is not None:
+            if observe:
+                observe(payload, "hit")
+            return json.loads(payload)
+        if not leader:
+            payload = await asyncio.wrap_future(in_flight)
+            if observe:
+                observe(payload, "coalesced")
+            return json.loads(payload)
+        try:
+            result = await call()
+            payload = json.dumps(result, default=str)
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            in_flight.set_exception(e)
+            raise
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if isinstance(result, dict) and result.get('status') == 'success' and not result.get('partial'):
+                self._store(key, tool_name, arguments.get('role_arn'), payload, ttl)
+        in_flight.set_result(payload)
+        if observe:
+            observe(payload, "miss")
+        return json.loads(payload)
+    def invalidate(self, tool_name: Optional[str] = None, role_arn: Optional[str] = None) -> int:
+        with self._lock:
+            keys = [
+                key for key, entry in self._entries.items()
+                if (tool_name is None or entry.tool_name == tool_name)
+                and (role_arn is None or entry.role_arn == role_arn)
+            ]
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "in_flight": len(self._in_flight),
+                "tools": {name: dict(counts) for name, counts in self.tool_stats.items()},
+            }
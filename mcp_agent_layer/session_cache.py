@@ -0,0 +1,248 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional, Tuple, Union
+import aioboto3
+import boto3
+from botocore.exceptions import ClientError
+logger = logging.getLogger(__name__)
+SESSION_DURATION_SECONDS = int(os.getenv("AWS_STS_SESSION_DURATION", "3600"))
+SESSION_REFRESH_MARGIN_SECONDS = int(os.getenv("SESSION_REFRESH_MARGIN_SECONDS", "300"))
+SESSION_MIN_VALIDITY_SECONDS = int(os.getenv("SESSION_MIN_VALIDITY_SECONDS", "60"))
+ACCESS_KEY_PRINCIPAL_PREFIX = "access-key:"
+class CachedSession:
+    __slots__ = ("session", "account_id", "expires_at", "created_at")
+    def __init__(self, session: boto3.Session, account_id: Optional[str], expires_at: Optional[float]):
+        self.session = session
+        self.account_id = account_id
+        self.expires_at = expires_at
+        self.created_at = time.time()
+    def seconds_left(self) -> float:
+        if self.expires_at is None:
+            return float("inf")
+        return self.expires_at - time.time()
+class SessionCache:
+    def __init__(
+        self,
+        duration_seconds: int = SESSION_DURATION_SECONDS,
+        refresh_margin_seconds: int = SESSION_REFRESH_MARGIN_SECONDS,
+        min_validity_seconds: int = SESSION_MIN_VALIDITY_SECONDS
+    ):
+        self.duration_seconds = duration_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.min_validity_seconds = min_validity_seconds
+        self._entries: Dict[str, CachedSession] = {}
+        self._account_ids: Dict[str, str] = {}
+        self._async_sessions: Dict[str, aioboto3.Session] = {}
+        self._async_owners: "weakref.WeakKeyDictionary[aioboto3.Session, boto3.Session]" = weakref.WeakKeyDictionary()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._principals: Dict[str, Tuple[str, str, Optional[str]]] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._sts_client = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.sts_calls = 0
+    def _base_sts_client(self):
+        if self._sts_client is None:
+            with self._lock:
+                if self._sts_client is None:
+                    self._sts_client = boto3.client('sts')
+        return self._sts_client
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    def _forget(self, session: boto3.Session):
+        access_key = self._access_key(session)
+        self._account_ids.pop(access_key, None)
+        self._async_sessions.pop(access_key, None)
+    def _remember(self, key: str, entry: CachedSession):
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                self._forget(previous.session)
+            self._entries[key] = entry
+            if entry.account_id:
+                self._account_ids[self._access_key(entry.session)] = entry.account_id
+    @staticmethod
+    def _access_key(session: boto3.Session) -> Optional[str]:
+        credentials = session.get_credentials()
+        return credentials.access_key if credentials else None
+    def _assume_role(self, role_arn: str, session_name: str) -> CachedSession:
+        self._count("sts_calls")
+        try:
+            response = self._base_sts_client().assume_role(
+                RoleArn=role_arn,
+                RoleSessionName=session_name,
+                DurationSeconds=self.duration_seconds
+            )
+        except ClientError as e:
+            logger.error(f"Failed to assume role {role_arn}: {str(e)}")
+            raise Exception(f"Role assumption failed: {str(e)}")
+        credentials = response['Credentials']
+        session = boto3.Session(
+            aws_access_key_id=credentials['AccessKeyId'],
+            aws_secret_access_key=credentials['SecretAccessKey'],
+            aws_session_token=credentials['SessionToken']
+        )
+        assumed_arn = response.get('AssumedRoleUser', {}).get('Arn', '')
+        arn_parts = assumed_arn.split(':')
+        account_id = arn_parts[4] if len(arn_parts) > 4 and arn_parts[4] else None
+        expiration = credentials.get('Expiration')
+        expires_at = expiration.timestamp() if expiration else time.time() + self.duration_seconds
+        logger.info(f"Successfully assumed role: {role_arn}")
+        return CachedSession(session, account_id, expires_at)
+    def _refresh_in_background(self, key: str, role_arn: str, session_name: str):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        def refresh():
+            try:
+                with self._key_lock(key):
+                    entry = self._assume_role(role_arn, session_name)
+                    self._remember(key, entry)
+                self._count("refreshes")
+                logger.info(f"Refreshed cached session for {role_arn}")
+            except Exception as e:
+                self._count("refresh_failures")
+                logger.warning(f"Background session refresh failed for {role_arn}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+        threading.Thread(target=refresh, name=f"session-refresh-{session_name}", daemon=True).start()
+    def get_role_session(self, role_arn: str, session_name: str = "MCPSession") -> boto3.Session:
+        key = f"role:{role_arn}:{session_name}"
+        entry = self._entries.get(key)
+        if entry is not None and entry.seconds_left() > self.min_validity_seconds:
+            self._count("hits")
+            if entry.seconds_left() <= self.refresh_margin_seconds:
+                self._refresh_in_background(key, role_arn, session_name)
+            return entry.session
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and entry.seconds_left() > self.min_validity_seconds:
+                self._count("hits")
+                return entry.session
+            self._count("misses")
+            entry = self._assume_role(role_arn, session_name)
+            self._remember(key, entry)
+            return entry.session
+    def get_access_key_session(
+        self,
+        access_key_id: str,
+        secret_access_key: str,
+        session_token: Optional[str] = None
+    ) -> boto3.Session:
+        fingerprint = hashlib.sha256(f"{secret_access_key}:{session_token or ''}".encode()).hexdigest()[:16]
+        key = f"keys:{access_key_id}:{fingerprint}"
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._count("hits")
+            return entry.session
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._count("hits")
+                return entry.session
+            self._count("misses")
+            session = boto3.Session(
+                aws_access_key_id=access_key_id,
+                aws_secret_access_key=secret_access_key,
+                aws_session_token=session_token
+            )
+            self._remember(key, CachedSession(session, None, None))
+            return session
+    def register_access_keys(
+        self,
+        access_key_id: str,
+        secret_access_key: str,
+        session_token: Optional[str] = None
+    ) -> str:
+        principal = f"{ACCESS_KEY_PRINCIPAL_PREFIX}{access_key_id}"
+        with self._lock:
+            self._principals[principal] = (access_key_id, secret_access_key, session_token)
+        return principal
+    def get_session(self, principal: str, session_name: str = "MCPSession") -> boto3.Session:
+        if not principal.startswith(ACCESS_KEY_PRINCIPAL_PREFIX):
+            return self.get_role_session(principal, session_name)
+        credentials = self._principals.get(principal)
+        if credentials is None:
+            raise Exception(f"No access keys registered for {principal}")
+        return self.get_access_key_session(*credentials)
+    def get_async_session(self, session: boto3.Session) -> aioboto3.Session:
+        access_key = self._access_key(session)
+        with self._lock:
+            async_session = self._async_sessions.get(access_key)
+            if async_session is None:
+                credentials = session.get_credentials().get_frozen_credentials()
+                async_session = aioboto3.Session(
+                    aws_access_key_id=credentials.access_key,
+                    aws_secret_access_key=credentials.secret_key,
+                    aws_session_token=credentials.token
+                )
+                self._async_sessions[access_key] = async_session
+                self._async_owners[async_session] = session
+            return async_session
+    def _owner(self, session: Union[boto3.Session, aioboto3.Session, None]) -> Optional[boto3.Session]:
+        if isinstance(session, aioboto3.Session):
+            with self._lock:
+                return self._async_owners.get(session)
+        return session
+    def cached_account_id(self, session: Union[boto3.Session, aioboto3.Session, None]) -> Optional[str]:
+        owner = self._owner(session)
+        access_key = self._access_key(owner) if owner is not None else None
+        return self._account_ids.get(access_key) if access_key else None
+    def get_account_id(self, session: Union[boto3.Session, aioboto3.Session]) -> str:
+        owner = self._owner(session)
+        if owner is None:
+            raise ValueError("Async session was not created by the session cache")
+        session = owner
+        access_key = self._access_key(session)
+        account_id = self._account_ids.get(access_key) if access_key else None
+        if account_id:
+            return account_id
+        self._count("sts_calls")
+        account_id = session.client('sts').get_caller_identity()['Account']
+        if access_key:
+            with self._lock:
+                self._account_ids[access_key] = account_id
+        return account_id
+    def invalidate(self, role_arn: Optional[str] = None):
+        with self._lock:
+            if role_arn is None:
+                self._entries.clear()
+                self._account_ids.clear()
+                self._async_sessions.clear()
+                return
+            if role_arn.startswith(ACCESS_KEY_PRINCIPAL_PREFIX):
+                prefix = f"keys:{role_arn[len(ACCESS_KEY_PRINCIPAL_PREFIX):]}:"
+            else:
+                prefix = f"role:{role_arn}:"
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                self._forget(self._entries.pop(key).session)
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                "sts_calls": self.sts_calls,
+                "refreshing": len(self._refreshing),
+            }
+session_cache = SessionCache()
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+logger = logging.getLogger(__name__)
+SNAPSHOT_STORE_PATH = os.path.expanduser(
+    os.getenv("SNAPSHOT_STORE_PATH", "~/.cache/mcp_agent_layer/inventory_snapshots.sqlite3")
+)
+RESOURCE_ID_FIELDS = {
+    'ec2_instances': ('instance_id',),
+    'ec2_tags': ('ResourceId', 'Key'),
+    'rds_instances': ('db_instance_identifier',),
+    'rds_clusters': ('db_cluster_identifier',),
+    'lambda_functions': ('function_arn',),
+    'log_groups': ('log_group_name',),
+}
+CHANGE_SIGNAL_FIELDS = {
+    'ec2_instances': ('state', 'instance_type', 'launch_time'),
+    'ec2_tags': ('Value',),
+    'rds_instances': ('db_instance_status', 'db_instance_class', 'allocated_storage', 'engine_version'),
+    'rds_clusters': ('status', 'engine_version', 'members'),
+    'lambda_functions': ('last_modified', 'version'),
+    'log_groups': ('retention_in_days', 'metric_filter_count'),
+}
+def resource_id(data_type: str, record: Dict[str, Any]) -> str:
+    return '/'.join(str(record.get(field)) for field in RESOURCE_ID_FIELDS.get(data_type, ('id',)))
+def digest(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+def change_signal(data_type: str, record: Dict[str, Any]) -> str:
+    return digest([record.get(field) for field in CHANGE_SIGNAL_FIELDS.get(data_type, ())])
+def changed_fields(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, List[Any]]:
+    return {
+        field: [previous.get(field), current.get(field)]
+        for field in sorted(set(previous) | set(current))
+        if previous.get(field) != current.get(field)
+    }
+class SnapshotStore:
+    def __init__(self, path: str = SNAPSHOT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self.syncs = 0
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshot_resources ("
+                "account_id TEXT, region TEXT, data_type TEXT, resource_id TEXT, "
+                "signal TEXT, digest TEXT, record TEXT, "
+                "PRIMARY KEY (account_id, region, data_type, resource_id))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshot_meta ("
+                "account_id TEXT, region TEXT, data_type TEXT, synced_at REAL, "
+                "resource_count INTEGER, summary TEXT, "
+                "PRIMARY KEY (account_id, region, data_type))"
+            )
+            self._conn = conn
+        return self._conn
+    def previous(self, account_id: str, region: str, data_type: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT synced_at, resource_count, summary FROM snapshot_meta "
+                "WHERE account_id = ? AND region = ? AND data_type = ?",
+                (account_id, region, data_type)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'synced_at': row[0], 'resource_count': row[1], 'summary': json.loads(row[2])}
+    def fingerprints(self, account_id: str, region: str, data_type: str) -> Dict[str, Tuple[str, str]]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT resource_id, signal, digest FROM snapshot_resources "
+                "WHERE account_id = ? AND region = ? AND data_type = ?",
+                (account_id, region, data_type)
+            ).fetchall()
+        return {rid: (signal, record_digest) for rid, signal, record_digest in rows}
+    def records(self, account_id: str, region: str, data_type: str, resource_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        resource_ids = list(resource_ids)
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            for i in range(0, len(resource_ids), 500):
+                batch = resource_ids[i:i + 500]
+                rows = conn.execute(
+                    "SELECT resource_id, record FROM snapshot_resources "
+                    f"WHERE account_id = ? AND region = ? AND data_type = ? AND resource_id IN ({','.join('?' * len(batch))})",
+                    (account_id, region, data_type, *batch)
+                ).fetchall()
+                found.update({rid: json.loads(record) for rid, record in rows})
+        return found
+    def save(
+        self,
+        account_id: str,
+        region: str,
+        data_type: str,
+        upserts: List[Tuple[str, str, str, Dict[str, Any]]],
+        removed: List[str],
+        resource_count: int,
+        summary: Dict[str, Any]
+    ):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO snapshot_resources VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (account_id, region, data_type, rid, signal, record_digest, json.dumps(record, default=str))
+                        for rid, signal, record_digest, record in upserts
+                    ]
+                )
+                conn.executemany(
+                    "DELETE FROM snapshot_resources WHERE account_id = ? AND region = ? AND data_type = ? AND resource_id = ?",
+                    [(account_id, region, data_type, rid) for rid in removed]
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO snapshot_meta VALUES (?, ?, ?, ?, ?, ?)",
+                    (account_id, region, data_type, time.time(), resource_count, json.dumps(summary, default=str))
+                )
+            self.syncs += 1
+    def invalidate(self, account_id: Optional[str] = None):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                for table in ("snapshot_resources", "snapshot_meta"):
+                    if account_id is None:
+                        conn.execute(f"DELETE FROM {table}")
+                    else:
+                        conn.execute(f"DELETE FROM {table} WHERE account_id = ?", (account_id,))
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connection()
+            return {
+                "path": self.path,
+                "snapshots": conn.execute("SELECT COUNT(*) FROM snapshot_meta").fetchone()[0],
+                "resources": conn.execute("SELECT COUNT(*) FROM snapshot_resources").fetchone()[0],
+                "syncs": self.syncs,
+            }
+snapshot_store = SnapshotStore()
@@ -0,0 +1,70 @@
+import json
+import threading
+import time
+import pytest
+import bedrock_agent
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    config = tmp_path / "config"
+    config.write_text("[profile test]\nregion = us-east-1\naws_access_key_id = testing\naws_secret_access_key = testing\n")
+    monkeypatch.setenv("AWS_CONFIG_FILE", str(config))
+    with bedrock_agent.BedrockOptimizationAgent("arn:aws:iam::123456789012:role/TestRole", profile_name="test", tool_timeout=0.3) as agent:
+        yield agent
+def run_calls(agent, durations):
+    def call(tool_name, parameters):
+        time.sleep(durations[tool_name])
+        return {"status": "success", "tool": tool_name}
+    return run_tool_calls(agent, call, list(durations))
+def run_tool_calls(agent, call, names):
+    agent._call_mcp_tool = call
+    tool_calls = [{"id": name, "function": {"name": name, "arguments": "{}"}} for name in names]
+    events = []
+    generator = agent._run_tool_calls(tool_calls)
+    while True:
+        try:
+            events.append(next(generator))
+        except StopIteration as finished:
+            return events, finished.value
+def test_only_expired_tool_calls_time_out(agent):
+    events, results = run_calls(agent, {"fast": 0.01, "slow": 1.0, "medium": 0.1})
+    statuses = {name: result.get("error_code") or result["status"] for _, name, _, result in results}
+    assert statuses == {"fast": "success", "slow": "ToolTimeout", "medium": "success"}
+    assert [name for _, name, _, _ in results] == ["fast", "slow", "medium"]
+    ends = [event for event in events if event["type"] == "tool_end"]
+    assert [event["tool"] for event in ends] == ["fast", "medium", "slow"]
+def test_queued_tool_calls_get_their_full_timeout(tmp_path, monkeypatch):
+    config = tmp_path / "config"
+    config.write_text("[profile test]\nregion = us-east-1\naws_access_key_id = testing\naws_secret_access_key = testing\n")
+    monkeypatch.setenv("AWS_CONFIG_FILE", str(config))
+    ran = []
+    def call(tool_name, parameters):
+        ran.append(tool_name)
+        time.sleep(0.2)
+        return {"status": "success", "tool": tool_name}
+    with bedrock_agent.BedrockOptimizationAgent(
+        "arn:aws:iam::123456789012:role/TestRole", profile_name="test", tool_concurrency=1, tool_timeout=0.3
+    ) as agent:
+        _, results = run_tool_calls(agent, call, ["first", "second", "third"])
+    assert [result["status"] for _, _, _, result in results] == ["success", "success", "success"]
+    assert ran == ["first", "second", "third"]
+def test_close_releases_tool_threads(tmp_path, monkeypatch):
+    config = tmp_path / "config"
+    config.write_text("[profile test]\nregion = us-east-1\naws_access_key_id = testing\naws_secret_access_key = testing\n")
+    monkeypatch.setenv("AWS_CONFIG_FILE", str(config))
+    before = threading.active_count()
+    for _ in range(5):
+        with bedrock_agent.BedrockOptimizationAgent("arn:aws:iam::123456789012:role/TestRole", profile_name="test") as agent:
+            run_calls(agent, {"fast": 0.0})
+    time.sleep(0.1)
+    assert threading.active_count() <= before + 1
+def test_request_body_embeds_the_serialized_tool_catalog(agent):
+    catalog = bedrock_agent.get_tool_catalog()
+    messages = [{"role": "user", "content": 'quote " and } brace'}]
+    body = json.loads(agent._request_body(messages, catalog.model_tools_json, 128))
+    assert body["tools"] == catalog.model_tools
+    assert body["messages"] == messages and body["max_tokens"] == 128
+    assert json.loads(agent._request_body(messages, catalog.model_tools, 128))["tools"] == catalog.model_tools
+    assert "tools" not in json.loads(agent._request_body(messages, None, 128))
+def test_encoded_fields_replace_plain_fields():
+    body = bedrock_agent.encode_json_object({"a": 1, "tools": "stale"}, {"tools": "[1, 2]"})
+    assert json.loads(body) == {"a": 1, "tools": [1, 2]}
@@ -0,0 +1,51 @@
+import asyncio
+from client_registry import ClientRegistry
+class StubContext:
+    def __init__(self, name: str):
+        self.name = name
+        self.closed = False
+    async def __aenter__(self):
+        return self
+    async def __aexit__(self, *exc_info):
+        self.closed = True
+class StubSession:
+    def client(self, service, region_name=None, config=None):
+        return StubContext(f"{service}/{region_name}")
+def test_idle_cleanup_skips_clients_in_use():
+    async def scenario():
+        registry = ClientRegistry(idle_seconds=0)
+        session = StubSession()
+        async with registry.client(session, 'logs', 'us-east-1') as busy:
+            await asyncio.sleep(0.01)
+            async with registry.client(session, 'ec2', 'us-east-1'):
+                pass
+            assert not busy.closed
+        await asyncio.sleep(0.01)
+        await registry.close_idle()
+        assert busy.closed
+        assert registry.stats()['in_use'] == 0
+    asyncio.run(scenario())
+def test_release_refreshes_last_used():
+    async def scenario():
+        registry = ClientRegistry(idle_seconds=60)
+        session = StubSession()
+        async with registry.client(session, 'cloudwatch', 'us-east-1') as client:
+            entry = next(iter(registry._entries.values()))
+            entry.last_used -= 3600
+        assert entry.in_use == 0
+        await registry.close_idle()
+        assert not client.closed
+    asyncio.run(scenario())
+def test_concurrent_leases_share_one_client():
+    async def scenario():
+        registry = ClientRegistry()
+        session = StubSession()
+        async def use():
+            async with registry.client(session, 's3', 'us-east-1') as client:
+                await asyncio.sleep(0.01)
+                return client
+        clients = await asyncio.gather(*(use() for _ in range(5)))
+        assert len({id(client) for client in clients}) == 1
+        assert registry.stats()['created'] == 1
+        assert registry.stats()['in_use'] == 0
+    asyncio.run(scenario())
@@ -0,0 +1,54 @@
+import json
+from context_compaction import ContextCompactor, ToolResultStore, estimate_tokens, fetch_tool_result, tool_result_store
+OWNER = 'arn:aws:iam::123456789012:role/compaction-test'
+def big_result(count: int = 400):
+    return {
+        'status': 'success',
+        'data_type': 'ec2_instances',
+        'data': [
+            {'instance_id': f"i-{i:04d}", 'instance_type': 't3.micro' if i % 2 else 'm5.large', 'cpu': float(i)}
+            for i in range(count)
+        ]
+    }
+def test_small_results_pass_through_unchanged():
+    compactor = ContextCompactor(OWNER, store=ToolResultStore())
+    result = {'status': 'success', 'data': [{'instance_id': 'i-1'}]}
+    content = json.loads(compactor.compact('get_ec2_instances', result))
+    assert content.pop('compaction') == 'full'
+    assert content.pop('result_handle').startswith('res_')
+    assert content == result
+    assert compactor.stats()['summarized'] == 0
+def test_large_results_are_summarized_within_budget_and_stay_fetchable():
+    compactor = ContextCompactor(OWNER, result_tokens=500)
+    result = big_result()
+    content = compactor.compact('get_ec2_instances', result)
+    assert estimate_tokens(content) <= 500
+    handle = json.loads(content)['result_handle']
+    page = fetch_tool_result(OWNER, handle, path='data', offset=10, limit=5)
+    assert page['status'] == 'success' and page['total'] == 400
+    assert [item['instance_id'] for item in page['items']] == [f"i-{i:04d}" for i in range(10, 15)]
+    assert page['has_more']
+    assert fetch_tool_result(OWNER, handle, path='data.3.instance_id')['value'] == 'i-0003'
+def test_handles_are_scoped_to_their_owner():
+    handle = tool_result_store.put(OWNER, 'get_ec2_instances', big_result(5))
+    assert fetch_tool_result('arn:aws:iam::999999999999:role/other', handle)['error_code'] == 'ResultNotFound'
+    assert fetch_tool_result(OWNER, handle, path='missing')['error_code'] == 'InvalidParameter'
+def test_evicted_history_keeps_handles_resolvable():
+    compactor = ContextCompactor(OWNER, result_tokens=4000, history_tokens=200)
+    messages = [
+        {'role': 'tool', 'tool_call_id': str(i), 'content': compactor.compact('get_ec2_instances', big_result(60))}
+        for i in range(3)
+    ]
+    messages.append({'role': 'user', 'content': 'latest question'})
+    handles = [json.loads(message['content'])['result_handle'] for message in messages[:3]]
+    assert compactor.evict(messages, protect_from=3) > 0
+    for message, handle in zip(messages[:3], handles):
+        content = json.loads(message['content'])
+        assert content['result_handle'] == handle
+        assert content['compaction'] in ('summary', 'evicted')
+        assert fetch_tool_result(OWNER, handle, path='data', limit=1)['total'] == 60
+    assert messages[3] == {'role': 'user', 'content': 'latest question'}
+def test_fetch_results_are_never_recompacted():
+    compactor = ContextCompactor(OWNER, store=ToolResultStore(), result_tokens=10)
+    page = {'status': 'success', 'items': list(range(100))}
+    assert json.loads(compactor.compact('fetch_tool_result', page)) == page
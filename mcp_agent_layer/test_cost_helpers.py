@@ -0,0 +1,46 @@
+from tools import add_cost_metrics, rollup_cost_results, split_date_window
+def day(start: str, amount: str, groups=None, estimated: bool = False):
+    return {
+        'TimePeriod': {'Start': start, 'End': start},
+        'Total': {'UnblendedCost': {'Amount': amount, 'Unit': 'USD'}},
+        'Groups': groups or [],
+        'Estimated': estimated
+    }
+def test_split_date_window_chunks_and_keeps_end():
+    assert split_date_window('2024-01-01', '2024-01-08', 3) == [
+        ('2024-01-01', '2024-01-04'),
+        ('2024-01-04', '2024-01-07'),
+        ('2024-01-07', '2024-01-08'),
+    ]
+    assert split_date_window('2024-01-01', '2024-01-03', 30) == [('2024-01-01', '2024-01-03')]
+    assert split_date_window('2024-01-01', '2024-01-01', 3) == []
+def test_add_cost_metrics_sums_decimal_strings():
+    target = {}
+    add_cost_metrics(target, {'UnblendedCost': {'Amount': '0.1', 'Unit': 'USD'}})
+    add_cost_metrics(target, {'UnblendedCost': {'Amount': '0.2', 'Unit': 'USD'}, 'UsageQuantity': {'Amount': None}})
+    assert target == {
+        'UnblendedCost': {'Amount': '0.3', 'Unit': 'USD'},
+        'UsageQuantity': {'Amount': '0', 'Unit': ''},
+    }
+def test_daily_granularity_returns_days_unchanged():
+    days = [day('2024-01-01', '1')]
+    assert rollup_cost_results(days, '2024-01-01', '2024-01-02', 'DAILY') is days
+def test_monthly_rollup_splits_on_month_boundaries():
+    service = lambda name, amount: {'Keys': [name], 'Metrics': {'UnblendedCost': {'Amount': amount, 'Unit': 'USD'}}}
+    days = [
+        day('2024-01-30', '1.5', [service('EC2', '1.0'), service('S3', '0.5')]),
+        day('2024-01-31', '2.5', [service('EC2', '2.5')]),
+        day('2024-02-01', '4', [service('EC2', '4')], estimated=True),
+    ]
+    periods = rollup_cost_results(days, '2024-01-30', '2024-02-02', 'MONTHLY')
+    assert [period['TimePeriod'] for period in periods] == [
+        {'Start': '2024-01-30', 'End': '2024-02-01'},
+        {'Start': '2024-02-01', 'End': '2024-02-02'},
+    ]
+    january, february = periods
+    assert january['Total']['UnblendedCost']['Amount'] == '4.0'
+    assert {group['Keys'][0]: group['Metrics']['UnblendedCost']['Amount'] for group in january['Groups']} == {
+        'EC2': '3.5', 'S3': '0.5'
+    }
+    assert not january['Estimated'] and february['Estimated']
+    assert february['Total']['UnblendedCost']['Amount'] == '4'
@@ -0,0 +1,105 @@
+import pytest
+from inventory_store import ColumnarInventory, InventoryStore, StringPool, NULL_CODE
+INSTANCES = [
+    {
+        'instance_id': 'i-1', 'instance_type': 't3.micro', 'state': 'running',
+        'launch_time': '2024-01-01T00:00:00+00:00', 'tags': {'env': 'prod', 'team': 'core'},
+    },
+    {
+        'instance_id': 'i-2', 'instance_type': 't3.micro', 'state': 'stopped',
+        'launch_time': '2024-02-01T00:00:00Z', 'tags': {'env': 'dev'},
+    },
+    {
+        'instance_id': 'i-3', 'instance_type': 'm5.large', 'state': 'running',
+        'launch_time': None, 'tags': {},
+    },
+]
+def make_table() -> ColumnarInventory:
+    return ColumnarInventory('ec2_instances').extend(dict(record) for record in INSTANCES)
+def ids(table: ColumnarInventory, rows) -> list:
+    return [table.row(row, ['instance_id'])['instance_id'] for row in rows]
+def test_string_pool_round_trips_and_dedupes():
+    pool = StringPool()
+    first = pool.intern('t3.micro')
+    assert pool.intern('t3.micro') == first
+    assert pool.intern(None) == NULL_CODE
+    assert pool.value(first) == 't3.micro' and pool.value(NULL_CODE) is None
+    assert pool.lookup('unknown') is None
+    assert len(pool.values) == 1
+def test_rows_round_trip_through_columns():
+    table = make_table()
+    assert len(table) == 3
+    first = table.row(0)
+    assert first['instance_id'] == 'i-1'
+    assert first['tags'] == {'env': 'prod', 'team': 'core'}
+    assert first['launch_time'] == '2024-01-01T00:00:00+00:00'
+    assert table.row(2)['launch_time'] is None and table.row(2)['tags'] == {}
+    assert table.row(1)['public_ip'] is None
+    assert table.describe()['distinct_strings'] < sum(len(record) for record in INSTANCES)
+def test_filters_on_tags_and_categories():
+    table = make_table()
+    assert ids(table, table.filter({'tag:env': 'prod'})) == ['i-1']
+    assert ids(table, table.filter({'tag:env': {'exists': False}})) == ['i-3']
+    assert ids(table, table.filter({'tag:env': ['prod', 'dev'], 'state': 'running'})) == ['i-1']
+    assert ids(table, table.filter({'tag:owner': 'nobody'})) == []
+    assert ids(table, table.filter({'instance_type': {'ne': 't3.micro'}})) == ['i-3']
+    assert ids(table, table.filter({'launch_time': {'gte': '2024-01-15T00:00:00Z'}})) == ['i-2']
+def test_filters_reject_bad_columns_and_operators():
+    table = make_table()
+    with pytest.raises(KeyError):
+        table.filter({'missing': 'x'})
+    with pytest.raises(ValueError):
+        table.filter({'state': {'gt': 'running'}})
+    with pytest.raises(ValueError):
+        table.filter({'state': {'like': 'run'}})
+def test_group_by_counts_and_sums():
+    table = ColumnarInventory('log_groups').extend([
+        {'log_group_name': '/a', 'retention_in_days': 7, 'stored_bytes': 100},
+        {'log_group_name': '/b', 'retention_in_days': 7, 'stored_bytes': 50},
+        {'log_group_name': '/c', 'retention_in_days': None, 'stored_bytes': 25},
+    ])
+    groups = table.group_by('retention_in_days', sum_columns=['stored_bytes'])
+    assert groups == [
+        {'retention_in_days': 7, 'count': 2, 'sum_stored_bytes': 150},
+        {'retention_in_days': None, 'count': 1, 'sum_stored_bytes': 25},
+    ]
+def test_group_by_tag_within_a_selection():
+    table = make_table()
+    groups = table.group_by(['instance_type', 'tag:env'], selection=table.filter({'state': 'running'}))
+    assert sorted(groups, key=lambda g: g['instance_type']) == [
+        {'instance_type': 'm5.large', 'tag:env': None, 'count': 1},
+        {'instance_type': 't3.micro', 'tag:env': 'prod', 'count': 1},
+    ]
+def test_unknown_fields_extend_the_schema():
+    table = make_table()
+    table.append({'instance_id': 'i-4', 'owner_count': 3, 'labels': {'a': 'b'}})
+    assert table.schema['owner_count'] == 'number' and table.schema['labels'] == 'tags'
+    assert table.row(0)['owner_count'] is None
+    assert table.row(3)['labels'] == {'a': 'b'}
+def test_store_expires_tables(monkeypatch):
+    import inventory_store
+    now = [1000.0]
+    monkeypatch.setattr(inventory_store.time, 'time', lambda: now[0])
+    store = InventoryStore(ttl=60)
+    store.put('123', 'us-east-1', make_table())
+    assert store.get('123', 'us-east-1', 'ec2_instances') is not None
+    now[0] += 61
+    assert store.get('123', 'us-east-1', 'ec2_instances') is None
+@pytest.mark.parametrize('column', ['instance_type', 'tag:env', 'tags'])
+def test_group_by_rejects_non_numeric_sums(column):
+    with pytest.raises(ValueError, match='sum|tag:<Key>'):
+        make_table().group_by('state', sum_columns=[column])
+def test_group_by_rejects_object_sums_and_keys():
+    table = ColumnarInventory('lambda_functions').extend([
+        {'function_name': 'f', 'runtime': 'python3.12', 'architectures': ['arm64']},
+    ])
+    with pytest.raises(ValueError, match="Cannot sum 'architectures'"):
+        table.group_by('runtime', sum_columns=['architectures'])
+    with pytest.raises(ValueError, match="Cannot group by 'architectures'"):
+        table.group_by('architectures')
+def test_tags_column_points_to_tag_syntax():
+    table = make_table()
+    with pytest.raises(ValueError, match='tag:<Key>'):
+        table.filter({'tags': 'prod'})
+    with pytest.raises(ValueError, match='tag:<Key>'):
+        table.group_by('tags')
@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from botocore.exceptions import ClientError
+import resilience
+from resilience import AdaptiveTokenBucket, CircuitBreaker, ResilienceLayer, RetryBudget, TokenBucket
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+    def monotonic(self) -> float:
+        return self.now
+    def advance(self, seconds: float):
+        self.now += seconds
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(resilience, 'time', fake)
+    return fake
+def client_error(code: str, status: int = 400) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': code}, 'ResponseMetadata': {'HTTPStatusCode': status}}, 'Op')
+def test_token_bucket_spends_burst_then_schedules_waits(clock):
+    bucket = TokenBucket(rate=2.0, capacity=2.0)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+    clock.advance(10)
+    assert bucket.reserve() == 0.0
+    assert bucket.tokens == pytest.approx(1.0)
+def test_adaptive_bucket_halves_on_throttle_and_recovers_additively(clock):
+    bucket = AdaptiveTokenBucket(rate=8.0, min_rate=1.0)
+    bucket.on_throttle()
+    assert bucket.rate == 4.0 and bucket.tokens <= 0
+    bucket.on_throttle()
+    bucket.on_throttle()
+    bucket.on_throttle()
+    assert bucket.rate == 1.0 and bucket.throttles == 4
+    bucket.on_success()
+    assert bucket.rate == pytest.approx(1.5)
+    for _ in range(1000):
+        bucket.on_success()
+    assert bucket.rate == 8.0
+def test_retry_budget_exhausts_and_refills_with_traffic(clock):
+    budget = RetryBudget(ratio=0.5, min_per_second=1.0, max_tokens=2.0)
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+    assert budget.exhausted == 1
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+    clock.advance(3)
+    budget.deposit()
+    assert budget.tokens == pytest.approx(2.0)
+def test_retries_stop_when_budget_is_exhausted(clock, monkeypatch):
+    async def no_sleep(seconds):
+        return None
+    monkeypatch.setattr(resilience.asyncio, 'sleep', no_sleep)
+    layer = ResilienceLayer(max_retries=5, base_delay=0, max_delay=0)
+    layer.retry_budget = RetryBudget(ratio=0.0, min_per_second=0.0, max_tokens=2.0)
+    attempts = []
+    async def failing():
+        attempts.append(1)
+        raise client_error('InternalError', 500)
+    with pytest.raises(ClientError):
+        asyncio.run(layer.call('123456789012', 'ec2', 'DescribeInstances', failing))
+    assert len(attempts) == 3
+    assert layer.retries == 2 and layer.retry_budget.exhausted == 1
+def test_non_retryable_errors_are_not_retried(clock):
+    layer = ResilienceLayer(max_retries=5)
+    attempts = []
+    async def denied():
+        attempts.append(1)
+        raise client_error('AccessDenied', 403)
+    with pytest.raises(ClientError):
+        asyncio.run(layer.call('123456789012', 'ec2', 'DescribeInstances', denied))
+    assert len(attempts) == 1 and layer.retries == 0
+def test_circuit_opens_then_admits_a_single_half_open_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == "open" and breaker.trips == 1
+    assert not breaker.allow()
+    clock.advance(30)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+def test_failed_half_open_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+    clock.advance(10)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.trips == 2
+    clock.advance(5)
+    assert not breaker.allow()
+def test_open_circuit_rejects_calls_with_circuit_open_error(clock):
+    layer = ResilienceLayer()
+    breaker = layer.breaker('ce')
+    breaker.failure_threshold = 1
+    breaker.record_failure()
+    async def never_called():
+        raise AssertionError('call should have been rejected')
+    with pytest.raises(ClientError) as raised:
+        asyncio.run(layer.call('123456789012', 'ce', 'GetCostAndUsage', never_called))
+    assert raised.value.response['Error']['Code'] == 'CircuitOpen'
+    assert layer.stats()['circuits']['ce']['state'] == 'open'
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from result_cache import ToolResultCache
+def run(coro):
+    return asyncio.run(coro)
+def test_concurrent_misses_share_one_call():
+    cache = ToolResultCache(default_ttl=60)
+    calls = []
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'status': 'success', 'data': [1, 2, 3]}
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_call('tool', {'role_arn': 'r'}, call) for _ in range(5)))
+    results = run(scenario())
+    assert len(calls) == 1
+    assert all(result == {'status': 'success', 'data': [1, 2, 3]} for result in results)
+    assert cache.stats()['misses'] == 1 and cache.stats()['coalesced'] == 4
+def test_leader_exception_reaches_followers():
+    cache = ToolResultCache(default_ttl=60)
+    async def call():
+        await asyncio.sleep(0.05)
+        raise RuntimeError('boom')
+    async def scenario():
+        return await asyncio.gather(
+            *(cache.get_or_call('tool', {}, call) for _ in range(3)),
+            return_exceptions=True
+        )
+    results = run(scenario())
+    assert all(isinstance(result, RuntimeError) and str(result) == 'boom' for result in results)
+    stats = cache.stats()
+    assert stats['entries'] == 0 and stats['in_flight'] == 0
+def test_lru_eviction_respects_byte_budget():
+    cache = ToolResultCache(max_bytes=200, default_ttl=60)
+    async def call(value):
+        return {'status': 'success', 'data': value * 40}
+    async def scenario():
+        await cache.get_or_call('tool', {'n': 1}, lambda: call('a'))
+        await cache.get_or_call('tool', {'n': 2}, lambda: call('b'))
+        await cache.get_or_call('tool', {'n': 1}, lambda: call('stale'))
+        await cache.get_or_call('tool', {'n': 3}, lambda: call('c'))
+    run(scenario())
+    stats = cache.stats()
+    assert stats['bytes'] <= 200 and stats['evictions'] == 1
+    keys = list(cache._entries)
+    assert keys == [cache.make_key('tool', {'n': 1}), cache.make_key('tool', {'n': 3})]
+def test_oversized_results_are_not_stored():
+    cache = ToolResultCache(max_bytes=10, default_ttl=60)
+    async def call():
+        return {'status': 'success', 'data': 'x' * 100}
+    run(cache.get_or_call('tool', {}, call))
+    assert cache.stats()['entries'] == 0
+def test_entries_expire_after_ttl(monkeypatch):
+    import result_cache
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, 'time', lambda: now[0])
+    cache = ToolResultCache(default_ttl=30)
+    calls = []
+    async def call():
+        calls.append(1)
+        return {'status': 'success', 'data': len(calls)}
+    assert run(cache.get_or_call('tool', {}, call))['data'] == 1
+    now[0] += 29
+    assert run(cache.get_or_call('tool', {}, call))['data'] == 1
+    now[0] += 2
+    assert run(cache.get_or_call('tool', {}, call))['data'] == 2
+    assert cache.stats()['expirations'] == 1
+@pytest.mark.parametrize('result', [
+    {'status': 'error', 'error_code': 'Throttling'},
+    {'status': 'success', 'partial': True, 'data': []},
+])
+def test_errors_and_partial_results_are_not_cached(result):
+    cache = ToolResultCache(default_ttl=60)
+    async def call():
+        return result
+    run(cache.get_or_call('tool', {}, call))
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,55 @@
+import gc
+import boto3
+from session_cache import SessionCache
+def make_cache_with_session(access_key: str = 'AKIATEST'):
+    cache = SessionCache()
+    session = cache.get_access_key_session(access_key, 'secret')
+    cache._account_ids[access_key] = '123456789012'
+    return cache, session
+def test_async_session_resolves_account_id_through_owner():
+    cache, session = make_cache_with_session()
+    async_session = cache.get_async_session(session)
+    assert cache.cached_account_id(async_session) == '123456789012'
+    assert cache.get_account_id(async_session) == '123456789012'
+def test_account_lookup_survives_invalidate_for_in_flight_async_sessions():
+    cache, session = make_cache_with_session()
+    async_session = cache.get_async_session(session)
+    cache.invalidate()
+    assert cache.cached_account_id(async_session) is None
+    cache._account_ids['AKIATEST'] = '123456789012'
+    assert cache.cached_account_id(async_session) == '123456789012'
+def test_replaced_session_keeps_old_async_session_resolvable():
+    cache, session = make_cache_with_session()
+    async_session = cache.get_async_session(session)
+    cache._forget(session)
+    assert cache.cached_account_id(async_session) is None
+    assert cache.get_async_session(session) is not async_session
+def test_unknown_async_session_is_not_inspected_synchronously():
+    import aioboto3
+    cache = SessionCache()
+    stranger = aioboto3.Session(aws_access_key_id='AKIAOTHER', aws_secret_access_key='secret')
+    assert cache.cached_account_id(stranger) is None
+    assert cache.cached_account_id(None) is None
+def test_owner_map_does_not_outlive_async_sessions():
+    cache, session = make_cache_with_session()
+    cache.get_async_session(session)
+    cache.invalidate()
+    gc.collect()
+    assert len(cache._async_owners) == 0
+def test_sync_sessions_resolve_directly():
+    cache, session = make_cache_with_session()
+    assert isinstance(session, boto3.Session)
+    assert cache.cached_account_id(session) == '123456789012'
+def test_access_key_principals_route_to_cached_key_sessions():
+    cache = SessionCache()
+    principal = cache.register_access_keys('AKIAKEYS', 'secret')
+    assert principal == 'access-key:AKIAKEYS'
+    session = cache.get_session(principal)
+    assert session.get_credentials().access_key == 'AKIAKEYS'
+    assert cache.get_session(principal) is session
+    cache.invalidate(principal)
+    assert cache.get_session(principal) is not session
+def test_unregistered_access_key_principal_is_rejected():
+    import pytest
+    with pytest.raises(Exception, match='No access keys registered'):
+        SessionCache().get_session('access-key:AKIAMISSING')
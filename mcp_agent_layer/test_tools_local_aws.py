@@ -0,0 +1,178 @@
+import time
+import boto3
+import tools
+from conftest import TEST_ROLE_ARN
+def put_log_events(group: str, count: int, region: str = 'us-east-1'):
+    logs = boto3.client('logs', region_name=region)
+    logs.create_log_group(logGroupName=group)
+    logs.create_log_stream(logGroupName=group, logStreamName='app')
+    now = int(time.time() * 1000) - count
+    logs.put_log_events(
+        logGroupName=group,
+        logStreamName='app',
+        logEvents=[{'timestamp': now + i, 'message': f"event {i}"} for i in range(count)]
+    )
+def test_incremental_log_scan_resumes_after_truncation(aws):
+    put_log_events('/test/incremental', 250)
+    first = tools.filter_log_events(TEST_ROLE_ARN, '/test/incremental', limit=100, incremental=True)
+    second = tools.filter_log_events(TEST_ROLE_ARN, '/test/incremental', limit=100, incremental=True)
+    third = tools.filter_log_events(TEST_ROLE_ARN, '/test/incremental', limit=100, incremental=True)
+    assert first['data']['truncated'] and first['data']['checkpoint']['resumed_from'] is None
+    assert second['data']['checkpoint']['resumed_from'] is not None
+    assert second['data']['checkpoint']['advanced']
+    messages = [event['message'] for result in (first, second, third) for event in result['data']['events']]
+    assert messages == [f"event {i}" for i in range(250)]
+    assert third['data']['checkpoint']['caught_up']
+def test_ecs_tasks_reports_failed_describe_batches(aws, monkeypatch):
+    from botocore.exceptions import ClientError
+    async def list_task_arns(client, method_name, key, **kwargs):
+        return [f"arn:aws:ecs:us-east-1:123456789012:task/c/{i}" for i in range(150)]
+    async def failing_describe(client, method_name, **kwargs):
+        raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'slow down'}}, method_name)
+    monkeypatch.setattr(tools, 'paginate_results', list_task_arns)
+    monkeypatch.setattr(tools, 'aws_call', failing_describe)
+    result = tools.get_ecs_tasks(TEST_ROLE_ARN, 'c')
+    assert result['status'] == 'error'
+    assert result['error_code'] == 'ThrottlingException'
+    assert tools.result_cache.stats()['entries'] == 0
+def test_ecs_tasks_keeps_failures_in_partial_results(aws, monkeypatch):
+    async def list_task_arns(client, method_name, key, **kwargs):
+        return ['arn:aws:ecs:us-east-1:123456789012:task/c/1', 'arn:aws:ecs:us-east-1:123456789012:task/c/2']
+    async def describe(client, method_name, **kwargs):
+        return {
+            'tasks': [{'taskArn': kwargs['tasks'][0], 'lastStatus': 'RUNNING'}],
+            'failures': [{'arn': kwargs['tasks'][1], 'reason': 'MISSING'}]
+        }
+    monkeypatch.setattr(tools, 'paginate_results', list_task_arns)
+    monkeypatch.setattr(tools, 'aws_call', describe)
+    result = tools.get_ecs_tasks(TEST_ROLE_ARN, 'c')
+    assert result['status'] == 'success' and result['partial']
+    assert len(result['data']) == 1
+    assert result['failures'] == [{'arn': 'arn:aws:ecs:us-east-1:123456789012:task/c/2', 'reason': 'MISSING'}]
+    assert tools.result_cache.stats()['entries'] == 0
+def test_normalize_bucket_region_maps_legacy_locations():
+    assert tools.normalize_bucket_region(None) == 'us-east-1'
+    assert tools.normalize_bucket_region('') == 'us-east-1'
+    assert tools.normalize_bucket_region('EU') == 'eu-west-1'
+    assert tools.normalize_bucket_region('ap-south-1') == 'ap-south-1'
+def test_s3_buckets_resolve_legacy_eu_location(aws, monkeypatch):
+    boto3.client('s3', region_name='us-east-1').create_bucket(
+        Bucket='legacy-eu-bucket',
+        CreateBucketConfiguration={'LocationConstraint': 'eu-west-1'}
+    )
+    real_aws_call = tools.aws_call
+    async def legacy_location(client, method_name, **kwargs):
+        if method_name == 'get_bucket_location':
+            return {'LocationConstraint': 'EU'}
+        result = await real_aws_call(client, method_name, **kwargs)
+        if method_name == 'list_buckets':
+            for bucket in result.get('Buckets', []):
+                bucket.pop('BucketRegion', None)
+        return result
+    monkeypatch.setattr(tools, 'aws_call', legacy_location)
+    result = tools.get_s3_buckets(TEST_ROLE_ARN, fields="region,versioning")
+    bucket = next(bucket for bucket in result['data'] if bucket['name'] == 'legacy-eu-bucket')
+    assert bucket['region'] == 'eu-west-1'
+    assert bucket['versioning'] != 'unknown'
+def test_s3_size_matrix_groups_legacy_eu_buckets_under_eu_west_1(aws, monkeypatch):
+    boto3.client('s3', region_name='us-east-1').create_bucket(
+        Bucket='legacy-eu-sized',
+        CreateBucketConfiguration={'LocationConstraint': 'eu-west-1'}
+    )
+    real_aws_call = tools.aws_call
+    async def legacy_listing(client, method_name, **kwargs):
+        result = await real_aws_call(client, method_name, **kwargs)
+        if method_name == 'list_buckets':
+            for bucket in result.get('Buckets', []):
+                bucket['BucketRegion'] = 'EU'
+        return result
+    monkeypatch.setattr(tools, 'aws_call', legacy_listing)
+    result = tools.get_s3_bucket_size(TEST_ROLE_ARN)
+    assert result['status'] == 'success'
+    assert set(result['region_results']) == {'eu-west-1'}
+    assert result['data']['rows'][0][1] == 'eu-west-1'
+def test_tools_accept_access_key_principals(aws):
+    boto3.client('s3', region_name='us-east-1').create_bucket(Bucket='key-principal-bucket')
+    principal = tools.session_cache.register_access_keys('testing', 'testing')
+    result = tools.get_s3_buckets(principal)
+    assert result['status'] == 'success'
+    assert [bucket['name'] for bucket in result['data']] == ['key-principal-bucket']
+def test_region_fan_out_applies_max_items_to_merged_records(aws):
+    for region in ('us-east-1', 'us-west-2'):
+        logs = boto3.client('logs', region_name=region)
+        for i in range(2):
+            logs.create_log_group(logGroupName=f"/fanout/{region}/{i}")
+    result = tools.get_log_groups(TEST_ROLE_ARN, regions="us-east-1,us-west-2", max_items=3)
+    assert result['status'] == 'success'
+    assert len(result['data']) == 3
+    assert result['max_items'] == 3 and result['max_items_reached']
+    assert 'partial' not in result
+def test_region_fan_out_marks_failed_regions_partial_and_skips_cache(aws, monkeypatch):
+    boto3.client('logs', region_name='us-east-1').create_log_group(logGroupName='/fanout/ok')
+    real_tool = tools.get_log_groups_async
+    async def flaky_region(role_arn, region="us-east-1", **kwargs):
+        if region == 'us-west-2':
+            raise RuntimeError('region unavailable')
+        return await real_tool(role_arn, region=region, **kwargs)
+    monkeypatch.setattr(tools, 'get_log_groups_async', flaky_region)
+    result = tools.get_log_groups(TEST_ROLE_ARN, regions="us-east-1,us-west-2")
+    assert result['status'] == 'success' and result['partial']
+    assert result['failed_regions'] == ['us-west-2']
+    assert not any('us-east-1,us-west-2' in key for key in tools.result_cache._entries)
+def test_cost_and_usage_rejects_malformed_dates(aws):
+    result = tools.get_cost_and_usage(TEST_ROLE_ARN, start_date='2024-13-01', end_date='2024-02-01')
+    assert result['status'] == 'error'
+    assert result['error_code'] == 'InvalidParameter' and result['recoverable']
+    assert 'YYYY-MM-DD' in result['error_message']
+    assert result['data'] == {}
+    inverted = tools.get_cost_and_usage(TEST_ROLE_ARN, start_date='2024-02-01', end_date='2024-01-01')
+    assert inverted['error_code'] == 'InvalidParameter' and inverted['recoverable']
+    assert 'must be before' in inverted['error_message']
+def test_cost_store_runs_off_the_tool_loop(aws, monkeypatch):
+    import threading
+    threads = []
+    real_get_days = tools.cost_store.get_days
+    def get_days(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return real_get_days(*args, **kwargs)
+    monkeypatch.setattr(tools.cost_store, 'get_days', get_days)
+    result = tools.get_cost_and_usage(TEST_ROLE_ARN, start_date='2024-01-01', end_date='2024-01-03')
+    assert result['status'] == 'success'
+    assert threads and 'aws-tools-loop' not in threads
+def test_recent_cost_windows_use_the_unsettled_ttl():
+    today = time.strftime('%Y-%m-%d', time.gmtime())
+    assert tools.result_cache.ttl_for('get_cost_and_usage', {'end_date': today}) == tools.cost_store.unsettled_ttl
+    assert tools.result_cache.ttl_for('get_cost_and_usage', {}) == tools.cost_store.unsettled_ttl
+    assert tools.result_cache.ttl_for('get_cost_and_usage', {'end_date': '2024-01-01'}) == tools.COST_CACHE_TTL
+    assert tools.result_cache.ttl_for('get_cost_by_service', {'end_date': '2024-01-01'}) == tools.COST_CACHE_TTL
+def test_query_inventory_reports_bad_sum_columns_as_invalid_parameter(aws):
+    boto3.client('logs', region_name='us-east-1').create_log_group(logGroupName='/inventory/sum')
+    result = tools.query_inventory(
+        TEST_ROLE_ARN, 'log_groups', group_by='retention_in_days', sum_columns=['log_group_name']
+    )
+    assert result['status'] == 'error'
+    assert result['error_code'] == 'InvalidParameter' and result['recoverable']
+    assert 'log_group_name' in result['error_message']
+def test_snapshot_store_runs_off_the_tool_loop(aws, monkeypatch):
+    import threading
+    boto3.client('logs', region_name='us-east-1').create_log_group(logGroupName='/snapshot/thread')
+    threads = {}
+    for name in ('previous', 'fingerprints', 'records', 'save'):
+        real = getattr(tools.snapshot_store, name)
+        def traced(*args, real=real, name=name, **kwargs):
+            threads[name] = threading.current_thread().name
+            return real(*args, **kwargs)
+        monkeypatch.setattr(tools.snapshot_store, name, traced)
+    result = tools.sync_inventory(TEST_ROLE_ARN, 'log_groups')
+    assert result['status'] == 'success'
+    assert set(threads) == {'previous', 'fingerprints', 'records', 'save'}
+    assert 'aws-tools-loop' not in threads.values()
+def test_app_shutdown_closes_registry_clients(monkeypatch):
+    from fastapi.testclient import TestClient
+    closed = []
+    async def close_all():
+        closed.append(True)
+    monkeypatch.setattr(tools.client_registry, 'close_all', close_all)
+    with TestClient(tools.app) as client:
+        assert client.get('/health').json()['status'] == 'healthy'
+    assert closed == [True]
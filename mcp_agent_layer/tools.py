@@ -1,70 +1,189 @@
 import asyncio
+import inspect
+import json
 import logging
+import os
+import re
+import threading
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Union
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, get_args, get_origin
 from functools import wraps
-import time
+import aioboto3
 import boto3
 from botocore.exceptions import ClientError, BotoCoreError
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastmcp import FastMCP
 from dateutil.relativedelta import relativedelta
+from instrumentation import tool_metrics
+from inventory_store import ColumnarInventory, inventory_store
+from result_cache import ToolResultCache
+from client_registry import client_registry
+from cost_store import cost_store, day_range, parse_day
+from resilience import resilience
+from session_cache import session_cache
+from snapshot_store import change_signal, changed_fields, digest, resource_id, snapshot_store
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await client_registry.close_all()
 app = FastAPI(
     title="AWS Optimization Tools",
     description="Read-only AWS data exposure for AI-driven cost optimization",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 mcp = FastMCP("aws-optimization-tools")
-def assume_role_session(role_arn: str, session_name: str = "MCPSession") -> boto3.Session:
+REGION_FANOUT_CONCURRENCY = int(os.getenv("REGION_FANOUT_CONCURRENCY", "8"))
+S3_ENRICHMENT_CONCURRENCY = int(os.getenv("S3_ENRICHMENT_CONCURRENCY", "32"))
+LOG_SCAN_MAX_EVENTS = int(os.getenv("LOG_SCAN_MAX_EVENTS", "100000"))
+LOG_PATTERN_MAX_LENGTH = 200
+INSIGHTS_MAX_LOG_GROUPS = 50
+INSIGHTS_TIME_BUCKET_SECONDS = int(os.getenv("INSIGHTS_TIME_BUCKET_SECONDS", "300"))
+INSIGHTS_CACHE_TTL = int(os.getenv("INSIGHTS_CACHE_TTL", "3600"))
+INSIGHTS_POLL_INITIAL_SECONDS = 0.5
+INSIGHTS_POLL_MAX_SECONDS = 5.0
+ECS_DESCRIBE_CONCURRENCY = int(os.getenv("ECS_DESCRIBE_CONCURRENCY", "8"))
+ECS_DESCRIBE_CLUSTERS_BATCH = 100
+ECS_DESCRIBE_TASKS_BATCH = 100
+ECS_DESCRIBE_SERVICES_BATCH = 10
+COST_WINDOW_CHUNK_DAYS = int(os.getenv("COST_WINDOW_CHUNK_DAYS", "31"))
+COST_CHUNK_CONCURRENCY = int(os.getenv("COST_CHUNK_CONCURRENCY", "4"))
+INVENTORY_CACHE_TTL = int(os.getenv("INVENTORY_CACHE_TTL", "300"))
+METRICS_CACHE_TTL = int(os.getenv("METRICS_CACHE_TTL", "300"))
+LOGS_CACHE_TTL = int(os.getenv("LOGS_CACHE_TTL", "60"))
+COST_CACHE_TTL = int(os.getenv("COST_CACHE_TTL", str(6 * 3600)))
+def cost_window_ttl(arguments: Dict[str, Any]) -> int:
+    end_date = arguments.get('end_date')
     try:
-        sts_client = boto3.client('sts')
-        response = sts_client.assume_role(
-            RoleArn=role_arn,
-            RoleSessionName=session_name,
-            DurationSeconds=3600
-        )
-        credentials = response['Credentials']
-        session = boto3.Session(
-            aws_access_key_id=credentials['AccessKeyId'],
-            aws_secret_access_key=credentials['SecretAccessKey'],
-            aws_session_token=credentials['SessionToken']
-        )
-        logger.info(f"Successfully assumed role: {role_arn}")
-        return session
-    except ClientError as e:
-        logger.error(f"Failed to assume role {role_arn}: {str(e)}")
-        raise Exception(f"Role assumption failed: {str(e)}")
-def retry_with_backoff(max_retries: int = 3, base_delay: float = 1.0):
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            retries = 0
-            while retries < max_retries:
-                try:
-                    return func(*args, **kwargs)
-                except ClientError as e:
-                    error_code = e.response.get('Error', {}).get('Code', '')
-                    if error_code in ['ThrottlingException', 'RequestLimitExceeded', 'TooManyRequestsException']:
-                        retries += 1
-                        if retries >= max_retries:
-                            logger.error(f"Max retries reached for {func.__name__}")
-                            raise
-                        delay = base_delay * (2 ** retries)
-                        logger.warning(f"Throttled. Retrying in {delay}s... (Attempt {retries}/{max_retries})")
-                        time.sleep(delay)
-                    else:
-                        raise
-            return func(*args, **kwargs)
-        return wrapper
-    return decorator
-def safe_call(func, *args, **kwargs) -> Dict[str, Any]:
+        settled = bool(end_date) and parse_day(end_date).isoformat() <= cost_store.settled_before()
+    except ValueError:
+        return 0
+    return COST_CACHE_TTL if settled else min(COST_CACHE_TTL, cost_store.unsettled_ttl)
+TOOL_CACHE_TTLS = {
+    'get_ec2_instances': INVENTORY_CACHE_TTL,
+    'get_ec2_tags': INVENTORY_CACHE_TTL,
+    'get_rds_instances': INVENTORY_CACHE_TTL,
+    'get_rds_clusters': INVENTORY_CACHE_TTL,
+    'get_lambda_functions': INVENTORY_CACHE_TTL,
+    'get_lambda_function_config': INVENTORY_CACHE_TTL,
+    'get_lambda_utilization': METRICS_CACHE_TTL,
+    'get_s3_buckets': INVENTORY_CACHE_TTL * 3,
+    'get_ecs_clusters': INVENTORY_CACHE_TTL,
+    'get_ecs_tasks': METRICS_CACHE_TTL,
+    'get_ecs_overview': METRICS_CACHE_TTL,
+    'get_cloudwatch_metrics': INVENTORY_CACHE_TTL * 3,
+    'get_metric_statistics': METRICS_CACHE_TTL,
+    'get_ec2_cpu_utilization': METRICS_CACHE_TTL,
+    'get_ec2_metrics_batch': METRICS_CACHE_TTL,
+    'get_s3_bucket_size': COST_CACHE_TTL,
+    'get_log_groups': INVENTORY_CACHE_TTL,
+    'get_log_streams': LOGS_CACHE_TTL,
+    'run_logs_insights_query': 0,
+    'query_inventory': 0,
+    'sync_inventory': 0,
+    'logs_insights_results': INSIGHTS_CACHE_TTL,
+    'filter_log_events': lambda arguments: 0 if arguments.get('incremental') else LOGS_CACHE_TTL,
+    'get_cost_and_usage': cost_window_ttl,
+    'get_cost_forecast': COST_CACHE_TTL,
+    'get_cost_by_service': cost_window_ttl,
+    'get_cost_tags': min(COST_CACHE_TTL, cost_store.unsettled_ttl),
+}
+result_cache = ToolResultCache(ttl_policies=TOOL_CACHE_TTLS)
+_tool_loop: Optional[asyncio.AbstractEventLoop] = None
+_tool_loop_lock = threading.Lock()
+def get_tool_loop() -> asyncio.AbstractEventLoop:
+    global _tool_loop
+    with _tool_loop_lock:
+        if _tool_loop is None or _tool_loop.is_closed():
+            _tool_loop = asyncio.new_event_loop()
+            threading.Thread(target=_tool_loop.run_forever, name="aws-tools-loop", daemon=True).start()
+    return _tool_loop
+def run_sync(coro):
+    return asyncio.run_coroutine_threadsafe(coro, get_tool_loop()).result()
+JSON_SCHEMA_TYPES = {str: 'string', int: 'integer', float: 'number', bool: 'boolean'}
+class RegisteredTool:
+    __slots__ = ("name", "async_func", "func", "parameters")
+    def __init__(self, name: str, async_func: Callable, parameters: Dict[str, Any]):
+        self.name = name
+        self.async_func = async_func
+        self.func: Optional[Callable] = None
+        self.parameters = parameters
+tool_registry: Dict[str, RegisteredTool] = {}
+def annotation_schema(annotation: Any) -> Dict[str, Any]:
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin is Union:
+        options = [annotation_schema(arg) for arg in args if arg is not type(None)]
+        return options[0] if len(options) == 1 else {'anyOf': options}
+    if origin is list or annotation is list:
+        return {'type': 'array', 'items': annotation_schema(args[0]) if args else {}}
+    if origin is dict or annotation is dict:
+        return {'type': 'object'}
+    if annotation in JSON_SCHEMA_TYPES:
+        return {'type': JSON_SCHEMA_TYPES[annotation]}
+    return {}
+def tool_parameters(signature: inspect.Signature) -> Dict[str, Any]:
+    properties = {}
+    required = []
+    for name, parameter in signature.parameters.items():
+        schema = annotation_schema(parameter.annotation)
+        if parameter.default is inspect.Parameter.empty:
+            required.append(name)
+        elif parameter.default is not None:
+            schema['default'] = parameter.default
+        properties[name] = schema
+    return {'type': 'object', 'properties': properties, 'required': required}
+def mcp_tool(async_func):
+    tool_name = async_func.__name__.removesuffix('_async')
+    signature = inspect.signature(async_func)
+    @wraps(async_func)
+    async def cached(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        with tool_metrics.track(tool_name) as timing:
+            result = await result_cache.get_or_call(
+                tool_name,
+                dict(bound.arguments),
+                lambda: async_func(*args, **kwargs),
+                observe=timing.observe_payload
+            )
+            if not isinstance(result, dict):
+                return result
+            timing.status = result.get('status', 'unknown')
+            if timing.response_bytes is None:
+                timing.response_bytes = len(json.dumps(result, default=str))
+            if timing.parent is None:
+                result['timing'] = timing.snapshot()
+            return result
+    mcp.tool(name=tool_name)(cached)
+    tool_registry[tool_name] = RegisteredTool(tool_name, cached, tool_parameters(signature))
+    return cached
+def sync_tool(async_func):
+    @wraps(async_func)
+    def wrapper(*args, **kwargs):
+        return run_sync(async_func(*args, **kwargs))
+    wrapper.__name__ = async_func.__name__.removesuffix('_async')
+    wrapper.__qualname__ = wrapper.__name__
+    if wrapper.__name__ in tool_registry:
+        tool_registry[wrapper.__name__].func = wrapper
+    return wrapper
+def assume_role_session(role_arn: str, session_name: str = "MCPSession") -> boto3.Session:
+    return session_cache.get_session(role_arn, session_name)
+async def assume_role_session_async(role_arn: str, session_name: str = "MCPSession") -> aioboto3.Session:
+    session = await asyncio.to_thread(session_cache.get_session, role_arn, session_name)
+    return session_cache.get_async_session(session)
+async def safe_call(func, *args, **kwargs) -> Dict[str, Any]:
+    func_name = getattr(func, '__name__', repr(func))
     try:
-        result = func(*args, **kwargs)
+        result = await func(*args, **kwargs)
         return {
             "status": "success",
             "data": result
@@ -72,7 +191,7 @@ def safe_call(func, *args, **kwargs) -> Dict[str, Any]:
     except ClientError as e:
         error_code = e.response.get('Error', {}).get('Code', 'Unknown')
         error_message = e.response.get('Error', {}).get('Message', str(e))
-        logger.error(f"AWS ClientError in {func.__name__}: {error_code} - {error_message}")
+        logger.error(f"AWS ClientError in {func_name}: {error_code} - {error_message}")
         return {
             "status": "error",
             "error_code": error_code,
@@ -80,50 +199,106 @@ def safe_call(func, *args, **kwargs) -> Dict[str, Any]:
             "recoverable": error_code in ['AccessDenied', 'UnauthorizedOperation']
         }
     except Exception as e:
-        logger.error(f"Unexpected error in {func.__name__}: {str(e)}")
+        logger.error(f"Unexpected error in {func_name}: {str(e)}")
         return {
             "status": "error",
             "error_code": "UnexpectedError",
             "error_message": str(e),
             "recoverable": False
         }
-def paginate_results(client, method_name: str, result_key: str, **kwargs) -> List[Dict]:
-    results = []
-    try:
-        if hasattr(client, 'get_paginator'):
-            try:
-                paginator = client.get_paginator(method_name)
-                page_iterator = paginator.paginate(**kwargs)
-                for page in page_iterator:
-                    if result_key in page:
-                        results.extend(page[result_key])
-            except Exception:
-                method = getattr(client, method_name)
-                response = method(**kwargs)
-                if result_key in response:
-                    results.extend(response[result_key])
-                while 'NextToken' in response or 'NextMarker' in response:
-                    next_token = response.get('NextToken') or response.get('NextMarker')
-                    kwargs['NextToken' if 'NextToken' in response else 'Marker'] = next_token
-                    response = method(**kwargs)
-                    if result_key in response:
-                        results.extend(response[result_key])
+def aws_client(
+    session: aioboto3.Session,
+    service: str,
+    region_name: Optional[str] = None,
+    max_pool_connections: Optional[int] = None
+):
+    return client_registry.client(session, service, region_name, max_pool_connections)
+async def aws_call(client, method_name: str, **kwargs) -> Dict[str, Any]:
+    account_id = session_cache.cached_account_id(client_registry.owner(client)) or 'unknown'
+    service = client.meta.service_model.service_name
+    attempts = 0
+    async def attempt():
+        nonlocal attempts
+        attempts += 1
+        started = time.perf_counter()
+        throttled = False
+        try:
+            return await getattr(client, method_name)(**kwargs)
+        except Exception as e:
+            throttled = resilience.classify(e)[0]
+            raise
+        finally:
+            tool_metrics.record_aws_call(service, method_name, time.perf_counter() - started, attempts > 1, throttled)
+    return await resilience.call(account_id, service, method_name, attempt)
+def pagination_tokens(client, method_name: str) -> Tuple[Optional[str], Optional[str]]:
+    if hasattr(client, 'can_paginate') and client.can_paginate(method_name):
+        config = getattr(client.get_paginator(method_name), '_pagination_cfg', {})
+        input_token, output_token = config.get('input_token'), config.get('output_token')
+        if isinstance(input_token, str) and isinstance(output_token, str):
+            return input_token, output_token
+    return None, None
+async def iter_pages(client, method_name: str, **kwargs):
+    input_token, output_token = pagination_tokens(client, method_name)
+    while True:
+        response = await aws_call(client, method_name, **kwargs)
+        yield response
+        if output_token:
+            next_token = response.get(output_token)
         else:
-            method = getattr(client, method_name)
-            response = method(**kwargs)
-            if result_key in response:
-                results.extend(response[result_key])
+            next_token = response.get('NextToken') or response.get('NextMarker')
+            input_token = 'NextToken' if 'NextToken' in response else 'Marker'
+        if not next_token or next_token == kwargs.get(input_token):
+            return
+        kwargs[input_token] = next_token
+async def iter_results(
+    client,
+    method_name: str,
+    result_key: str,
+    projection: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    max_items: Optional[int] = None,
+    flatten_key: Optional[str] = None,
+    **kwargs
+):
+    if max_items is not None and max_items <= 0:
+        return
+    count = 0
+    pages = iter_pages(client, method_name, **kwargs)
+    try:
+        async for page in pages:
+            for item in page.get(result_key, []):
+                for record in (item.get(flatten_key, []) if flatten_key else (item,)):
+                    yield projection(record) if projection else record
+                    count += 1
+                    if max_items is not None and count >= max_items:
+                        return
+    finally:
+        await pages.aclose()
+async def paginate_results(
+    client,
+    method_name: str,
+    result_key: str,
+    projection: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    max_items: Optional[int] = None,
+    flatten_key: Optional[str] = None,
+    **kwargs
+) -> List[Dict]:
+    try:
+        return [
+            record async for record in iter_results(
+                client, method_name, result_key, projection, max_items, flatten_key, **kwargs
+            )
+        ]
     except Exception as e:
         logger.error(f"Pagination error for {method_name}: {str(e)}")
         raise
-    return results
 def get_account_id(session: boto3.Session) -> str:
     try:
-        sts = session.client('sts')
-        return sts.get_caller_identity()['Account']
+        return session_cache.get_account_id(session)
     except Exception as e:
         logger.error(f"Failed to get account ID: {str(e)}")
         return "unknown"
+async def get_account_id_async(session: aioboto3.Session) -> str:
+    return await asyncio.to_thread(get_account_id, session)
 def create_response(
     account_id: str,
     region: str,
@@ -143,356 +318,899 @@ def create_response(
     if error_info:
         response.update(error_info)
     return response
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_ec2_instances(role_arn: str, region: str = "us-east-1") -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    ec2_client = session.client('ec2', region_name=region)
-    result = safe_call(
-        paginate_results,
-        ec2_client,
-        'describe_instances',
-        'Reservations'
-    )
+def with_max_items(response: Dict[str, Any], max_items: Optional[int]) -> Dict[str, Any]:
+    if max_items is not None:
+        response['max_items'] = max_items
+        response['max_items_reached'] = len(response.get('data') or []) >= max_items
+    return response
+_enabled_regions: Dict[str, List[str]] = {}
+async def get_enabled_regions(session: aioboto3.Session, account_id: str) -> List[str]:
+    if account_id not in _enabled_regions:
+        async with aws_client(session, 'ec2', region_name='us-east-1') as ec2_client:
+            response = await aws_call(ec2_client, 'describe_regions')
+        _enabled_regions[account_id] = sorted(r['RegionName'] for r in response.get('Regions', []))
+    return _enabled_regions[account_id]
+async def resolve_regions(session: aioboto3.Session, account_id: str, regions: Union[str, List[str]]) -> List[str]:
+    if isinstance(regions, str):
+        if regions.strip().lower() == 'all':
+            return await get_enabled_regions(session, account_id)
+        regions = regions.split(',')
+    return list(dict.fromkeys(r.strip() for r in regions if r and r.strip()))
+async def fan_out_regions(
+    tool_func,
+    role_arn: str,
+    regions: Union[str, List[str]],
+    data_type: str,
+    **kwargs
+) -> Dict[str, Any]:
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    result = await safe_call(resolve_regions, session, account_id, regions)
+    if result['status'] == 'error':
+        return create_response(account_id, "multi-region", data_type, [], "error", result)
+    semaphore = asyncio.Semaphore(REGION_FANOUT_CONCURRENCY)
+    async def query_region(region: str):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await tool_func(role_arn, region=region, **kwargs)
+            except Exception as e:
+                logger.error(f"Region {region} failed for {data_type}: {str(e)}")
+                response = {
+                    "status": "error",
+                    "error_code": "UnexpectedError",
+                    "error_message": str(e)
+                }
+            return region, response, round((time.perf_counter() - started) * 1000, 1)
+    outcomes = await asyncio.gather(*(query_region(region) for region in result['data']))
+    records = []
+    region_results = {}
+    for region, response, latency_ms in outcomes:
+        region_records = []
+        if response.get('status') == 'success':
+            region_records = response.get('data') or []
+        for record in region_records:
+            record['region'] = region
+        records.extend(region_records)
+        region_results[region] = {
+            'status': response.get('status'),
+            'latency_ms': latency_ms,
+            'record_count': len(region_records),
+        }
+        if response.get('partial'):
+            region_results[region]['partial'] = True
+        if response.get('max_items_reached'):
+            region_results[region]['max_items_reached'] = True
+        if response.get('status') != 'success':
+            region_results[region]['error_code'] = response.get('error_code')
+            region_results[region]['error_message'] = response.get('error_message')
+    failed_regions = [r for r, info in region_results.items() if info['status'] != 'success']
+    status = "error" if region_results and len(failed_regions) == len(region_results) else "success"
+    max_items = kwargs.get('max_items')
+    if max_items is not None:
+        records = records[:max_items]
+    response = create_response(account_id, "multi-region", data_type, records, status, {
+        'regions': list(region_results),
+        'failed_regions': failed_regions,
+        'region_results': region_results
+    })
+    if status == 'success' and (failed_regions or any(info.get('partial') for info in region_results.values())):
+        response['partial'] = True
+    response = with_max_items(response, max_items)
+    if max_items is not None:
+        response['max_items_reached'] = response['max_items_reached'] or any(
+            info.get('max_items_reached') for info in region_results.values()
+        )
+    return response
+def project_ec2_instance(instance: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'instance_id': instance.get('InstanceId'),
+        'instance_type': instance.get('InstanceType'),
+        'state': instance.get('State', {}).get('Name'),
+        'launch_time': instance.get('LaunchTime').isoformat() if instance.get('LaunchTime') else None,
+        'availability_zone': instance.get('Placement', {}).get('AvailabilityZone'),
+        'private_ip': instance.get('PrivateIpAddress'),
+        'public_ip': instance.get('PublicIpAddress'),
+        'vpc_id': instance.get('VpcId'),
+        'subnet_id': instance.get('SubnetId'),
+        'tags': {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])},
+        'platform': instance.get('Platform', 'linux'),
+        'monitoring': instance.get('Monitoring', {}).get('State'),
+    }
+@mcp_tool
+async def get_ec2_instances_async(
+    role_arn: str,
+    region: str = "us-east-1",
+    regions: Optional[Union[str, List[str]]] = None,
+    max_items: Optional[int] = None
+) -> Dict[str, Any]:
+    if regions:
+        return await fan_out_regions(get_ec2_instances_async, role_arn, regions, "ec2_instances", max_items=max_items)
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    async with aws_client(session, 'ec2', region_name=region) as ec2_client:
+        result = await safe_call(
+            paginate_results,
+            ec2_client,
+            'describe_instances',
+            'Reservations',
+            flatten_key='Instances',
+            projection=project_ec2_instance,
+            max_items=max_items
+        )
     if result['status'] == 'error':
         return create_response(account_id, region, "ec2_instances", [], "error", result)
-    instances = []
-    for reservation in result['data']:
-        for instance in reservation.get('Instances', []):
-            instances.append({
-                'instance_id': instance.get('InstanceId'),
-                'instance_type': instance.get('InstanceType'),
-                'state': instance.get('State', {}).get('Name'),
-                'launch_time': instance.get('LaunchTime').isoformat() if instance.get('LaunchTime') else None,
-                'availability_zone': instance.get('Placement', {}).get('AvailabilityZone'),
-                'private_ip': instance.get('PrivateIpAddress'),
-                'public_ip': instance.get('PublicIpAddress'),
-                'vpc_id': instance.get('VpcId'),
-                'subnet_id': instance.get('SubnetId'),
-                'tags': {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])},
-                'platform': instance.get('Platform', 'linux'),
-                'monitoring': instance.get('Monitoring', {}).get('State'),
-            })
-    return create_response(account_id, region, "ec2_instances", instances)
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_ec2_tags(role_arn: str, region: str = "us-east-1") -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    ec2_client = session.client('ec2', region_name=region)
-    result = safe_call(
-        paginate_results,
-        ec2_client,
-        'describe_tags',
-        'Tags'
-    )
+    return with_max_items(create_response(account_id, region, "ec2_instances", result['data']), max_items)
+get_ec2_instances = sync_tool(get_ec2_instances_async)
+@mcp_tool
+async def get_ec2_tags_async(
+    role_arn: str,
+    region: str = "us-east-1",
+    max_items: Optional[int] = None
+) -> Dict[str, Any]:
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    async with aws_client(session, 'ec2', region_name=region) as ec2_client:
+        result = await safe_call(
+            paginate_results,
+            ec2_client,
+            'describe_tags',
+            'Tags',
+            max_items=max_items
+        )
     if result['status'] == 'error':
         return create_response(account_id, region, "ec2_tags", [], "error", result)
-    return create_response(account_id, region, "ec2_tags", result['data'])
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_rds_instances(role_arn: str, region: str = "us-east-1") -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    rds_client = session.client('rds', region_name=region)
-    result = safe_call(
-        paginate_results,
-        rds_client,
-        'describe_db_instances',
-        'DBInstances'
-    )
+    return with_max_items(create_response(account_id, region, "ec2_tags", result['data']), max_items)
+get_ec2_tags = sync_tool(get_ec2_tags_async)
+def project_rds_instance(db: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'db_instance_identifier': db.get('DBInstanceIdentifier'),
+        'db_instance_class': db.get('DBInstanceClass'),
+        'engine': db.get('Engine'),
+        'engine_version': db.get('EngineVersion'),
+        'db_instance_status': db.get('DBInstanceStatus'),
+        'allocated_storage': db.get('AllocatedStorage'),
+        'storage_type': db.get('StorageType'),
+        'multi_az': db.get('MultiAZ'),
+        'availability_zone': db.get('AvailabilityZone'),
+        'endpoint': db.get('Endpoint', {}).get('Address') if db.get('Endpoint') else None,
+        'port': db.get('Endpoint', {}).get('Port') if db.get('Endpoint') else None,
+        'instance_create_time': db.get('InstanceCreateTime').isoformat() if db.get('InstanceCreateTime') else None,
+        'backup_retention_period': db.get('BackupRetentionPeriod'),
+        'vpc_id': db.get('DBSubnetGroup', {}).get('VpcId') if db.get('DBSubnetGroup') else None,
+        'publicly_accessible': db.get('PubliclyAccessible'),
+    }
+@mcp_tool
+async def get_rds_instances_async(
+    role_arn: str,
+    region: str = "us-east-1",
+    regions: Optional[Union[str, List[str]]] = None,
+    max_items: Optional[int] = None
+) -> Dict[str, Any]:
+    if regions:
+        return await fan_out_regions(get_rds_instances_async, role_arn, regions, "rds_instances", max_items=max_items)
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    async with aws_client(session, 'rds', region_name=region) as rds_client:
+        result = await safe_call(
+            paginate_results,
+            rds_client,
+            'describe_db_instances',
+            'DBInstances',
+            projection=project_rds_instance,
+            max_items=max_items
+        )
     if result['status'] == 'error':
         return create_response(account_id, region, "rds_instances", [], "error", result)
-    instances = []
-    for db in result['data']:
-        instances.append({
-            'db_instance_identifier': db.get('DBInstanceIdentifier'),
-            'db_instance_class': db.get('DBInstanceClass'),
-            'engine': db.get('Engine'),
-            'engine_version': db.get('EngineVersion'),
-            'db_instance_status': db.get('DBInstanceStatus'),
-            'allocated_storage': db.get('AllocatedStorage'),
-            'storage_type': db.get('StorageType'),
-            'multi_az': db.get('MultiAZ'),
-            'availability_zone': db.get('AvailabilityZone'),
-            'endpoint': db.get('Endpoint', {}).get('Address') if db.get('Endpoint') else None,
-            'port': db.get('Endpoint', {}).get('Port') if db.get('Endpoint') else None,
-            'instance_create_time': db.get('InstanceCreateTime').isoformat() if db.get('InstanceCreateTime') else None,
-            'backup_retention_period': db.get('BackupRetentionPeriod'),
-            'vpc_id': db.get('DBSubnetGroup', {}).get('VpcId') if db.get('DBSubnetGroup') else None,
-            'publicly_accessible': db.get('PubliclyAccessible'),
-        })
-    return create_response(account_id, region, "rds_instances", instances)
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_rds_clusters(role_arn: str, region: str = "us-east-1") -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    rds_client = session.client('rds', region_name=region)
-    result = safe_call(
-        paginate_results,
-        rds_client,
-        'describe_db_clusters',
-        'DBClusters'
-    )
+    return with_max_items(create_response(account_id, region, "rds_instances", result['data']), max_items)
+get_rds_instances = sync_tool(get_rds_instances_async)
+def project_rds_cluster(cluster: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'db_cluster_identifier': cluster.get('DBClusterIdentifier'),
+        'engine': cluster.get('Engine'),
+        'engine_version': cluster.get('EngineVersion'),
+        'status': cluster.get('Status'),
+        'endpoint': cluster.get('Endpoint'),
+        'reader_endpoint': cluster.get('ReaderEndpoint'),
+        'multi_az': cluster.get('MultiAZ'),
+        'database_name': cluster.get('DatabaseName'),
+        'cluster_create_time': cluster.get('ClusterCreateTime').isoformat() if cluster.get('ClusterCreateTime') else None,
+        'members': [m.get('DBInstanceIdentifier') for m in cluster.get('DBClusterMembers', [])],
+        'allocated_storage': cluster.get('AllocatedStorage'),
+    }
+@mcp_tool
+async def get_rds_clusters_async(
+    role_arn: str,
+    region: str = "us-east-1",
+    max_items: Optional[int] = None
+) -> Dict[str, Any]:
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    async with aws_client(session, 'rds', region_name=region) as rds_client:
+        result = await safe_call(
+            paginate_results,
+            rds_client,
+            'describe_db_clusters',
+            'DBClusters',
+            projection=project_rds_cluster,
+            max_items=max_items
+        )
     if result['status'] == 'error':
         return create_response(account_id, region, "rds_clusters", [], "error", result)
-    clusters = []
-    for cluster in result['data']:
-        clusters.append({
-            'db_cluster_identifier': cluster.get('DBClusterIdentifier'),
-            'engine': cluster.get('Engine'),
-            'engine_version': cluster.get('EngineVersion'),
-            'status': cluster.get('Status'),
-            'endpoint': cluster.get('Endpoint'),
-            'reader_endpoint': cluster.get('ReaderEndpoint'),
-            'multi_az': cluster.get('MultiAZ'),
-            'database_name': cluster.get('DatabaseName'),
-            'cluster_create_time': cluster.get('ClusterCreateTime').isoformat() if cluster.get('ClusterCreateTime') else None,
-            'members': [m.get('DBInstanceIdentifier') for m in cluster.get('DBClusterMembers', [])],
-            'allocated_storage': cluster.get('AllocatedStorage'),
-        })
-    return create_response(account_id, region, "rds_clusters", clusters)
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_lambda_functions(role_arn: str, region: str = "us-east-1") -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    lambda_client = session.client('lambda', region_name=region)
-    result = safe_call(
-        paginate_results,
-        lambda_client,
-        'list_functions',
-        'Functions'
-    )
+    return with_max_items(create_response(account_id, region, "rds_clusters", result['data']), max_items)
+get_rds_clusters = sync_tool(get_rds_clusters_async)
+def project_lambda_function(func: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'function_name': func.get('FunctionName'),
+        'function_arn': func.get('FunctionArn'),
+        'runtime': func.get('Runtime'),
+        'handler': func.get('Handler'),
+        'code_size': func.get('CodeSize'),
+        'description': func.get('Description'),
+        'timeout': func.get('Timeout'),
+        'memory_size': func.get('MemorySize'),
+        'last_modified': func.get('LastModified'),
+        'version': func.get('Version'),
+        'vpc_config': func.get('VpcConfig'),
+        'environment_vars': list(func.get('Environment', {}).get('Variables', {}).keys()),
+        'architectures': func.get('Architectures', []),
+        'package_type': func.get('PackageType'),
+    }
+@mcp_tool
+async def get_lambda_functions_async(
+    role_arn: str,
+    region: str = "us-east-1",
+    regions: Optional[Union[str, List[str]]] = None,
+    max_items: Optional[int] = None
+) -> Dict[str, Any]:
+    if regions:
+        return await fan_out_regions(get_lambda_functions_async, role_arn, regions, "lambda_functions", max_items=max_items)
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    async with aws_client(session, 'lambda', region_name=region) as lambda_client:
+        result = await safe_call(
+            paginate_results,
+            lambda_client,
+            'list_functions',
+            'Functions',
+            projection=project_lambda_function,
+            max_items=max_items
+        )
     if result['status'] == 'error':
         return create_response(account_id, region, "lambda_functions", [], "error", result)
-    functions = []
-    for func in result['data']:
-        functions.append({
-            'function_name': func.get('FunctionName'),
-            'function_arn': func.get('FunctionArn'),
-            'runtime': func.get('Runtime'),
-            'handler': func.get('Handler'),
-            'code_size': func.get('CodeSize'),
-            'description': func.get('Description'),
-            'timeout': func.get('Timeout'),
-            'memory_size': func.get('MemorySize'),
-            'last_modified': func.get('LastModified'),
-            'version': func.get('Version'),
-            'vpc_config': func.get('VpcConfig'),
-            'environment_vars': list(func.get('Environment', {}).get('Variables', {}).keys()),
-            'architectures': func.get('Architectures', []),
-            'package_type': func.get('PackageType'),
-        })
-    return create_response(account_id, region, "lambda_functions", functions)
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_lambda_function_config(role_arn: str, function_name: str, region: str = "us-east-1") -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    lambda_client = session.client('lambda', region_name=region)
-    result = safe_call(
-        lambda_client.get_function_configuration,
-        FunctionName=function_name
-    )
+    return with_max_items(create_response(account_id, region, "lambda_functions", result['data']), max_items)
+get_lambda_functions = sync_tool(get_lambda_functions_async)
+@mcp_tool
+async def get_lambda_function_config_async(role_arn: str, function_name: str, region: str = "us-east-1") -> Dict[str, Any]:
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    async with aws_client(session, 'lambda', region_name=region) as lambda_client:
+        result = await safe_call(
+            aws_call,
+            lambda_client,
+            'get_function_configuration',
+            FunctionName=function_name
+        )
     if result['status'] == 'error':
         return create_response(account_id, region, "lambda_function_config", {}, "error", result)
     return create_response(account_id, region, "lambda_function_config", result['data'])
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_s3_buckets(role_arn: str) -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    s3_client = session.client('s3')
-    result = safe_call(s3_client.list_buckets)
+get_lambda_function_config = sync_tool(get_lambda_function_config_async)
+LAMBDA_UTILIZATION_QUERIES = {
+    'invocations': ('Invocations', 'Sum'),
+    'errors': ('Errors', 'Sum'),
+    'throttles': ('Throttles', 'Sum'),
+    'duration_sum': ('Duration', 'Sum'),
+    'duration_p99': ('Duration', 'p99'),
+    'duration_max': ('Duration', 'Maximum'),
+}
+LAMBDA_NEAR_TIMEOUT_RATIO = 0.8
+LAMBDA_HIGH_ERROR_RATE = 0.05
+def lambda_findings(utilization: Dict[str, Any], timeout_seconds: Optional[int]) -> List[str]:
+    findings = []
+    if not utilization['invocations']:
+        findings.append('idle')
+    if utilization['throttles']:
+        findings.append('throttled')
+    if utilization['error_rate'] is not None and utilization['error_rate'] >= LAMBDA_HIGH_ERROR_RATE:
+        findings.append('high_error_rate')
+    if timeout_seconds and utilization['duration_p99_ms'] and utilization['duration_p99_ms'] >= timeout_seconds * 1000 * LAMBDA_NEAR_TIMEOUT_RATIO:
+        findings.append('near_timeout')
+    return findings
+@mcp_tool
+async def get_lambda_utilization_async(
+    role_arn: str,
+    region: str = "us-east-1",
+    function_names: Optional[List[str]] = None,
+    start_hours_ago: int = 168
+) -> Dict[str, Any]:
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    if start_hours_ago <= 0:
+        return create_response(account_id, region, "lambda_utilization", [], "error", {
+            "error_code": "InvalidParameter",
+            "error_message": "start_hours_ago must be positive",
+            "recoverable": True
+        })
+    async with aws_client(session, 'lambda', region_name=region) as lambda_client:
+        result = await safe_call(
+            paginate_results,
+            lambda_client,
+            'list_functions',
+            'Functions',
+            projection=project_lambda_function
+        )
     if result['status'] == 'error':
-        return create_response(account_id, "global", "s3_buckets", [], "error", result)
-    buckets = []
-    for bucket in result['data'].get('Buckets', []):
-        bucket_name = bucket['Name']
-        bucket_info = {
-            'name': bucket_name,
-            'creation_date': bucket['CreationDate'].isoformat(),
+        return create_response(account_id, region, "lambda_utilization", [], "error", result)
+    functions = result['data']
+    if function_names is not None:
+        wanted = set(function_names)
+        functions = [func for func in functions if func['function_name'] in wanted]
+    end_time = datetime.utcnow()
+    start_time = end_time - timedelta(hours=start_hours_ago)
+    queries = []
+    query_targets = {}
+    for func in functions:
+        for key, (metric_name, stat) in LAMBDA_UTILIZATION_QUERIES.items():
+            query_id = f"l{len(queries)}"
+            query_targets[query_id] = (func['function_name'], key)
+            queries.append({
+                'Id': query_id,
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': 'AWS/Lambda',
+                        'MetricName': metric_name,
+                        'Dimensions': [{'Name': 'FunctionName', 'Value': func['function_name']}]
+                    },
+                    'Period': 86400,
+                    'Stat': stat
+                },
+                'ReturnData': True
+            })
+    series = {}
+    if queries:
+        async with aws_client(session, 'cloudwatch', region_name=region) as cloudwatch_client:
+            metric_result = await safe_call(get_metric_data_batch, cloudwatch_client, queries, start_time, end_time)
+        if metric_result['status'] == 'error':
+            return create_response(account_id, region, "lambda_utilization", [], "error", metric_result)
+        series, _ = metric_result['data']
+    values: Dict[str, Dict[str, List[float]]] = {func['function_name']: {} for func in functions}
+    for query_id, (function_name, key) in query_targets.items():
+        values[function_name][key] = list(series.get(query_id, {}).get('points', {}).values())
+    records = []
+    for func in functions:
+        function_values = values[func['function_name']]
+        invocations = int(sum(function_values.get('invocations', [])))
+        errors = int(sum(function_values.get('errors', [])))
+        duration_sum_ms = sum(function_values.get('duration_sum', []))
+        memory_size = func.get('memory_size') or 128
+        utilization = {
+            'invocations': invocations,
+            'errors': errors,
+            'throttles': int(sum(function_values.get('throttles', []))),
+            'error_rate': round(errors / invocations, 4) if invocations else None,
+            'duration_avg_ms': round(duration_sum_ms / invocations, 2) if invocations else None,
+            'duration_p99_ms': round(max(function_values['duration_p99']), 2) if function_values.get('duration_p99') else None,
+            'duration_max_ms': round(max(function_values['duration_max']), 2) if function_values.get('duration_max') else None,
         }
-        try:
-            location = s3_client.get_bucket_location(Bucket=bucket_name)
-            bucket_info['region'] = location.get('LocationConstraint') or 'us-east-1'
-        except Exception:
-            bucket_info['region'] = 'unknown'
-        try:
-            versioning = s3_client.get_bucket_versioning(Bucket=bucket_name)
-            bucket_info['versioning'] = versioning.get('Status', 'Disabled')
-        except Exception:
-            bucket_info['versioning'] = 'unknown'
-        try:
-            encryption = s3_client.get_bucket_encryption(Bucket=bucket_name)
-            bucket_info['encryption'] = 'Enabled'
-        except ClientError as e:
-            if e.response['Error']['Code'] == 'ServerSideEncryptionConfigurationNotFoundError':
-                bucket_info['encryption'] = 'Disabled'
+        records.append({
+            'function_name': func['function_name'],
+            'runtime': func.get('runtime'),
+            'architectures': func.get('architectures'),
+            'memory_size': memory_size,
+            'timeout': func.get('timeout'),
+            **utilization,
+            'gb_seconds': round(duration_sum_ms / 1000 * memory_size / 1024, 3),
+            'timeout_utilization': round(utilization['duration_max_ms'] / (func['timeout'] * 1000), 4)
+            if utilization['duration_max_ms'] is not None and func.get('timeout') else None,
+            'findings': lambda_findings(utilization, func.get('timeout')),
+        })
+    records.sort(key=lambda record: record['gb_seconds'], reverse=True)
+    return create_response(account_id, region, "lambda_utilization", records, "success", {
+        'start_time': start_time.isoformat(),
+        'end_time': end_time.isoformat(),
+        'summary': {
+            'function_count': len(records),
+            'idle_functions': sum(1 for record in records if 'idle' in record['findings']),
+            'total_invocations': sum(record['invocations'] for record in records),
+            'total_gb_seconds': round(sum(record['gb_seconds'] for record in records), 3),
+            'query_count': len(queries),
+        }
+    })
+get_lambda_utilization = sync_tool(get_lambda_utilization_async)
+LEGACY_BUCKET_LOCATIONS = {'EU': 'eu-west-1'}
+def normalize_bucket_region(location: Optional[str]) -> str:
+    if not location:
+        return 'us-east-1'
+    return LEGACY_BUCKET_LOCATIONS.get(location, location)
+async def fetch_bucket_region(s3_client, bucket_name: str) -> str:
+    try:
+        location = await aws_call(s3_client, 'get_bucket_location', Bucket=bucket_name)
+        return normalize_bucket_region(location.get('LocationConstraint'))
+    except Exception:
+        return 'unknown'
+async def fetch_bucket_versioning(s3_client, bucket_name: str) -> str:
+    try:
+        versioning = await aws_call(s3_client, 'get_bucket_versioning', Bucket=bucket_name)
+        return versioning.get('Status', 'Disabled')
+    except Exception:
+        return 'unknown'
+async def fetch_bucket_encryption(s3_client, bucket_name: str) -> str:
+    try:
+        await aws_call(s3_client, 'get_bucket_encryption', Bucket=bucket_name)
+        return 'Enabled'
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ServerSideEncryptionConfigurationNotFoundError':
+            return 'Disabled'
+        return 'unknown'
+    except Exception:
+        return 'unknown'
+async def fetch_bucket_lifecycle_rules(s3_client, bucket_name: str) -> int:
+    try:
+        lifecycle = await aws_call(s3_client, 'get_bucket_lifecycle_configuration', Bucket=bucket_name)
+        return len(lifecycle.get('Rules', []))
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'NoSuchLifecycleConfiguration':
+            return 0
+        return -1
+    except Exception:
+        return -1
+S3_ENRICHMENT_FETCHERS = {
+    'versioning': fetch_bucket_versioning,
+    'encryption': fetch_bucket_encryption,
+    'lifecycle_rules': fetch_bucket_lifecycle_rules,
+}
+S3_ENRICHMENT_FIELDS = ['region'] + list(S3_ENRICHMENT_FETCHERS)
+def resolve_fields(fields: Optional[Union[str, List[str]]], allowed: List[str]) -> List[str]:
+    if fields is None:
+        return list(allowed)
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    requested = [f.strip() for f in fields if f and f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown}; expected any of {allowed}")
+    return requested
+@mcp_tool
+async def get_s3_buckets_async(
+    role_arn: str,
+    fields: Optional[Union[str, List[str]]] = None,
+    concurrency: int = S3_ENRICHMENT_CONCURRENCY
+) -> Dict[str, Any]:
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    try:
+        fields = resolve_fields(fields, S3_ENRICHMENT_FIELDS)
+    except ValueError as e:
+        return create_response(account_id, "global", "s3_buckets", [], "error", {
+            "error_code": "InvalidParameter",
+            "error_message": str(e),
+            "recoverable": True
+        })
+    concurrency = max(1, concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aws_client(session, 's3', max_pool_connections=concurrency) as s3_client:
+        result = await safe_call(aws_call, s3_client, 'list_buckets')
+        if result['status'] == 'error':
+            return create_response(account_id, "global", "s3_buckets", [], "error", result)
+        async def limited(fetcher, client, bucket_name: str):
+            async with semaphore:
+                return await fetcher(client, bucket_name)
+        async def enrich(bucket: Dict[str, Any]) -> Dict[str, Any]:
+            bucket_name = bucket['Name']
+            bucket_info = {
+                'name': bucket_name,
+                'creation_date': bucket['CreationDate'].isoformat(),
+            }
+            if not fields:
+                return bucket_info
+            if bucket.get('BucketRegion'):
+                bucket_region = normalize_bucket_region(bucket['BucketRegion'])
             else:
-                bucket_info['encryption'] = 'unknown'
-        try:
-            lifecycle = s3_client.get_bucket_lifecycle_configuration(Bucket=bucket_name)
-            bucket_info['lifecycle_rules'] = len(lifecycle.get('Rules', []))
-        except ClientError as e:
-            if e.response['Error']['Code'] == 'NoSuchLifecycleConfiguration':
-                bucket_info['lifecycle_rules'] = 0
+                bucket_region = await limited(fetch_bucket_region, s3_client, bucket_name)
+            if 'region' in fields:
+                bucket_info['region'] = bucket_region
+            requested = [f for f in fields if f in S3_ENRICHMENT_FETCHERS]
+            async def fetch_fields(client) -> List[Any]:
+                return await asyncio.gather(*(
+                    limited(S3_ENRICHMENT_FETCHERS[f], client, bucket_name) for f in requested
+                ))
+            if bucket_region == 'unknown':
+                values = await fetch_fields(s3_client)
             else:
-                bucket_info['lifecycle_rules'] = -1
-        buckets.append(bucket_info)
-    return create_response(account_id, "global", "s3_buckets", buckets)
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_s3_bucket_size(role_arn: str, bucket_name: str, region: str = "us-east-1") -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    cloudwatch_client = session.client('cloudwatch', region_name=region)
+                async with aws_client(session, 's3', bucket_region, concurrency) as client:
+                    values = await fetch_fields(client)
+            bucket_info.update(zip(requested, values))
+            return bucket_info
+        buckets = await asyncio.gather(*(enrich(b) for b in result['data'].get('Buckets', [])))
+    return create_response(account_id, "global", "s3_buckets", list(buckets))
+get_s3_buckets = sync_tool(get_s3_buckets_async)
+S3_STORAGE_METRICS = ('BucketSizeBytes', 'NumberOfObjects')
+S3_STORAGE_LOOKBACK_DAYS = 3
+async def fetch_s3_storage_metrics(session: aioboto3.Session, region: str, bucket_names: List[str]) -> Dict[str, Dict[str, Any]]:
+    wanted = set(bucket_names)
     end_time = datetime.utcnow()
-    start_time = end_time - timedelta(days=1)
-    metrics_data = {}
-    try:
-        size_response = cloudwatch_client.get_metric_statistics(
-            Namespace='AWS/S3',
-            MetricName='BucketSizeBytes',
-            Dimensions=[
-                {'Name': 'BucketName', 'Value': bucket_name},
-                {'Name': 'StorageType', 'Value': 'StandardStorage'}
-            ],
-            StartTime=start_time,
-            EndTime=end_time,
-            Period=86400,
-            Statistics=['Average']
-        )
-        if size_response.get('Datapoints'):
-            metrics_data['size_bytes'] = size_response['Datapoints'][0]['Average']
-            metrics_data['size_gb'] = round(metrics_data['size_bytes'] / (1024**3), 2)
-    except Exception as e:
-        logger.error(f"Error getting bucket size: {str(e)}")
-        metrics_data['size_bytes'] = None
-    try:
-        count_response = cloudwatch_client.get_metric_statistics(
-            Namespace='AWS/S3',
-            MetricName='NumberOfObjects',
-            Dimensions=[
-                {'Name': 'BucketName', 'Value': bucket_name},
-                {'Name': 'StorageType', 'Value': 'AllStorageTypes'}
-            ],
-            StartTime=start_time,
-            EndTime=end_time,
-            Period=86400,
-            Statistics=['Average']
+    start_time = end_time - timedelta(days=S3_STORAGE_LOOKBACK_DAYS)
+    async with aws_client(session, 'cloudwatch', region_name=region) as cloudwatch_client:
+        metrics = []
+        for metric_name in S3_STORAGE_METRICS:
+            params = {'Namespace': 'AWS/S3', 'MetricName': metric_name}
+            if len(bucket_names) == 1:
+                params['Dimensions'] = [{'Name': 'BucketName', 'Value': bucket_names[0]}]
+            metrics.extend(await paginate_results(cloudwatch_client, 'list_metrics', 'Metrics', **params))
+        queries = []
+        query_targets = {}
+        for metric in metrics:
+            dimensions = {d['Name']: d['Value'] for d in metric.get('Dimensions', [])}
+            if dimensions.get('BucketName') not in wanted or 'StorageType' not in dimensions:
+                continue
+            query_id = f"s{len(queries)}"
+            query_targets[query_id] = (dimensions['BucketName'], metric['MetricName'], dimensions['StorageType'])
+            queries.append({
+                'Id': query_id,
+                'MetricStat': {'Metric': metric, 'Period': 86400, 'Stat': 'Average'},
+                'ReturnData': True
+            })
+        series = {}
+        if queries:
+            series, _ = await get_metric_data_batch(cloudwatch_client, queries, start_time, end_time)
+    storage = {}
+    for query_id, (bucket_name, metric_name, storage_type) in query_targets.items():
+        points = series.get(query_id, {}).get('points')
+        if not points:
+            continue
+        latest = points[max(points)]
+        entry = storage.setdefault(bucket_name, {'object_count': None, 'sizes': {}})
+        if metric_name == 'NumberOfObjects':
+            entry['object_count'] = int(latest)
+        else:
+            entry['sizes'][storage_type] = int(latest)
+    return storage
+async def get_all_s3_bucket_sizes(session: aioboto3.Session, account_id: str) -> Dict[str, Any]:
+    async with aws_client(session, 's3') as s3_client:
+        result = await safe_call(aws_call, s3_client, 'list_buckets')
+        if result['status'] == 'error':
+            return create_response(account_id, "global", "s3_storage_matrix", {}, "error", result)
+        semaphore = asyncio.Semaphore(S3_ENRICHMENT_CONCURRENCY)
+        async def bucket_region(bucket: Dict[str, Any]) -> str:
+            if bucket.get('BucketRegion'):
+                return normalize_bucket_region(bucket['BucketRegion'])
+            async with semaphore:
+                return await fetch_bucket_region(s3_client, bucket['Name'])
+        buckets = result['data'].get('Buckets', [])
+        regions = await asyncio.gather(*(bucket_region(bucket) for bucket in buckets))
+    buckets_by_region: Dict[str, List[str]] = {}
+    for bucket, region in zip(buckets, regions):
+        buckets_by_region.setdefault(region, []).append(bucket['Name'])
+    region_semaphore = asyncio.Semaphore(REGION_FANOUT_CONCURRENCY)
+    async def query_region(region: str):
+        if region == 'unknown':
+            return region, {"status": "error", "error_code": "UnknownRegion", "error_message": "Bucket region could not be resolved"}
+        async with region_semaphore:
+            return region, await safe_call(fetch_s3_storage_metrics, session, region, buckets_by_region[region])
+    outcomes = await asyncio.gather(*(query_region(region) for region in buckets_by_region))
+    storage = {}
+    region_results = {}
+    for region, outcome in outcomes:
+        region_results[region] = {'status': outcome['status'], 'bucket_count': len(buckets_by_region[region])}
+        if outcome['status'] == 'success':
+            storage.update(outcome['data'])
+        else:
+            region_results[region]['error_code'] = outcome.get('error_code')
+            region_results[region]['error_message'] = outcome.get('error_message')
+    storage_types = sorted({storage_type for entry in storage.values() for storage_type in entry['sizes']})
+    rows = []
+    by_storage_type = dict.fromkeys(storage_types, 0)
+    by_region: Dict[str, int] = {}
+    for bucket, region in zip(buckets, regions):
+        entry = storage.get(bucket['Name'], {'object_count': None, 'sizes': {}})
+        total_bytes = sum(entry['sizes'].values())
+        for storage_type, size in entry['sizes'].items():
+            by_storage_type[storage_type] += size
+        by_region[region] = by_region.get(region, 0) + total_bytes
+        rows.append(
+            [bucket['Name'], region, entry['object_count'], total_bytes]
+            + [entry['sizes'].get(storage_type, 0) for storage_type in storage_types]
         )
-        if count_response.get('Datapoints'):
-            metrics_data['object_count'] = int(count_response['Datapoints'][0]['Average'])
-    except Exception as e:
-        logger.error(f"Error getting object count: {str(e)}")
-        metrics_data['object_count'] = None
-    metrics_data['bucket_name'] = bucket_name
+    rows.sort(key=lambda row: row[3], reverse=True)
+    failed_regions = [region for region, info in region_results.items() if info['status'] != 'success']
+    status = "error" if region_results and len(failed_regions) == len(region_results) else "success"
+    return create_response(account_id, "global", "s3_storage_matrix", {
+        'columns': ['bucket_name', 'region', 'object_count', 'total_bytes'] + storage_types,
+        'rows': rows,
+        'bucket_count': len(rows),
+        'buckets_without_metrics': sum(1 for bucket in buckets if bucket['Name'] not in storage),
+        'total_bytes': sum(by_storage_type.values()),
+        'total_gb': round(sum(by_storage_type.values()) / (1024**3), 2),
+        'bytes_by_storage_type': by_storage_type,
+        'bytes_by_region': by_region,
+    }, status, {
+        'failed_regions': failed_regions,
+        'region_results': region_results
+    })
+@mcp_tool
+async def get_s3_bucket_size_async(
+    role_arn: str,
+    bucket_name: Optional[str] = None,
+    region: str = "us-east-1"
+) -> Dict[str, Any]:
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    if not bucket_name:
+        return await get_all_s3_bucket_sizes(session, account_id)
+    result = await safe_call(fetch_s3_storage_metrics, session, region, [bucket_name])
+    if result['status'] == 'error':
+        return create_response(account_id, region, "s3_bucket_metrics", {}, "error", result)
+    entry = result['data'].get(bucket_name, {'object_count': None, 'sizes': {}})
+    standard_bytes = entry['sizes'].get('StandardStorage')
+    metrics_data = {
+        'bucket_name': bucket_name,
+        'size_bytes': standard_bytes,
+        'size_gb': round(standard_bytes / (1024**3), 2) if standard_bytes is not None else None,
+        'object_count': entry['object_count'],
+        'total_size_bytes': sum(entry['sizes'].values()),
+        'storage_types': entry['sizes'],
+    }
     return create_response(account_id, region, "s3_bucket_metrics", metrics_data)
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_ecs_clusters(role_arn: str, region: str = "us-east-1") -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    ecs_client = session.client('ecs', region_name=region)
-    cluster_arns_result = safe_call(
-        paginate_results,
-        ecs_client,
-        'list_clusters',
-        'clusterArns'
-    )
-    if cluster_arns_result['status'] == 'error':
-        return create_response(account_id, region, "ecs_clusters", [], "error", cluster_arns_result)
-    if not cluster_arns_result['data']:
-        return create_response(account_id, region, "ecs_clusters", [])
-    clusters_result = safe_call(
-        ecs_client.describe_clusters,
-        clusters=cluster_arns_result['data']
+get_s3_bucket_size = sync_tool(get_s3_bucket_size_async)
+def project_ecs_cluster(cluster: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'cluster_name': cluster.get('clusterName'),
+        'cluster_arn': cluster.get('clusterArn'),
+        'status': cluster.get('status'),
+        'registered_container_instances_count': cluster.get('registeredContainerInstancesCount'),
+        'running_tasks_count': cluster.get('runningTasksCount'),
+        'pending_tasks_count': cluster.get('pendingTasksCount'),
+        'active_services_count': cluster.get('activeServicesCount'),
+    }
+def project_ecs_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'task_arn': task.get('taskArn'),
+        'task_definition_arn': task.get('taskDefinitionArn'),
+        'cluster_arn': task.get('clusterArn'),
+        'group': task.get('group'),
+        'last_status': task.get('lastStatus'),
+        'desired_status': task.get('desiredStatus'),
+        'cpu': task.get('cpu'),
+        'memory': task.get('memory'),
+        'created_at': task.get('createdAt').isoformat() if task.get('createdAt') else None,
+        'started_at': task.get('startedAt').isoformat() if task.get('startedAt') else None,
+        'launch_type': task.get('launchType'),
+    }
+def project_ecs_service(service: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'service_name': service.get('serviceName'),
+        'service_arn': service.get('serviceArn'),
+        'status': service.get('status'),
+        'task_definition': service.get('taskDefinition'),
+        'desired_count': service.get('desiredCount'),
+        'running_count': service.get('runningCount'),
+        'pending_count': service.get('pendingCount'),
+        'launch_type': service.get('launchType'),
+        'created_at': service.get('createdAt').isoformat() if service.get('createdAt') else None,
+    }
+async def describe_in_batches(
+    client,
+    method_name: str,
+    items_param: str,
+    result_key: str,
+    items: List[str],
+    batch_size: int,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    **kwargs
+) -> Dict[str, Any]:
+    semaphore = semaphore or asyncio.Semaphore(ECS_DESCRIBE_CONCURRENCY)
+    async def describe_batch(batch: List[str]) -> Dict[str, Any]:
+        async with semaphore:
+            return await safe_call(aws_call, client, method_name, **{items_param: batch}, **kwargs)
+    results = await asyncio.gather(*[
+        describe_batch(items[i:i + batch_size]) for i in range(0, len(items), batch_size)
+    ])
+    described = {'records': [], 'failures': [], 'errors': []}
+    for result in results:
+        if result['status'] == 'success':
+            described['records'].extend(result['data'].get(result_key, []))
+            described['failures'].extend(result['data'].get('failures', []))
+        else:
+            described['errors'].append(result)
+    return described
+def ecs_describe_gaps(described: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if not described['failures'] and not described['errors']:
+        return None
+    return {
+        'partial': True,
+        'failures': described['failures'],
+        'failed_batches': [
+            {'error_code': error.get('error_code'), 'error_message': error.get('error_message')}
+            for error in described['errors']
+        ]
+    }
+@mcp_tool
+async def get_ecs_clusters_async(
+    role_arn: str,
+    region: str = "us-east-1",
+    regions: Optional[Union[str, List[str]]] = None
+) -> Dict[str, Any]:
+    if regions:
+        return await fan_out_regions(get_ecs_clusters_async, role_arn, regions, "ecs_clusters")
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    async with aws_client(session, 'ecs', region_name=region) as ecs_client:
+        cluster_arns_result = await safe_call(
+            paginate_results,
+            ecs_client,
+            'list_clusters',
+            'clusterArns'
+        )
+        if cluster_arns_result['status'] == 'error':
+            return create_response(account_id, region, "ecs_clusters", [], "error", cluster_arns_result)
+        if not cluster_arns_result['data']:
+            return create_response(account_id, region, "ecs_clusters", [])
+        described = await describe_in_batches(
+            ecs_client,
+            'describe_clusters',
+            'clusters',
+            'clusters',
+            cluster_arns_result['data'],
+            ECS_DESCRIBE_CLUSTERS_BATCH
+        )
+    if described['errors'] and not described['records']:
+        return create_response(account_id, region, "ecs_clusters", [], "error", described['errors'][0])
+    return create_response(
+        account_id,
+        region,
+        "ecs_clusters",
+        [project_ecs_cluster(cluster) for cluster in described['records']],
+        "success",
+        ecs_describe_gaps(described)
     )
-    if clusters_result['status'] == 'error':
-        return create_response(account_id, region, "ecs_clusters", [], "error", clusters_result)
-    clusters = []
-    for cluster in clusters_result['data'].get('clusters', []):
-        clusters.append({
-            'cluster_name': cluster.get('clusterName'),
-            'cluster_arn': cluster.get('clusterArn'),
-            'status': cluster.get('status'),
-            'registered_container_instances_count': cluster.get('registeredContainerInstancesCount'),
-            'running_tasks_count': cluster.get('runningTasksCount'),
-            'pending_tasks_count': cluster.get('pendingTasksCount'),
-            'active_services_count': cluster.get('activeServicesCount'),
-        })
-    return create_response(account_id, region, "ecs_clusters", clusters)
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_ecs_tasks(role_arn: str, cluster_name: str, region: str = "us-east-1") -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    ecs_client = session.client('ecs', region_name=region)
-    task_arns_result = safe_call(
-        paginate_results,
-        ecs_client,
-        'list_tasks',
-        'taskArns',
-        cluster=cluster_name
+get_ecs_clusters = sync_tool(get_ecs_clusters_async)
+@mcp_tool
+async def get_ecs_tasks_async(role_arn: str, cluster_name: str, region: str = "us-east-1") -> Dict[str, Any]:
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    async with aws_client(session, 'ecs', region_name=region) as ecs_client:
+        task_arns_result = await safe_call(
+            paginate_results,
+            ecs_client,
+            'list_tasks',
+            'taskArns',
+            cluster=cluster_name
+        )
+        if task_arns_result['status'] == 'error':
+            return create_response(account_id, region, "ecs_tasks", [], "error", task_arns_result)
+        if not task_arns_result['data']:
+            return create_response(account_id, region, "ecs_tasks", [])
+        described = await describe_in_batches(
+            ecs_client,
+            'describe_tasks',
+            'tasks',
+            'tasks',
+            task_arns_result['data'],
+            ECS_DESCRIBE_TASKS_BATCH,
+            cluster=cluster_name
+        )
+    if described['errors'] and not described['records']:
+        return create_response(account_id, region, "ecs_tasks", [], "error", described['errors'][0])
+    return create_response(
+        account_id,
+        region,
+        "ecs_tasks",
+        [project_ecs_task(task) for task in described['records']],
+        "success",
+        ecs_describe_gaps(described)
     )
-    if task_arns_result['status'] == 'error':
-        return create_response(account_id, region, "ecs_tasks", [], "error", task_arns_result)
-    if not task_arns_result['data']:
-        return create_response(account_id, region, "ecs_tasks", [])
-    all_tasks = []
-    task_arns = task_arns_result['data']
-    for i in range(0, len(task_arns), 100):
-        batch = task_arns[i:i+100]
-        tasks_result = safe_call(
-            ecs_client.describe_tasks,
-            cluster=cluster_name,
-            tasks=batch
+get_ecs_tasks = sync_tool(get_ecs_tasks_async)
+async def describe_ecs_cluster_workloads(
+    ecs_client,
+    cluster: Dict[str, Any],
+    semaphore: asyncio.Semaphore,
+    include_tasks: bool
+) -> Dict[str, Any]:
+    cluster_arn = cluster['cluster_arn']
+    async def list_arns(method_name: str, result_key: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await safe_call(paginate_results, ecs_client, method_name, result_key, cluster=cluster_arn)
+    listings = [list_arns('list_services', 'serviceArns')]
+    if include_tasks:
+        listings.append(list_arns('list_tasks', 'taskArns'))
+    listed = await asyncio.gather(*listings)
+    errors = [result for result in listed if result['status'] == 'error']
+    service_arns = listed[0]['data'] if listed[0]['status'] == 'success' else []
+    task_arns = listed[1]['data'] if include_tasks and listed[1]['status'] == 'success' else []
+    services, tasks = await asyncio.gather(
+        describe_in_batches(
+            ecs_client, 'describe_services', 'services', 'services', service_arns,
+            ECS_DESCRIBE_SERVICES_BATCH, semaphore, cluster=cluster_arn
+        ),
+        describe_in_batches(
+            ecs_client, 'describe_tasks', 'tasks', 'tasks', task_arns,
+            ECS_DESCRIBE_TASKS_BATCH, semaphore, cluster=cluster_arn
         )
-        if tasks_result['status'] == 'success':
-            for task in tasks_result['data'].get('tasks', []):
-                all_tasks.append({
-                    'task_arn': task.get('taskArn'),
-                    'task_definition_arn': task.get('taskDefinitionArn'),
-                    'cluster_arn': task.get('clusterArn'),
-                    'last_status': task.get('lastStatus'),
-                    'desired_status': task.get('desiredStatus'),
-                    'cpu': task.get('cpu'),
-                    'memory': task.get('memory'),
-                    'created_at': task.get('createdAt').isoformat() if task.get('createdAt') else None,
-                    'started_at': task.get('startedAt').isoformat() if task.get('startedAt') else None,
-                    'launch_type': task.get('launchType'),
-                })
-    return create_response(account_id, region, "ecs_tasks", all_tasks)
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_cloudwatch_metrics(role_arn: str, namespace: str, region: str = "us-east-1") -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    cloudwatch_client = session.client('cloudwatch', region_name=region)
-    result = safe_call(
-        paginate_results,
-        cloudwatch_client,
-        'list_metrics',
-        'Metrics',
-        Namespace=namespace
     )
+    errors.extend(services['errors'] + tasks['errors'])
+    workload = dict(cluster)
+    workload['services'] = [project_ecs_service(service) for service in services['records']]
+    if include_tasks:
+        workload['tasks'] = [project_ecs_task(task) for task in tasks['records']]
+    if errors:
+        workload['errors'] = [
+            {'error_code': error.get('error_code'), 'error_message': error.get('error_message')}
+            for error in errors
+        ]
+    return workload
+@mcp_tool
+async def get_ecs_overview_async(
+    role_arn: str,
+    region: str = "us-east-1",
+    include_tasks: bool = True,
+    regions: Optional[Union[str, List[str]]] = None
+) -> Dict[str, Any]:
+    if regions:
+        return await fan_out_regions(
+            get_ecs_overview_async, role_arn, regions, "ecs_overview", include_tasks=include_tasks
+        )
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    semaphore = asyncio.Semaphore(ECS_DESCRIBE_CONCURRENCY)
+    async with aws_client(session, 'ecs', region_name=region) as ecs_client:
+        cluster_arns_result = await safe_call(
+            paginate_results,
+            ecs_client,
+            'list_clusters',
+            'clusterArns'
+        )
+        if cluster_arns_result['status'] == 'error':
+            return create_response(account_id, region, "ecs_overview", [], "error", cluster_arns_result)
+        if not cluster_arns_result['data']:
+            return create_response(account_id, region, "ecs_overview", [])
+        described = await describe_in_batches(
+            ecs_client,
+            'describe_clusters',
+            'clusters',
+            'clusters',
+            cluster_arns_result['data'],
+            ECS_DESCRIBE_CLUSTERS_BATCH,
+            semaphore
+        )
+        if described['errors'] and not described['records']:
+            return create_response(account_id, region, "ecs_overview", [], "error", described['errors'][0])
+        workloads = await asyncio.gather(*[
+            describe_ecs_cluster_workloads(ecs_client, project_ecs_cluster(cluster), semaphore, include_tasks)
+            for cluster in described['records']
+        ])
+    return create_response(account_id, region, "ecs_overview", workloads)
+get_ecs_overview = sync_tool(get_ecs_overview_async)
+def project_cloudwatch_metric(metric: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'namespace': metric.get('Namespace'),
+        'metric_name': metric.get('MetricName'),
+        'dimensions': metric.get('Dimensions', [])
+    }
+@mcp_tool
+async def get_cloudwatch_metrics_async(
+    role_arn: str,
+    namespace: str,
+    region: str = "us-east-1",
+    max_items: Optional[int] = None
+) -> Dict[str, Any]:
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    async with aws_client(session, 'cloudwatch', region_name=region) as cloudwatch_client:
+        result = await safe_call(
+            paginate_results,
+            cloudwatch_client,
+            'list_metrics',
+            'Metrics',
+            projection=project_cloudwatch_metric,
+            max_items=max_items,
+            Namespace=namespace
+        )
     if result['status'] == 'error':
         return create_response(account_id, region, "cloudwatch_metrics", [], "error", result)
-    metrics = []
-    for metric in result['data']:
-        metrics.append({
-            'namespace': metric.get('Namespace'),
-            'metric_name': metric.get('MetricName'),
-            'dimensions': metric.get('Dimensions', [])
-        })
-    return create_response(account_id, region, "cloudwatch_metrics", metrics)
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_metric_statistics(
+    return with_max_items(create_response(account_id, region, "cloudwatch_metrics", result['data']), max_items)
+get_cloudwatch_metrics = sync_tool(get_cloudwatch_metrics_async)
+@mcp_tool
+async def get_metric_statistics_async(
     role_arn: str,
     namespace: str,
     metric_name: str,
@@ -504,21 +1222,23 @@ def get_metric_statistics(
 ) -> Dict[str, Any]:
     if statistics is None:
         statistics = ["Average", "Maximum", "Minimum"]
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    cloudwatch_client = session.client('cloudwatch', region_name=region)
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
     end_time = datetime.utcnow()
     start_time = end_time - timedelta(hours=start_hours_ago)
-    result = safe_call(
-        cloudwatch_client.get_metric_statistics,
-        Namespace=namespace,
-        MetricName=metric_name,
-        Dimensions=dimensions,
-        StartTime=start_time,
-        EndTime=end_time,
-        Period=period,
-        Statistics=statistics
-    )
+    async with aws_client(session, 'cloudwatch', region_name=region) as cloudwatch_client:
+        result = await safe_call(
+            aws_call,
+            cloudwatch_client,
+            'get_metric_statistics',
+            Namespace=namespace,
+            MetricName=metric_name,
+            Dimensions=dimensions,
+            StartTime=start_time,
+            EndTime=end_time,
+            Period=period,
+            Statistics=statistics
+        )
     if result['status'] == 'error':
         return create_response(account_id, region, "metric_statistics", {}, "error", result)
     datapoints = result['data'].get('Datapoints', [])
@@ -537,15 +1257,15 @@ def get_metric_statistics(
         'datapoint_count': len(datapoints)
     }
     return create_response(account_id, region, "metric_statistics", metric_data)
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_ec2_cpu_utilization(
+get_metric_statistics = sync_tool(get_metric_statistics_async)
+@mcp_tool
+async def get_ec2_cpu_utilization_async(
     role_arn: str,
     instance_id: str,
     start_hours_ago: int = 168,
     region: str = "us-east-1"
 ) -> Dict[str, Any]:
-    return get_metric_statistics(
+    return await get_metric_statistics_async(
         role_arn=role_arn,
         namespace="AWS/EC2",
         metric_name="CPUUtilization",
@@ -555,49 +1275,197 @@ def get_ec2_cpu_utilization(
         statistics=["Average", "Maximum", "Minimum"],
         region=region
     )
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_log_groups(role_arn: str, region: str = "us-east-1") -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    logs_client = session.client('logs', region_name=region)
-    result = safe_call(
-        paginate_results,
-        logs_client,
-        'describe_log_groups',
-        'logGroups'
-    )
+get_ec2_cpu_utilization = sync_tool(get_ec2_cpu_utilization_async)
+METRIC_DATA_MAX_QUERIES = 500
+EC2_BATCH_METRICS = {
+    'cpu_utilization': ('CPUUtilization', 'Average'),
+    'cpu_utilization_max': ('CPUUtilization', 'Maximum'),
+    'network_in': ('NetworkIn', 'Sum'),
+    'network_out': ('NetworkOut', 'Sum'),
+    'ebs_read_ops': ('EBSReadOps', 'Sum'),
+    'ebs_write_ops': ('EBSWriteOps', 'Sum'),
+}
+async def get_metric_data_batch(
+    cloudwatch_client,
+    queries: List[Dict[str, Any]],
+    start_time: datetime,
+    end_time: datetime
+) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    async def fetch_chunk(chunk: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        params = {
+            'MetricDataQueries': chunk,
+            'StartTime': start_time,
+            'EndTime': end_time,
+            'ScanBy': 'TimestampAscending'
+        }
+        results = []
+        calls = 0
+        while True:
+            response = await aws_call(cloudwatch_client, 'get_metric_data', **params)
+            calls += 1
+            results.extend(response.get('MetricDataResults', []))
+            if not response.get('NextToken'):
+                return results, calls
+            params['NextToken'] = response['NextToken']
+    chunks = [queries[i:i + METRIC_DATA_MAX_QUERIES] for i in range(0, len(queries), METRIC_DATA_MAX_QUERIES)]
+    chunk_results = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+    series = {}
+    for results, _ in chunk_results:
+        for result in results:
+            entry = series.setdefault(result['Id'], {'points': {}, 'status': None})
+            entry['points'].update(zip(result.get('Timestamps', []), result.get('Values', [])))
+            entry['status'] = result.get('StatusCode', entry['status'])
+    return series, sum(calls for _, calls in chunk_results)
+def summarize_series(values: List[float]) -> Dict[str, Any]:
+    if not values:
+        return {'average': None, 'maximum': None, 'minimum': None, 'datapoint_count': 0}
+    return {
+        'average': round(sum(values) / len(values), 4),
+        'maximum': round(max(values), 4),
+        'minimum': round(min(values), 4),
+        'datapoint_count': len(values)
+    }
+@mcp_tool
+async def get_ec2_metrics_batch_async(
+    role_arn: str,
+    instance_ids: Optional[List[str]] = None,
+    metrics: Optional[List[str]] = None,
+    start_hours_ago: int = 168,
+    period: int = 3600,
+    include_series: bool = True,
+    region: str = "us-east-1"
+) -> Dict[str, Any]:
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    try:
+        metric_keys = resolve_fields(metrics, list(EC2_BATCH_METRICS))
+    except ValueError as e:
+        return create_response(account_id, region, "ec2_metrics_batch", {}, "error", {
+            "error_code": "InvalidParameter",
+            "error_message": str(e),
+            "recoverable": True
+        })
+    if instance_ids is None:
+        async with aws_client(session, 'ec2', region_name=region) as ec2_client:
+            result = await safe_call(
+                paginate_results,
+                ec2_client,
+                'describe_instances',
+                'Reservations',
+                Filters=[{'Name': 'instance-state-name', 'Values': ['running']}]
+            )
+        if result['status'] == 'error':
+            return create_response(account_id, region, "ec2_metrics_batch", {}, "error", result)
+        instance_ids = [
+            instance['InstanceId']
+            for reservation in result['data']
+            for instance in reservation.get('Instances', [])
+        ]
+    end_time = datetime.utcnow()
+    start_time = end_time - timedelta(hours=start_hours_ago)
+    queries = []
+    query_targets = {}
+    for instance_id in instance_ids:
+        for metric_key in metric_keys:
+            metric_name, stat = EC2_BATCH_METRICS[metric_key]
+            query_id = f"q{len(queries)}"
+            query_targets[query_id] = (instance_id, metric_key)
+            queries.append({
+                'Id': query_id,
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': 'AWS/EC2',
+                        'MetricName': metric_name,
+                        'Dimensions': [{'Name': 'InstanceId', 'Value': instance_id}]
+                    },
+                    'Period': period,
+                    'Stat': stat
+                },
+                'ReturnData': True
+            })
+    series = {}
+    api_calls = 0
+    if queries:
+        async with aws_client(session, 'cloudwatch', region_name=region) as cloudwatch_client:
+            result = await safe_call(get_metric_data_batch, cloudwatch_client, queries, start_time, end_time)
+        if result['status'] == 'error':
+            return create_response(account_id, region, "ec2_metrics_batch", {}, "error", result)
+        series, api_calls = result['data']
+    timestamps = sorted({ts for entry in series.values() for ts in entry['points']})
+    resources = {instance_id: {} for instance_id in instance_ids}
+    for query_id, (instance_id, metric_key) in query_targets.items():
+        points = series.get(query_id, {'points': {}, 'status': None})
+        metric_summary = summarize_series(list(points['points'].values()))
+        metric_summary['status'] = points['status']
+        if include_series:
+            metric_summary['values'] = [points['points'].get(ts) for ts in timestamps]
+        resources[instance_id][metric_key] = metric_summary
+    metric_data = {
+        'namespace': 'AWS/EC2',
+        'metrics': {key: {'metric_name': EC2_BATCH_METRICS[key][0], 'stat': EC2_BATCH_METRICS[key][1]} for key in metric_keys},
+        'start_time': start_time.isoformat(),
+        'end_time': end_time.isoformat(),
+        'period': period,
+        'timestamps': [ts.isoformat() for ts in timestamps] if include_series else [],
+        'resource_count': len(resources),
+        'query_count': len(queries),
+        'api_calls': api_calls,
+        'resources': resources
+    }
+    return create_response(account_id, region, "ec2_metrics_batch", metric_data)
+get_ec2_metrics_batch = sync_tool(get_ec2_metrics_batch_async)
+def project_log_group(lg: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'log_group_name': lg.get('logGroupName'),
+        'creation_time': datetime.fromtimestamp(lg.get('creationTime', 0) / 1000).isoformat(),
+        'retention_in_days': lg.get('retentionInDays'),
+        'stored_bytes': lg.get('storedBytes'),
+        'stored_mb': round(lg.get('storedBytes', 0) / (1024**2), 2),
+        'metric_filter_count': lg.get('metricFilterCount', 0),
+    }
+@mcp_tool
+async def get_log_groups_async(
+    role_arn: str,
+    region: str = "us-east-1",
+    regions: Optional[Union[str, List[str]]] = None,
+    max_items: Optional[int] = None
+) -> Dict[str, Any]:
+    if regions:
+        return await fan_out_regions(get_log_groups_async, role_arn, regions, "log_groups", max_items=max_items)
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    async with aws_client(session, 'logs', region_name=region) as logs_client:
+        result = await safe_call(
+            paginate_results,
+            logs_client,
+            'describe_log_groups',
+            'logGroups',
+            projection=project_log_group,
+            max_items=max_items
+        )
     if result['status'] == 'error':
         return create_response(account_id, region, "log_groups", [], "error", result)
-    log_groups = []
-    for lg in result['data']:
-        log_groups.append({
-            'log_group_name': lg.get('logGroupName'),
-            'creation_time': datetime.fromtimestamp(lg.get('creationTime', 0) / 1000).isoformat(),
-            'retention_in_days': lg.get('retentionInDays'),
-            'stored_bytes': lg.get('storedBytes'),
-            'stored_mb': round(lg.get('storedBytes', 0) / (1024**2), 2),
-            'metric_filter_count': lg.get('metricFilterCount', 0),
-        })
-    return create_response(account_id, region, "log_groups", log_groups)
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_log_streams(
+    return with_max_items(create_response(account_id, region, "log_groups", result['data']), max_items)
+get_log_groups = sync_tool(get_log_groups_async)
+@mcp_tool
+async def get_log_streams_async(
     role_arn: str,
     log_group_name: str,
     limit: int = 50,
     region: str = "us-east-1"
 ) -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    logs_client = session.client('logs', region_name=region)
-    result = safe_call(
-        logs_client.describe_log_streams,
-        logGroupName=log_group_name,
-        limit=limit,
-        orderBy='LastEventTime',
-        descending=True
-    )
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    async with aws_client(session, 'logs', region_name=region) as logs_client:
+        result = await safe_call(
+            aws_call,
+            logs_client,
+            'describe_log_streams',
+            logGroupName=log_group_name,
+            limit=limit,
+            orderBy='LastEventTime',
+            descending=True
+        )
     if result['status'] == 'error':
         return create_response(account_id, region, "log_streams", [], "error", result)
     streams = []
@@ -610,52 +1478,357 @@ def get_log_streams(
             'stored_bytes': stream.get('storedBytes'),
         })
     return create_response(account_id, region, "log_streams", streams)
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def filter_log_events(
+get_log_streams = sync_tool(get_log_streams_async)
+LOG_PATTERN_RULES = [
+    (re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'), '<uuid>'),
+    (re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}\b'), '<ip>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{16,}\b'), '<hex>'),
+    (re.compile(r'\d+(?:\.\d+)?'), '<num>'),
+]
+_log_checkpoints: Dict[str, Dict[str, Any]] = {}
+_log_checkpoints_lock = threading.Lock()
+def normalize_log_message(message: str) -> str:
+    pattern = (message or '').strip()
+    for regex, placeholder in LOG_PATTERN_RULES:
+        pattern = regex.sub(placeholder, pattern)
+    return pattern[:LOG_PATTERN_MAX_LENGTH]
+def project_log_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'log_stream_name': event.get('logStreamName'),
+        'timestamp': datetime.fromtimestamp(event.get('timestamp', 0) / 1000).isoformat(),
+        'message': event.get('message'),
+        'ingestion_time': datetime.fromtimestamp(event.get('ingestionTime', 0) / 1000).isoformat(),
+    }
+def log_checkpoint_key(account_id: str, region: str, log_group_name: str, filter_pattern: str) -> str:
+    return f"{account_id}:{region}:{log_group_name}:{filter_pattern}"
+async def iter_log_events(logs_client, **params):
+    async for page in iter_pages(logs_client, 'filter_log_events', **params):
+        for event in page.get('events', []):
+            yield event
+class LogEventAggregator:
+    def __init__(self, aggregate: str):
+        self.aggregate = aggregate
+        self.groups: Dict[str, Dict[str, Any]] = {}
+    def add(self, event: Dict[str, Any]):
+        message = event.get('message') or ''
+        key = event.get('logStreamName') if self.aggregate == 'stream' else normalize_log_message(message)
+        timestamp = event.get('timestamp', 0)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = {'key': key, 'count': 0, 'first_seen': timestamp, 'last_seen': timestamp}
+            if self.aggregate == 'pattern':
+                group['sample'] = message[:LOG_PATTERN_MAX_LENGTH]
+        group['count'] += 1
+        group['first_seen'] = min(group['first_seen'], timestamp)
+        group['last_seen'] = max(group['last_seen'], timestamp)
+    def top(self, top_n: int) -> List[Dict[str, Any]]:
+        groups = sorted(self.groups.values(), key=lambda group: group['count'], reverse=True)[:top_n]
+        return [
+            dict(
+                group,
+                first_seen=datetime.fromtimestamp(group['first_seen'] / 1000).isoformat(),
+                last_seen=datetime.fromtimestamp(group['last_seen'] / 1000).isoformat()
+            )
+            for group in groups
+        ]
+@mcp_tool
+async def filter_log_events_async(
     role_arn: str,
     log_group_name: str,
     filter_pattern: str = "",
     start_hours_ago: int = 24,
     limit: int = 100,
-    region: str = "us-east-1"
+    region: str = "us-east-1",
+    aggregate: Optional[str] = None,
+    incremental: bool = False,
+    top_n: int = 50,
+    max_events: int = LOG_SCAN_MAX_EVENTS
 ) -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    logs_client = session.client('logs', region_name=region)
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    if aggregate not in (None, 'stream', 'pattern'):
+        return create_response(account_id, region, "log_events", [], "error", {
+            "error_code": "InvalidParameter",
+            "error_message": f"Unknown aggregate '{aggregate}'; expected 'stream' or 'pattern'",
+            "recoverable": False
+        })
     end_time = datetime.utcnow()
     start_time = end_time - timedelta(hours=start_hours_ago)
+    start_ms = int(start_time.timestamp() * 1000)
+    checkpoint_key = log_checkpoint_key(account_id, region, log_group_name, filter_pattern)
+    checkpoint = _log_checkpoints.get(checkpoint_key) if incremental else None
+    seen_ids = set()
+    if checkpoint and checkpoint['timestamp'] >= start_ms:
+        start_ms = checkpoint['timestamp']
+        seen_ids = checkpoint['event_ids']
+    else:
+        checkpoint = None
     params = {
         'logGroupName': log_group_name,
-        'startTime': int(start_time.timestamp() * 1000),
-        'endTime': int(end_time.timestamp() * 1000),
-        'limit': limit
+        'startTime': start_ms,
+        'endTime': int(end_time.timestamp() * 1000)
     }
     if filter_pattern:
         params['filterPattern'] = filter_pattern
-    result = safe_call(logs_client.filter_log_events, **params)
+    cap = limit if aggregate is None else max_events
+    events = []
+    aggregator = LogEventAggregator(aggregate) if aggregate else None
+    event_count = 0
+    truncated = False
+    latest_timestamp, latest_ids = start_ms, set(seen_ids)
+    async def scan():
+        nonlocal event_count, truncated, latest_timestamp, latest_ids
+        async with aws_client(session, 'logs', region_name=region) as logs_client:
+            async for event in iter_log_events(logs_client, **params):
+                if event.get('eventId') in seen_ids:
+                    continue
+                if event_count >= cap:
+                    truncated = True
+                    return
+                event_count += 1
+                if aggregator:
+                    aggregator.add(event)
+                else:
+                    events.append(project_log_event(event))
+                timestamp = event.get('timestamp', 0)
+                if timestamp > latest_timestamp:
+                    latest_timestamp, latest_ids = timestamp, {event.get('eventId')}
+                elif timestamp == latest_timestamp:
+                    latest_ids.add(event.get('eventId'))
+    result = await safe_call(scan)
     if result['status'] == 'error':
         return create_response(account_id, region, "log_events", [], "error", result)
-    events = []
-    for event in result['data'].get('events', []):
-        events.append({
-            'log_stream_name': event.get('logStreamName'),
-            'timestamp': datetime.fromtimestamp(event.get('timestamp', 0) / 1000).isoformat(),
-            'message': event.get('message'),
-            'ingestion_time': datetime.fromtimestamp(event.get('ingestionTime', 0) / 1000).isoformat(),
-        })
-    return create_response(account_id, region, "log_events", {
-        'events': events,
-        'event_count': len(events),
+    if incremental:
+        with _log_checkpoints_lock:
+            _log_checkpoints[checkpoint_key] = {'timestamp': latest_timestamp, 'event_ids': latest_ids}
+    data = {
+        'event_count': event_count,
+        'truncated': truncated,
         'filter_pattern': filter_pattern,
         'searched_time_range': {
-            'start': start_time.isoformat(),
+            'start': datetime.fromtimestamp(start_ms / 1000).isoformat(),
             'end': end_time.isoformat()
         }
+    }
+    if aggregator:
+        data['aggregate'] = aggregate
+        data['group_count'] = len(aggregator.groups)
+        data['groups'] = aggregator.top(top_n)
+    else:
+        data['events'] = events
+    if incremental:
+        data['checkpoint'] = {
+            'resumed_from': datetime.fromtimestamp(checkpoint['timestamp'] / 1000).isoformat() if checkpoint else None,
+            'advanced': event_count > 0,
+            'caught_up': not truncated
+        }
+    return create_response(account_id, region, "log_events", data)
+filter_log_events = sync_tool(filter_log_events_async)
+def insights_window(start_hours_ago: int, bucket_seconds: int) -> Tuple[int, int]:
+    end = -(-int(time.time()) // bucket_seconds) * bucket_seconds
+    return end - start_hours_ago * 3600, end
+def project_insights_row(row: List[Dict[str, str]]) -> Dict[str, Any]:
+    return {field['field']: field.get('value') for field in row if field.get('field') != '@ptr'}
+async def run_insights_query(
+    logs_client,
+    query_string: str,
+    log_group_names: List[str],
+    start: int,
+    end: int,
+    limit: int,
+    timeout_seconds: int
+) -> Dict[str, Any]:
+    started = await aws_call(
+        logs_client,
+        'start_query',
+        logGroupNames=log_group_names,
+        startTime=start,
+        endTime=end,
+        queryString=query_string,
+        limit=limit
+    )
+    query_id = started['queryId']
+    deadline = time.monotonic() + timeout_seconds
+    delay = INSIGHTS_POLL_INITIAL_SECONDS
+    while True:
+        response = await aws_call(logs_client, 'get_query_results', queryId=query_id)
+        if response.get('status') in ('Complete', 'Failed', 'Cancelled', 'Timeout'):
+            break
+        if time.monotonic() + delay > deadline:
+            await safe_call(aws_call, logs_client, 'stop_query', queryId=query_id)
+            response['status'] = 'Timeout'
+            break
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, INSIGHTS_POLL_MAX_SECONDS)
+    return {
+        'query_id': query_id,
+        'status': response.get('status'),
+        'log_group_names': log_group_names,
+        'results': [project_insights_row(row) for row in response.get('results', [])],
+        'statistics': response.get('statistics', {})
+    }
+@mcp_tool
+async def run_logs_insights_query_async(
+    role_arn: str,
+    query_string: str,
+    log_group_names: Optional[List[str]] = None,
+    log_group_prefix: Optional[str] = None,
+    start_hours_ago: int = 24,
+    limit: int = 1000,
+    timeout_seconds: int = 60,
+    region: str = "us-east-1"
+) -> Dict[str, Any]:
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    if not log_group_names:
+        groups = await get_log_groups_async(role_arn, region=region)
+        if groups['status'] == 'error':
+            return create_response(account_id, region, "logs_insights", {}, "error", groups)
+        log_group_names = [
+            group['log_group_name'] for group in groups['data']
+            if not log_group_prefix or group['log_group_name'].startswith(log_group_prefix)
+        ]
+    if not log_group_names:
+        return create_response(account_id, region, "logs_insights", {'results': [], 'log_group_count': 0})
+    log_group_names = sorted(set(log_group_names))
+    start, end = insights_window(start_hours_ago, INSIGHTS_TIME_BUCKET_SECONDS)
+    batches = [
+        log_group_names[i:i + INSIGHTS_MAX_LOG_GROUPS]
+        for i in range(0, len(log_group_names), INSIGHTS_MAX_LOG_GROUPS)
+    ]
+    async def query_batch(batch: List[str]) -> Dict[str, Any]:
+        async with aws_client(session, 'logs', region_name=region) as logs_client:
+            result = await safe_call(
+                run_insights_query, logs_client, query_string, batch, start, end, limit, timeout_seconds
+            )
+        if result['status'] == 'success' and result['data']['status'] != 'Complete':
+            return {
+                "status": "error",
+                "error_code": f"Query{result['data']['status']}",
+                "error_message": f"Logs Insights query {result['data']['query_id']} ended with status {result['data']['status']}",
+                "recoverable": result['data']['status'] == 'Timeout'
+            }
+        return result
+    async def query_batch_cached(batch: List[str]) -> Dict[str, Any]:
+        return await result_cache.get_or_call(
+            'logs_insights_results',
+            {
+                'account_id': account_id,
+                'region': region,
+                'query_string': query_string,
+                'log_group_names': batch,
+                'start': start,
+                'end': end,
+                'limit': limit
+            },
+            lambda: query_batch(batch)
+        )
+    outcomes = await asyncio.gather(*[query_batch_cached(batch) for batch in batches])
+    errors = [outcome for outcome in outcomes if outcome['status'] == 'error']
+    if len(errors) == len(outcomes):
+        return create_response(account_id, region, "logs_insights", {}, "error", errors[0])
+    completed = [outcome['data'] for outcome in outcomes if outcome['status'] == 'success']
+    return create_response(account_id, region, "logs_insights", {
+        'query_string': query_string,
+        'log_group_count': len(log_group_names),
+        'batches': len(batches),
+        'partial_aggregates': len(batches) > 1,
+        'time_range': {
+            'start': datetime.utcfromtimestamp(start).isoformat(),
+            'end': datetime.utcfromtimestamp(end).isoformat()
+        },
+        'results': [row for query in completed for row in query['results']],
+        'queries': [
+            {
+                'query_id': query['query_id'],
+                'status': query['status'],
+                'log_group_count': len(query['log_group_names']),
+                'statistics': query['statistics']
+            }
+            for query in completed
+        ],
+        'failed_batches': [
+            {'error_code': error.get('error_code'), 'error_message': error.get('error_message')}
+            for error in errors
+        ]
     })
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_cost_and_usage(
+run_logs_insights_query = sync_tool(run_logs_insights_query_async)
+async def get_cost_and_usage_pages(ce_client, **params) -> Dict[str, Any]:
+    results_by_time = []
+    attributes = {}
+    pages = 0
+    while True:
+        response = await aws_call(ce_client, 'get_cost_and_usage', **params)
+        pages += 1
+        for result in response.get('ResultsByTime', []):
+            previous = results_by_time[-1] if results_by_time else None
+            if previous is not None and previous['TimePeriod'] == result['TimePeriod']:
+                previous.setdefault('Groups', []).extend(result.get('Groups', []))
+            else:
+                results_by_time.append(result)
+        for attribute in response.get('DimensionValueAttributes', []):
+            attributes[attribute.get('Value')] = attribute
+        next_token = response.get('NextPageToken')
+        if not next_token or next_token == params.get('NextPageToken'):
+            break
+        params['NextPageToken'] = next_token
+    return {
+        'ResultsByTime': results_by_time,
+        'DimensionValueAttributes': list(attributes.values()),
+        'pages': pages
+    }
+def split_date_window(start_date: str, end_date: str, chunk_days: int) -> List[Tuple[str, str]]:
+    days = day_range(start_date, end_date)
+    return [
+        (days[i], days[i + chunk_days] if i + chunk_days < len(days) else end_date[:10])
+        for i in range(0, len(days), max(chunk_days, 1))
+    ]
+def add_cost_metrics(target: Dict[str, Any], metrics: Dict[str, Any]):
+    for name, value in metrics.items():
+        current = target.setdefault(name, {'Amount': '0', 'Unit': value.get('Unit', '')})
+        current['Amount'] = str(Decimal(current['Amount']) + Decimal(value.get('Amount') or '0'))
+def validate_date_window(start_date: str, end_date: str):
+    try:
+        first, last = parse_day(start_date), parse_day(end_date)
+    except (TypeError, ValueError):
+        raise ValueError(f"start_date and end_date must be YYYY-MM-DD dates; got '{start_date}' and '{end_date}'")
+    if first >= last:
+        raise ValueError(f"start_date {start_date} must be before end_date {end_date}")
+def rollup_cost_results(
+    days: List[Dict[str, Any]],
+    start_date: str,
+    end_date: str,
+    granularity: str
+) -> List[Dict[str, Any]]:
+    if granularity == 'DAILY':
+        return days
+    periods = []
+    cursor, last = parse_day(start_date), parse_day(end_date)
+    while cursor < last:
+        boundary = min(cursor.replace(day=1) + relativedelta(months=1), last)
+        periods.append({
+            'TimePeriod': {'Start': cursor.isoformat(), 'End': boundary.isoformat()},
+            'Total': {},
+            'Groups': {},
+            'Estimated': False
+        })
+        cursor = boundary
+    index = 0
+    for day in days:
+        while index < len(periods) - 1 and day['TimePeriod']['Start'][:10] >= periods[index]['TimePeriod']['End']:
+            index += 1
+        period = periods[index]
+        add_cost_metrics(period['Total'], day.get('Total', {}))
+        for group in day.get('Groups', []):
+            keys = tuple(group.get('Keys', []))
+            entry = period['Groups'].setdefault(keys, {'Keys': list(keys), 'Metrics': {}})
+            add_cost_metrics(entry['Metrics'], group.get('Metrics', {}))
+        period['Estimated'] = period['Estimated'] or bool(day.get('Estimated'))
+    for period in periods:
+        period['Groups'] = list(period['Groups'].values())
+    return periods
+@mcp_tool
+async def get_cost_and_usage_async(
     role_arn: str,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
@@ -665,13 +1838,20 @@ def get_cost_and_usage(
 ) -> Dict[str, Any]:
     if metrics is None:
         metrics = ["UnblendedCost", "UsageQuantity"]
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    ce_client = session.client('ce', region_name='us-east-1')
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
     if not end_date:
         end_date = datetime.utcnow().strftime('%Y-%m-%d')
     if not start_date:
         start_date = (datetime.utcnow() - timedelta(days=30)).strftime('%Y-%m-%d')
+    try:
+        validate_date_window(start_date, end_date)
+    except ValueError as e:
+        return create_response(account_id, "global", "cost_and_usage", {}, "error", {
+            "error_code": "InvalidParameter",
+            "error_message": str(e),
+            "recoverable": True
+        })
     params = {
         'TimePeriod': {
             'Start': start_date,
@@ -682,9 +1862,57 @@ def get_cost_and_usage(
     }
     if group_by:
         params['GroupBy'] = group_by
-    result = safe_call(ce_client.get_cost_and_usage, **params)
-    if result['status'] == 'error':
-        return create_response(account_id, "global", "cost_and_usage", {}, "error", result)
+    if granularity == 'HOURLY':
+        async with aws_client(session, 'ce', region_name='us-east-1') as ce_client:
+            result = await safe_call(get_cost_and_usage_pages, ce_client, **params)
+        if result['status'] == 'error':
+            return create_response(account_id, "global", "cost_and_usage", {}, "error", result)
+        results_by_time = result['data']['ResultsByTime']
+        attributes = result['data']['DimensionValueAttributes']
+        store_info = {'ce_calls': result['data']['pages']}
+    else:
+        query_key = cost_store.query_key('DAILY', metrics, group_by)
+        missing = await asyncio.to_thread(cost_store.missing_ranges, account_id, query_key, start_date, end_date)
+        chunks = [
+            chunk
+            for range_start, range_end in missing
+            for chunk in split_date_window(range_start, range_end, COST_WINDOW_CHUNK_DAYS)
+        ]
+        results = []
+        if chunks:
+            semaphore = asyncio.Semaphore(COST_CHUNK_CONCURRENCY)
+            async with aws_client(session, 'ce', region_name='us-east-1') as ce_client:
+                async def fetch_chunk(chunk_start: str, chunk_end: str) -> Dict[str, Any]:
+                    async with semaphore:
+                        return await safe_call(
+                            get_cost_and_usage_pages,
+                            ce_client,
+                            **dict(params, TimePeriod={'Start': chunk_start, 'End': chunk_end}, Granularity='DAILY')
+                        )
+                results = await asyncio.gather(*[fetch_chunk(*chunk) for chunk in chunks])
+        for (chunk_start, chunk_end), result in zip(chunks, results):
+            if result['status'] == 'success':
+                await asyncio.to_thread(
+                    cost_store.put_days,
+                    account_id,
+                    query_key,
+                    chunk_start,
+                    chunk_end,
+                    result['data']['ResultsByTime'],
+                    result['data']['DimensionValueAttributes']
+                )
+        for result in results:
+            if result['status'] == 'error':
+                return create_response(account_id, "global", "cost_and_usage", {}, "error", result)
+        days = await asyncio.to_thread(cost_store.get_days, account_id, query_key, start_date, end_date)
+        results_by_time = rollup_cost_results(days, start_date, end_date, granularity)
+        attributes = await asyncio.to_thread(cost_store.get_attributes, account_id, query_key)
+        store_info = {
+            'days_requested': len(days),
+            'days_fetched': sum(len(day_range(chunk_start, chunk_end)) for chunk_start, chunk_end in chunks),
+            'chunks': len(chunks),
+            'ce_calls': sum(result['data']['pages'] for result in results)
+        }
     cost_data = {
         'time_period': {
             'start': start_date,
@@ -692,35 +1920,38 @@ def get_cost_and_usage(
         },
         'granularity': granularity,
         'metrics': metrics,
-        'results_by_time': result['data'].get('ResultsByTime', []),
-        'dimension_value_attributes': result['data'].get('DimensionValueAttributes', [])
+        'results_by_time': results_by_time,
+        'dimension_value_attributes': attributes
     }
+    cost_data['store'] = store_info
     return create_response(account_id, "global", "cost_and_usage", cost_data)
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_cost_forecast(
+get_cost_and_usage = sync_tool(get_cost_and_usage_async)
+@mcp_tool
+async def get_cost_forecast_async(
     role_arn: str,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     granularity: str = "MONTHLY",
     metric: str = "UNBLENDED_COST"
 ) -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    ce_client = session.client('ce', region_name='us-east-1')
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
     if not start_date:
         start_date = datetime.utcnow().strftime('%Y-%m-%d')
     if not end_date:
         end_date = (datetime.utcnow() + relativedelta(months=3)).strftime('%Y-%m-%d')
-    result = safe_call(
-        ce_client.get_cost_forecast,
-        TimePeriod={
-            'Start': start_date,
-            'End': end_date
-        },
-        Metric=metric,
-        Granularity=granularity
-    )
+    async with aws_client(session, 'ce', region_name='us-east-1') as ce_client:
+        result = await safe_call(
+            aws_call,
+            ce_client,
+            'get_cost_forecast',
+            TimePeriod={
+                'Start': start_date,
+                'End': end_date
+            },
+            Metric=metric,
+            Granularity=granularity
+        )
     if result['status'] == 'error':
         return create_response(account_id, "global", "cost_forecast", {}, "error", result)
     forecast_data = {
@@ -734,14 +1965,14 @@ def get_cost_forecast(
         'forecast_results_by_time': result['data'].get('ForecastResultsByTime', [])
     }
     return create_response(account_id, "global", "cost_forecast", forecast_data)
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_cost_by_service(
+get_cost_forecast = sync_tool(get_cost_forecast_async)
+@mcp_tool
+async def get_cost_by_service_async(
     role_arn: str,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None
 ) -> Dict[str, Any]:
-    return get_cost_and_usage(
+    return await get_cost_and_usage_async(
         role_arn=role_arn,
         start_date=start_date,
         end_date=end_date,
@@ -749,29 +1980,248 @@ def get_cost_by_service(
         metrics=["UnblendedCost"],
         group_by=[{"Type": "DIMENSION", "Key": "SERVICE"}]
     )
-@mcp.tool()
-@retry_with_backoff(max_retries=3)
-def get_cost_tags(role_arn: str, tag_key: str) -> Dict[str, Any]:
-    session = assume_role_session(role_arn)
-    account_id = get_account_id(session)
-    ce_client = session.client('ce', region_name='us-east-1')
+get_cost_by_service = sync_tool(get_cost_by_service_async)
+@mcp_tool
+async def get_cost_tags_async(role_arn: str, tag_key: str) -> Dict[str, Any]:
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
     end_date = datetime.utcnow().strftime('%Y-%m-%d')
     start_date = (datetime.utcnow() - timedelta(days=30)).strftime('%Y-%m-%d')
-    result = safe_call(
-        ce_client.get_tags,
-        TimePeriod={
-            'Start': start_date,
-            'End': end_date
-        },
-        TagKey=tag_key
-    )
-    if result['status'] == 'error':
-        return create_response(account_id, "global", "cost_tags", {}, "error", result)
+    window_key = json.dumps({'api': 'get_tags', 'tag_key': tag_key})
+    tags = await asyncio.to_thread(cost_store.get_window, account_id, window_key, start_date, end_date)
+    if tags is None:
+        async with aws_client(session, 'ce', region_name='us-east-1') as ce_client:
+            result = await safe_call(
+                aws_call,
+                ce_client,
+                'get_tags',
+                TimePeriod={
+                    'Start': start_date,
+                    'End': end_date
+                },
+                TagKey=tag_key
+            )
+        if result['status'] == 'error':
+            return create_response(account_id, "global", "cost_tags", {}, "error", result)
+        tags = result['data'].get('Tags', [])
+        await asyncio.to_thread(cost_store.put_window, account_id, window_key, start_date, end_date, tags)
     return create_response(account_id, "global", "cost_tags", {
         'tag_key': tag_key,
-        'tags': result['data'].get('Tags', []),
+        'tags': tags,
         'time_period': {'start': start_date, 'end': end_date}
     })
+get_cost_tags = sync_tool(get_cost_tags_async)
+NDJSON_CHUNK_SIZE = 500
+INVENTORY_STREAMS = {
+    'ec2_instances': ('ec2', 'describe_instances', 'Reservations', 'Instances', project_ec2_instance),
+    'ec2_tags': ('ec2', 'describe_tags', 'Tags', None, None),
+    'rds_instances': ('rds', 'describe_db_instances', 'DBInstances', None, project_rds_instance),
+    'rds_clusters': ('rds', 'describe_db_clusters', 'DBClusters', None, project_rds_cluster),
+    'lambda_functions': ('lambda', 'list_functions', 'Functions', None, project_lambda_function),
+    'log_groups': ('logs', 'describe_log_groups', 'logGroups', None, project_log_group),
+}
+async def stream_inventory(
+    session: aioboto3.Session,
+    data_type: str,
+    region: str,
+    max_items: Optional[int] = None
+):
+    service, method_name, result_key, flatten_key, projection = INVENTORY_STREAMS[data_type]
+    async with aws_client(session, service, region_name=region) as client:
+        async for record in iter_results(client, method_name, result_key, projection, max_items, flatten_key):
+            yield record
+async def stream_inventory_ndjson(
+    role_arn: str,
+    data_type: str,
+    region: str = "us-east-1",
+    max_items: Optional[int] = None,
+    chunk_size: int = NDJSON_CHUNK_SIZE
+):
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    summary = {
+        "account_id": account_id,
+        "region": region,
+        "data_type": data_type,
+        "status": "success",
+        "record_count": 0
+    }
+    lines = []
+    try:
+        async for record in stream_inventory(session, data_type, region, max_items):
+            lines.append(json.dumps(record, default=str))
+            summary["record_count"] += 1
+            if len(lines) >= chunk_size:
+                yield "\n".join(lines) + "\n"
+                lines = []
+    except ClientError as e:
+        summary["status"] = "error"
+        summary["error_code"] = e.response.get('Error', {}).get('Code', 'Unknown')
+        summary["error_message"] = e.response.get('Error', {}).get('Message', str(e))
+    except Exception as e:
+        summary["status"] = "error"
+        summary["error_code"] = "UnexpectedError"
+        summary["error_message"] = str(e)
+    if lines:
+        yield "\n".join(lines) + "\n"
+    summary["timestamp"] = datetime.utcnow().isoformat()
+    yield json.dumps({"summary": summary}) + "\n"
+async def load_inventory_table(
+    session: aioboto3.Session,
+    account_id: str,
+    data_type: str,
+    region: str
+) -> ColumnarInventory:
+    table = inventory_store.get(account_id, region, data_type)
+    if table is None:
+        table = ColumnarInventory(data_type)
+        async for record in stream_inventory(session, data_type, region):
+            table.append(record)
+        inventory_store.put(account_id, region, table)
+    return table
+@mcp_tool
+async def query_inventory_async(
+    role_arn: str,
+    data_type: str,
+    filters: Optional[Dict[str, Any]] = None,
+    group_by: Optional[Union[str, List[str]]] = None,
+    sum_columns: Optional[List[str]] = None,
+    columns: Optional[List[str]] = None,
+    limit: int = 100,
+    region: str = "us-east-1"
+) -> Dict[str, Any]:
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    if data_type not in INVENTORY_STREAMS:
+        return create_response(account_id, region, "inventory_query", {}, "error", {
+            "error_code": "InvalidParameter",
+            "error_message": f"Unknown data_type '{data_type}'; expected one of {list(INVENTORY_STREAMS)}",
+            "recoverable": True
+        })
+    result = await safe_call(load_inventory_table, session, account_id, data_type, region)
+    if result['status'] == 'error':
+        return create_response(account_id, region, "inventory_query", {}, "error", result)
+    table = result['data']
+    try:
+        selection = table.filter(filters)
+        if group_by:
+            groups = table.group_by(group_by, selection, sum_columns)
+            data = {'groups': groups[:limit], 'group_count': len(groups)}
+        else:
+            data = {'rows': list(table.rows(selection[:limit], columns))}
+    except (KeyError, ValueError) as e:
+        return create_response(account_id, region, "inventory_query", {}, "error", {
+            "error_code": "InvalidParameter",
+            "error_message": str(e.args[0]) if e.args else str(e),
+            "recoverable": True
+        })
+    data.update({
+        'data_type': data_type,
+        'matched': len(selection),
+        'total': len(table),
+        'columns': table.describe()['columns']
+    })
+    return create_response(account_id, region, "inventory_query", data)
+query_inventory = sync_tool(query_inventory_async)
+SNAPSHOT_SUMMARY_GROUPS = {
+    'ec2_instances': ['instance_type', 'state'],
+    'ec2_tags': ['Key'],
+    'rds_instances': ['db_instance_class', 'engine'],
+    'rds_clusters': ['engine', 'status'],
+    'lambda_functions': ['runtime'],
+    'log_groups': ['retention_in_days'],
+}
+@mcp_tool
+async def sync_inventory_async(
+    role_arn: str,
+    data_type: str,
+    region: str = "us-east-1",
+    max_changes: int = 200
+) -> Dict[str, Any]:
+    session = await assume_role_session_async(role_arn)
+    account_id = await get_account_id_async(session)
+    if data_type not in INVENTORY_STREAMS:
+        return create_response(account_id, region, "inventory_sync", {}, "error", {
+            "error_code": "InvalidParameter",
+            "error_message": f"Unknown data_type '{data_type}'; expected one of {list(INVENTORY_STREAMS)}",
+            "recoverable": True
+        })
+    previous = await asyncio.to_thread(snapshot_store.previous, account_id, region, data_type)
+    known = await asyncio.to_thread(snapshot_store.fingerprints, account_id, region, data_type)
+    table = ColumnarInventory(data_type)
+    seen = set()
+    added, changed = [], []
+    async def collect():
+        async for record in stream_inventory(session, data_type, region):
+            table.append(record)
+            rid = resource_id(data_type, record)
+            seen.add(rid)
+            fingerprint = known.get(rid)
+            record_digest = digest(record)
+            if fingerprint is None:
+                added.append((rid, change_signal(data_type, record), record_digest, record))
+            elif fingerprint[1] != record_digest:
+                changed.append((rid, change_signal(data_type, record), record_digest, record))
+    result = await safe_call(collect)
+    if result['status'] == 'error':
+        return create_response(account_id, region, "inventory_sync", {}, "error", result)
+    removed = [rid for rid in known if rid not in seen]
+    previous_records = await asyncio.to_thread(
+        snapshot_store.records, account_id, region, data_type, [c[0] for c in changed] + removed
+    )
+    if previous and not (added or changed or removed):
+        summary = previous['summary']
+    else:
+        summary = {
+            'resource_count': len(table),
+            'groups': table.group_by(SNAPSHOT_SUMMARY_GROUPS[data_type])
+        }
+    await asyncio.to_thread(
+        snapshot_store.save, account_id, region, data_type, added + changed, removed, len(table), summary
+    )
+    inventory_store.put(account_id, region, table)
+    first_sync = previous is None
+    data = {
+        'data_type': data_type,
+        'first_sync': first_sync,
+        'previous_sync': datetime.utcfromtimestamp(previous['synced_at']).isoformat() if previous else None,
+        'counts': {
+            'added': len(added),
+            'removed': len(removed),
+            'changed': len(changed),
+            'unchanged': len(seen) - len(added) - len(changed)
+        },
+        'summary': summary
+    }
+    if not first_sync:
+        data['added'] = [record for _, _, _, record in added[:max_changes]]
+        data['removed'] = [
+            {'resource_id': rid, 'last_seen': previous_records.get(rid)} for rid in removed[:max_changes]
+        ]
+        data['changed'] = [
+            {
+                'resource_id': rid,
+                'signal_changed': known[rid][0] != signal,
+                'changes': changed_fields(previous_records.get(rid, {}), record)
+            }
+            for rid, signal, _, record in changed[:max_changes]
+        ]
+        data['truncated'] = max(len(added), len(removed), len(changed)) > max_changes
+    return create_response(account_id, region, "inventory_sync", data)
+sync_inventory = sync_tool(sync_inventory_async)
+@app.get("/stream/{data_type}")
+async def stream_inventory_endpoint(
+    data_type: str,
+    role_arn: str,
+    region: str = "us-east-1",
+    max_items: Optional[int] = None
+):
+    if data_type not in INVENTORY_STREAMS:
+        raise HTTPException(status_code=404, detail=f"Unknown stream {data_type}; expected one of {list(INVENTORY_STREAMS)}")
+    return StreamingResponse(
+        stream_inventory_ndjson(role_arn, data_type, region, max_items),
+        media_type="application/x-ndjson"
+    )
 @app.get("/health")
 async def health_check():
     return {
@@ -779,34 +2229,45 @@ async def health_check():
         "service": "AWS Optimization Tools",
         "timestamp": datetime.utcnow().isoformat()
     }
+@app.get("/stats")
+async def stats():
+    return {
+        "session_cache": session_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "cost_store": cost_store.stats(),
+        "client_registry": client_registry.stats(),
+        "resilience": resilience.stats(),
+        "inventory_store": inventory_store.stats(),
+        "snapshot_store": snapshot_store.stats(),
+        "tool_metrics": tool_metrics.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    cache = result_cache.stats()
+    registry = client_registry.stats()
+    limits = resilience.stats()
+    return PlainTextResponse(
+        tool_metrics.render({
+            "result_cache_bytes": ("Bytes held by the tool result cache.", cache["bytes"]),
+            "result_cache_entries": ("Entries held by the tool result cache.", cache["entries"]),
+            "result_cache_evictions": ("Result cache evictions since start.", cache["evictions"]),
+            "aws_clients": ("Pooled AWS clients held by the client registry.", registry["clients"]),
+            "aws_rate_limited_seconds": ("Seconds spent waiting on client-side rate limits.", limits["rate_limited_seconds"]),
+            "aws_open_circuits": (
+                "Services whose circuit breaker is not closed.",
+                sum(1 for circuit in limits["circuits"].values() if circuit["state"] != "closed")
+            ),
+        }),
+        media_type="text/plain; version=0.0.4"
+    )
 @app.get("/")
 async def root():
     return {
         "service": "AWS Optimization FastMCP Tools",
         "version": "1.0.0",
         "description": "Read-only AWS data exposure for Bedrock Agentic AI cost optimization",
-        "available_tools": [
-            "get_ec2_instances",
-            "get_ec2_tags",
-            "get_ec2_cpu_utilization",
-            "get_rds_instances",
-            "get_rds_clusters",
-            "get_lambda_functions",
-            "get_lambda_function_config",
-            "get_s3_buckets",
-            "get_s3_bucket_size",
-            "get_ecs_clusters",
-            "get_ecs_tasks",
-            "get_cloudwatch_metrics",
-            "get_metric_statistics",
-            "get_log_groups",
-            "get_log_streams",
-            "filter_log_events",
-            "get_cost_and_usage",
-            "get_cost_forecast",
-            "get_cost_by_service",
-            "get_cost_tags"
-        ],
+        "available_tools": list(tool_registry),
         "documentation": "/docs",
         "timestamp": datetime.utcnow().isoformat()
     }